@@ -0,0 +1,197 @@
+# server/analytics.py
+"""
+Herd analytics computed with NumPy (GET /analytics/<metric>).
+
+Inputs come from the daily rollup tables (one row per day, animal and type,
+see rollups.py) as whole columns, and every metric is a handful of array
+operations - sorts, cumulative sums, bincounts - instead of a Python loop
+over ORM objects:
+
+- feed-conversion: product (milk by default) per unit of feed
+- yield: rolling 7- and 30-day average daily yield, over calendar days, so
+  days without a production record count as zero
+- revenue: sales revenue per month
+
+Each metric is computed per animal or per breed (group=breed).
+"""
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import String, select, type_coerce
+
+from config import db
+from dates import parse_date
+from models import Animal, DailyFeed, DailyProduction, DailySale
+from pagination import ListParamsError
+
+
+METRICS = ('feed-conversion', 'yield', 'revenue')
+GROUPS = ('animal', 'breed')
+YIELD_WINDOWS = (7, 30)
+
+
+def _columns(statement, dtypes):
+    """The result of statement as one NumPy array per column."""
+    # Run on the session's connection: plain rows, without the ORM's per-row result handling
+    rows = db.session.connection().execute(statement).all()
+    if not rows:
+        return [np.empty(0, dtype=dtype) for dtype in dtypes]
+    return [np.array(column, dtype=dtype) for column, dtype in zip(zip(*rows), dtypes)]
+
+
+def _day(column):
+    # Skip the per-row date parsing: NumPy reads SQLite's 'YYYY-MM-DD' text and
+    # PostgreSQL's date objects straight into datetime64[D]
+    return type_coerce(column, String)
+
+
+def _group_index(group, *animal_arrays):
+    """Labels (animal ids or breeds) and, for each array of animal ids, the label index of every entry."""
+    animals = np.unique(np.concatenate(animal_arrays)) if animal_arrays else np.empty(0, np.int64)
+    if group == 'breed':
+        breed_of = dict(db.session.execute(select(Animal.id, Animal.breed)).all())
+        breeds = np.array([breed_of.get(animal) or 'Unknown' for animal in animals.tolist()], dtype=object)
+        labels, animal_label = np.unique(breeds, return_inverse=True)
+    else:
+        labels, animal_label = animals, np.arange(len(animals))
+    return labels, [animal_label[np.searchsorted(animals, array)] for array in animal_arrays]
+
+
+def _label_key(group):
+    return 'breed' if group == 'breed' else 'animal_id'
+
+
+def feed_conversion(query_filters, args, product_type='Milk', group='animal'):
+    """Total product, total feed and product per unit of feed for each animal / breed."""
+    produced_by, produced = _columns(
+        query_filters(select(DailyProduction.animal_id, DailyProduction.quantity), DailyProduction, args)
+        .where(DailyProduction.product_type == product_type),
+        (np.int64, np.float64),
+    )
+    fed_by, fed = _columns(
+        query_filters(select(DailyFeed.animal_id, DailyFeed.quantity), DailyFeed, args),
+        (np.int64, np.float64),
+    )
+    labels, (produced_index, fed_index) = _group_index(group, produced_by, fed_by)
+    totals_produced = np.bincount(produced_index, weights=produced, minlength=len(labels))
+    totals_fed = np.bincount(fed_index, weights=fed, minlength=len(labels))
+    ratio = np.divide(totals_produced, totals_fed, out=np.full(len(labels), np.nan), where=totals_fed > 0)
+
+    key = _label_key(group)
+    return [
+        {key: label, product_type.lower(): total_produced, 'feed': total_fed,
+         'per_unit_feed': None if np.isnan(value) else value}
+        for label, total_produced, total_fed, value in zip(labels.tolist(), totals_produced.tolist(), totals_fed.tolist(), ratio.tolist())
+    ]
+
+
+def _window_args(args):
+    """args with start_date moved back so the first rolling windows are complete."""
+    args = dict(args.items())
+    if args.get('start_date'):
+        try:
+            start = parse_date(args['start_date'])
+        except ValueError:
+            raise ListParamsError('start_date must be in the format YYYY-MM-DD')
+        args['start_date'] = (start - timedelta(days=max(YIELD_WINDOWS) - 1)).isoformat()
+    return args
+
+
+def yield_averages(query_filters, args, product_type='Milk', group='animal', series=False):
+    """
+    Rolling average daily yield over the last 7 and 30 days.
+
+    Without series: one row per animal / breed as of end_date (or the last
+    day with data); a breed's value is the mean of its animals'. With series
+    (per animal only): the averages on every day the animal produced.
+    """
+    if series and group != 'animal':
+        raise ListParamsError('series is only available with group=animal')
+
+    animal, day, quantity = _columns(
+        query_filters(select(DailyProduction.animal_id, _day(DailyProduction.day), DailyProduction.quantity), DailyProduction, _window_args(args))
+        .where(DailyProduction.product_type == product_type),
+        (np.int64, 'datetime64[D]', np.float64),
+    )
+    if not len(animal):
+        return []
+
+    # One sorted key per (animal, day); animals are spaced further apart than
+    # the longest window so a window never reaches into the previous animal
+    days = day.astype(np.int64)
+    first_day = days.min()
+    order = np.lexsort((days, animal))
+    animal, days, quantity = animal[order], days[order], quantity[order]
+    animals, animal_index = np.unique(animal, return_inverse=True)
+    # end_date may lie past the last day with data; each animal's slot must reach it
+    as_of = parse_date(args['end_date']) if args.get('end_date') else None
+    as_of = np.datetime64(as_of, 'D').astype(np.int64) if as_of else days.max()
+    span = max(days.max(), as_of) - first_day + max(YIELD_WINDOWS) + 1
+    keys = animal_index * span + (days - first_day)
+    cumulative = np.concatenate(([0.0], np.cumsum(quantity)))
+
+    def average(at, window):
+        # Sum of the days in (at - window, at], over window days
+        total = cumulative[np.searchsorted(keys, at, 'right')] - cumulative[np.searchsorted(keys, at - window, 'right')]
+        return total / window
+
+    if series:
+        start = args.get('start_date')
+        keep = days >= (np.datetime64(parse_date(start), 'D').astype(np.int64) if start else first_day)
+        averages = {f'avg_{window}d': average(keys[keep], window).tolist() for window in YIELD_WINDOWS}
+        rows = zip(animal[keep].tolist(), days[keep].astype('datetime64[D]').astype(str).tolist(), quantity[keep].tolist())
+        return [
+            {'animal_id': animal_id, 'day': day, 'yield': amount, **{name: values[i] for name, values in averages.items()}}
+            for i, (animal_id, day, amount) in enumerate(rows)
+        ]
+
+    at = np.arange(len(animals)) * span + (as_of - first_day)
+    averages = {window: average(at, window) for window in YIELD_WINDOWS}
+
+    labels, (label_index,) = _group_index(group, animals)
+    counts = np.bincount(label_index, minlength=len(labels))
+    key = _label_key(group)
+    day = str(np.datetime64(int(as_of), 'D'))
+    columns = {f'avg_{window}d': (np.bincount(label_index, weights=values, minlength=len(labels)) / counts).tolist()
+               for window, values in averages.items()}
+    return [
+        {key: label, 'day': day, **{name: values[i] for name, values in columns.items()}}
+        for i, label in enumerate(labels.tolist())
+    ]
+
+
+def revenue(query_filters, args, group='animal'):
+    """Sales revenue and quantity sold per animal / breed and month."""
+    animal, day, amount, sold = _columns(
+        query_filters(select(DailySale.animal_id, _day(DailySale.day), DailySale.amount, DailySale.quantity_sold), DailySale, args),
+        (np.int64, 'datetime64[D]', np.float64, np.float64),
+    )
+    labels, (label_index,) = _group_index(group, animal)
+    months, month_index = np.unique(day.astype('datetime64[M]'), return_inverse=True)
+    cells, cell_index = np.unique(label_index * len(months) + month_index, return_inverse=True)
+    totals = np.bincount(cell_index, weights=amount)
+    quantities = np.bincount(cell_index, weights=sold)
+
+    key = _label_key(group)
+    labels, month_names = labels.tolist(), months.astype(str).tolist()
+    return [
+        {key: labels[cell // len(months)], 'month': month_names[cell % len(months)],
+         'revenue': total, 'quantity_sold': quantity}
+        for cell, total, quantity in zip(cells.tolist(), totals.tolist(), quantities.tolist())
+    ]
+
+
+def analytics(metric, query_filters, args):
+    """
+    GET /analytics/<metric>. query_filters(query, model, args) narrows a rollup
+    query (see pagination.apply_filters); args is the query string.
+    """
+    group = args.get('group', 'animal')
+    if group not in GROUPS:
+        raise ListParamsError(f'group must be one of: {", ".join(GROUPS)}')
+    product_type = args.get('type', 'Milk')
+    if metric == 'feed-conversion':
+        return feed_conversion(query_filters, args, product_type, group)
+    if metric == 'yield':
+        return yield_averages(query_filters, args, product_type, group, series=args.get('series') in ('1', 'true'))
+    return revenue(query_filters, args, group)
@@ -0,0 +1,251 @@
+# server/anomalies.py
+"""
+Streaming detection of sudden drops in daily yield (GET /alerts).
+
+Every (animal, product type) keeps an exponentially weighted moving average
+and variance of its daily totals in one yield_baselines row. A day is scored
+once it is complete - when the first record of a later day arrives, or when
+`flask close-yield-days` (run daily, e.g. from cron) finds it over - against
+the baseline of the days before it, and then folded into the baseline. So a
+new production costs one baseline read and write, however long the history.
+The sweep also opens the current day for every live animal, so a day without
+any record is scored the next morning as a zero-output day.
+
+A day more than ANOMALY_Z_THRESHOLD standard deviations below the average
+raises a YieldAlert and, when ANOMALY_HEALTH_STATUS is set, marks the animal
+with that health_status. Records for a day that was already scored, updates
+and deletes leave the baselines as they are; `flask rebuild-yield-baselines`
+recomputes them from the daily rollups.
+"""
+import math
+from collections import namedtuple
+from datetime import date
+
+import click
+from flask import current_app
+from sqlalchemy import delete, event, insert, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import app, db
+from dates import parse_date
+from models import Animal, DailyProduction, Production, YieldAlert, YieldBaseline
+from versions import touch
+
+
+# Floor for the standard deviation, as a fraction of the average: an animal
+# with a perfectly steady yield would otherwise alert on any small dip
+MIN_RELATIVE_STD = 0.05
+
+Settings = namedtuple('Settings', 'alpha threshold warmup health_status')
+
+# yield_baselines columns carried in a baseline's state dict
+STATE = ('day', 'day_total', 'mean', 'variance', 'days')
+
+
+def _settings():
+    config = current_app.config
+    return Settings(
+        2 / (config['ANOMALY_EWMA_SPAN'] + 1),
+        config['ANOMALY_Z_THRESHOLD'],
+        config['ANOMALY_WARMUP_DAYS'],
+        config['ANOMALY_HEALTH_STATUS'],
+    )
+
+
+def _close_day(state, settings):
+    """Score the open day against the baseline, then fold it in. Returns its z-score (None while warming up)."""
+    total, mean = state['day_total'], state['mean']
+    z_score = None
+    if state['days'] >= settings.warmup:
+        std = max(math.sqrt(state['variance']), MIN_RELATIVE_STD * mean, 1e-9)
+        z_score = (total - mean) / std
+
+    if state['days'] == 0:
+        state['mean'] = total
+    else:
+        diff = total - mean
+        step = settings.alpha * diff
+        state['mean'] = mean + step
+        state['variance'] = (1 - settings.alpha) * (state['variance'] + diff * step)
+    state['days'] += 1
+    return z_score
+
+
+def _score(state, settings, alerts, key):
+    """Close state's open day, adding an alert for it to alerts when it is low."""
+    expected = state['mean']
+    z_score = _close_day(state, settings)
+    if z_score is not None and z_score <= -settings.threshold:
+        alerts.append({
+            'animal_id': key[0], 'product_type': key[1], 'day': state['day'],
+            'quantity': state['day_total'], 'expected': expected, 'z_score': z_score,
+        })
+
+
+def _advance(state, day, quantity, settings, alerts, key):
+    """Fold one record into state (None for a new key) and return the new state."""
+    if state is None:
+        return {'day': day, 'day_total': quantity, 'mean': 0.0, 'variance': 0.0, 'days': 0}
+    if day == state['day']:
+        state['day_total'] += quantity
+    elif day > state['day']:
+        _score(state, settings, alerts, key)
+        state['day'], state['day_total'] = day, quantity
+    # else: a day that was already scored
+    return state
+
+
+def _save(session, states):
+    table = YieldBaseline.__table__
+    if session.get_bind().dialect.name == 'postgresql':
+        stmt = postgresql_insert(table)
+    else:
+        stmt = sqlite_insert(table)
+    keys = [column.name for column in table.primary_key]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={column.name: stmt.excluded[column.name] for column in table.columns if column.name not in keys},
+    )
+    session.execute(stmt, [
+        {'animal_id': animal_id, 'product_type': product_type, **state}
+        for (animal_id, product_type), state in states.items()
+    ])
+
+
+def _raise(session, alerts, settings):
+    # Statements rather than new / changed objects: this runs inside
+    # after_flush, where changes to objects would be discarded
+    animal_ids = sorted({alert['animal_id'] for alert in alerts})
+    session.execute(insert(YieldAlert), alerts)
+    if settings.health_status:
+        session.execute(
+            update(Animal)
+            .where(Animal.id.in_(animal_ids), Animal.health_status.is_distinct_from(settings.health_status))
+            .values(health_status=settings.health_status)
+        )
+    touch(session, YieldAlert, animal_ids)
+
+
+def observe(session, records):
+    """Fold (animal_id, product_type, day, quantity) records into the baselines, raising alerts."""
+    by_key = {}
+    for animal_id, product_type, day, quantity in records:
+        by_key.setdefault((animal_id, product_type), []).append((parse_date(day), quantity or 0))
+    if not by_key:
+        return
+
+    # Locked on PostgreSQL, so concurrent writers for an animal take turns
+    rows = session.execute(
+        select(YieldBaseline.__table__)
+        .where(tuple_(YieldBaseline.animal_id, YieldBaseline.product_type).in_(sorted(by_key)))
+        .with_for_update()
+    ).mappings()
+    states = {(row['animal_id'], row['product_type']): dict(row) for row in rows}
+
+    settings = _settings()
+    alerts = []
+    for key, entries in by_key.items():
+        state = states.get(key)
+        if state is not None:
+            state = {name: state[name] for name in STATE}
+        for day, quantity in sorted(entries, key=lambda entry: entry[0]):
+            state = _advance(state, day, quantity, settings, alerts, key)
+        states[key] = state
+
+    _save(session, {key: states[key] for key in by_key})
+    if alerts:
+        _raise(session, alerts, settings)
+
+
+@event.listens_for(db.session, 'after_flush')
+def observe_productions(session, flush_context):
+    # After the flush, so productions of an animal inserted with them have its
+    # animal_id; alerts and health_status changes go in with the next flush
+    observe(session, [
+        (obj.animal_id, obj.product_type, obj.production_date, obj.quantity)
+        for obj in session.new
+        if isinstance(obj, Production) and obj.deleted_at is None
+    ])
+
+
+def add_rows(session, source, rows):
+    """Fold rows written with a bulk INSERT (which skips flush events) into the baselines."""
+    if source is Production:
+        observe(session, [
+            (row['animal_id'], row['product_type'], row['production_date'], row['quantity'])
+            for row in rows
+        ])
+
+
+def close_days(session=None, as_of=None):
+    """
+    Score every open day before as_of (default today) and open as_of with
+    nothing produced yet, for every baseline of a live animal. Returns
+    (baselines closed, alerts raised).
+    """
+    session = session or db.session
+    as_of = as_of or date.today()
+    rows = session.execute(
+        select(YieldBaseline.__table__)
+        .join(Animal, Animal.id == YieldBaseline.animal_id)
+        .where(YieldBaseline.day < as_of, Animal.deleted_at.is_(None))
+        .with_for_update(of=YieldBaseline.__table__)
+    ).mappings()
+
+    settings = _settings()
+    states, alerts = {}, []
+    for row in rows:
+        key = (row['animal_id'], row['product_type'])
+        state = {name: row[name] for name in STATE}
+        _score(state, settings, alerts, key)
+        state['day'], state['day_total'] = as_of, 0.0
+        states[key] = state
+
+    if states:
+        _save(session, states)
+    if alerts:
+        _raise(session, alerts, settings)
+    session.commit()
+    return len(states), len(alerts)
+
+
+def rebuild(session=None):
+    """Recompute every baseline from daily_productions, adding any alert that is missing."""
+    session = session or db.session
+    settings = _settings()._replace(health_status=None)
+    existing = set(session.execute(select(YieldAlert.animal_id, YieldAlert.product_type, YieldAlert.day)).tuples())
+
+    states, alerts = {}, []
+    days = session.execute(
+        select(DailyProduction.animal_id, DailyProduction.product_type, DailyProduction.day, DailyProduction.quantity)
+        .order_by(DailyProduction.animal_id, DailyProduction.product_type, DailyProduction.day),
+        execution_options={'yield_per': current_app.config['EXPORT_BATCH_SIZE']},
+    )
+    for animal_id, product_type, day, quantity in days:
+        key = (animal_id, product_type)
+        states[key] = _advance(states.get(key), day, quantity, settings, alerts, key)
+
+    session.execute(delete(YieldBaseline))
+    if states:
+        _save(session, states)
+    for alert in alerts:
+        if (alert['animal_id'], alert['product_type'], alert['day']) not in existing:
+            session.add(YieldAlert(**alert))
+    session.commit()
+    return len(states), len(alerts)
+
+
+@app.cli.command('close-yield-days')
+@click.option('--as-of', help='first day left open, YYYY-MM-DD (default today)')
+def close_yield_days_command(as_of):
+    """Score every day before --as-of that is still open, including days with no production at all."""
+    closed, alerts = close_days(as_of=parse_date(as_of) if as_of else None)
+    click.echo(f'yield_baselines: {closed} days closed, {alerts} low-yield days')
+
+
+@app.cli.command('rebuild-yield-baselines')
+def rebuild_yield_baselines_command():
+    """Recompute the yield anomaly baselines (and missing alerts) from the daily rollups."""
+    baselines, alerts = rebuild()
+    click.echo(f'yield_baselines: {baselines} rows, {alerts} low-yield days')
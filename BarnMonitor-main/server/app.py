@@ -1,12 +1,29 @@
 # server/app.py
-from flask import jsonify, make_response, request, session
-from flask_bcrypt import Bcrypt
+from flask import Response, jsonify, make_response, request, send_from_directory, session, stream_with_context
 from flask_restful import Resource
-from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
-from models import Farmer, AnimalType, HealthRecord, Production, Sale, Animal, Feed  # Import all models
+from models import Farmer, AnimalType, HealthRecord, Production, Sale, Animal, Feed, YieldAlert  # Import all models
 from config import db, app, api  
+from dates import parse_date
+from pagination import ListParamsError, apply_filters, page_limit, paginate, list_response
+from queries import query_for, sparse_fieldset
+from rollups import PERIOD_FORMATS, REPORTS, report
+from bulk import BatchError, insert_batch, read_batch, validate
+from idempotency import IdempotencyConflict, idempotency_key, remember, stored_response
+from export import EXPORTS, FORMATS, export
+from cache import cached
+from versions import conditional
+from sync import changes, decode_token
+import representations  # JSON (orjson) or MessagePack, negotiated from Accept
+import compression  # gzip / brotli, negotiated from Accept-Encoding
+import sessions  # installs the configured session backend
+from passwords import PasswordHashingBusy, hash_password, verify_password
+from timeline import timeline
+from analytics import METRICS, analytics
+import anomalies  # scores every new production against its animal's baseline
+import metrics  # per-route request, SQL and session timings
+import profiling  # profiles requests sent with X-Profile
 import logging
 
 
@@ -26,9 +43,17 @@ class LoginResource(Resource):
             if not farmer:
                 return {'error': 'Invalid email or password'}, 401  # Unauthorized
 
-            # Check password
-            if not check_password_hash(farmer.password, data['password']):
+            # Check password (on the hashing pool, see passwords.py). End the
+            # transaction first so the pooled connection is not held while hashing
+            stored_hash = farmer.password
+            db.session.commit()
+            matches, rehashed = verify_password(stored_hash, data['password'])
+            if not matches:
                 return {'error': 'Invalid email or password'}, 401  # Unauthorized
+            if rehashed:
+                # Stored with an older method or cost; upgrade it now that we know the password
+                farmer.password = rehashed
+                db.session.commit()
             
             if farmer:
                 session['user_id'] = farmer.id               
@@ -39,6 +64,9 @@ class LoginResource(Resource):
                   
                       
 
+        except PasswordHashingBusy:
+            # Too many logins at once; tell the client to back off instead of queueing
+            return {'error': 'Too many logins in progress, please retry'}, 503, {'Retry-After': '1'}
         except Exception as e:
             # Handle any other exceptions
             return {'error': 'Failed to log in', 'details': str(e)}, 500
@@ -59,6 +87,8 @@ class SignupResource(Resource):
             existing_farmer = Farmer.query.filter_by(email=data['email']).first()
             if existing_farmer:
                 return {'error': 'Farmer with this email already exists.'}, 409  # Conflict
+            # End the transaction so the pooled connection is not held while hashing
+            db.session.commit()
 
             # Create a new farmer instance
             new_farmer = Farmer(
@@ -66,7 +96,7 @@ class SignupResource(Resource):
                 email=data['email'],
                 phone=data['phone'],
                 address=data['address'],
-                password=generate_password_hash(data['password'])  # Hash the password
+                password=hash_password(data['password'])  # Hash the password
             )
 
             # Add to the database
@@ -82,6 +112,8 @@ class SignupResource(Resource):
         except KeyError as e:
             # Handle missing fields
             return {'error': f'Missing field: {str(e)}'}, 400
+        except PasswordHashingBusy:
+            return {'error': 'Too many sign ups in progress, please retry'}, 503, {'Retry-After': '1'}
         except Exception as e:
             # Handle any other exceptions and roll back
             db.session.rollback()
@@ -119,9 +151,15 @@ class ClearSession(Resource):
 api.add_resource(ClearSession, '/clear_session')
 
 class Animals(Resource):
+    @conditional('animals')
+    @cached('animals')
     def get(self):
-        animals = [animal.to_dict() for animal in Animal.query.all()]         
-        return make_response(jsonify(animals), 200  )         
+        fields, include = sparse_fieldset()
+        try:
+            animals, next_cursor = paginate(apply_filters(query_for('animal', fields, include), Animal), Animal)
+        except ListParamsError as e:
+            return {'error': str(e)}, 400
+        return list_response([animal.to_dict(fields, include) for animal in animals], next_cursor)
     
     def post(self):
         name = request.get_json()['name']
@@ -134,7 +172,7 @@ class Animals(Resource):
         animal_type_id = request.get_json()['animal_type_id']
 
         try:        
-            birth_date = datetime.strptime(birth_date, '%Y-%m-%d').date()
+            birth_date = parse_date(birth_date)
         except ValueError:
             return jsonify({'error': 'Invalid date format. Please use YYYY-MM-DD'}), 400
 
@@ -153,10 +191,16 @@ class Animals(Resource):
 api.add_resource(Animals, '/animals')
 
 class AnimalById(Resource):
+    @conditional('animals')
+    @cached('animals')
     def get(self, id):
-        animal = Animal.query.filter_by(id=id).first()
+        fields, include = sparse_fieldset()
+        try:
+            animal = query_for('animal', fields, include).filter_by(id=id).first()
+        except ListParamsError as e:
+            return {'error': str(e)}, 400
         if animal:
-            return animal.to_dict(), 200
+            return animal.to_dict(fields, include), 200
         else:
             return make_response({"error": "Animal not found"}, 404)
 
@@ -197,13 +241,39 @@ class AnimalById(Resource):
 
 api.add_resource(AnimalById, '/animals/<int:id>')
 
+# Health checkups, feedings, productions and sales of one animal, merged by date
+class AnimalTimeline(Resource):
+    @conditional('timeline')
+    @cached('timeline')
+    def get(self, id):
+        if db.session.get(Animal, id) is None:
+            return {'error': 'Animal not found'}, 404
+        try:
+            events, next_cursor = timeline(id, request.args)
+        except ListParamsError as e:
+            return {'error': str(e)}, 400
+        return list_response(events, next_cursor)
+
+api.add_resource(AnimalTimeline, '/animals/<int:id>/timeline')
+
 class FarmerResource(Resource):
+    @conditional('farmers')
+    @cached('farmers')
     def get(self, id=None):
         if id:
-            # Fetch a specific farmer by ID
-            farmer = Farmer.query.get(id)
-            # Fetch a specific farmer by ID
-            farmer = Farmer.query.get(id)
+            fields, include = sparse_fieldset()
+            if fields is not None or include is not None:
+                # Sparse fieldset: only the requested columns and relationships (e.g. ?include=animals)
+                try:
+                    farmer = query_for('farmer', fields, include).filter_by(id=id).first()
+                except ListParamsError as e:
+                    return {'error': str(e)}, 400
+                if farmer:
+                    return farmer.to_dict(fields, include), 200
+                return {'message': 'Farmer not found'}, 404
+
+            # Fetch a specific farmer by ID, with animals and their records eager-loaded
+            farmer = query_for('farmer_detail').filter_by(id=id).first()
             if farmer:
                 farmer_data = farmer.to_dict()
                 farmer_data['animals'] = [animal.to_dict() for animal in farmer.animals]  # Assuming animals is a relationship
@@ -211,9 +281,12 @@ class FarmerResource(Resource):
             return {'message': 'Farmer not found'}, 404  # Return a simple dict                
         else:
             # Fetch all farmers
-            # Fetch all farmers
-            farmers = Farmer.query.all()
-            return [f.to_dict() for f in farmers], 200  # Return list of dicts directly
+            fields, include = sparse_fieldset()
+            try:
+                farmers, next_cursor = paginate(apply_filters(query_for('farmer', fields, include), Farmer), Farmer)
+            except ListParamsError as e:
+                return {'error': str(e)}, 400
+            return list_response([f.to_dict(fields, include) for f in farmers], next_cursor)
              
 
     def delete(self, id):
@@ -237,15 +310,23 @@ class FeedResource(Resource):
     # GET request handler
     
     # GET request handler
+    @conditional('feeds')
     def get(self, id=None):
+        fields, include = sparse_fieldset()
         if id:
-            feed = Feed.query.get(id)
+            try:
+                feed = query_for('feed', fields, include).filter_by(id=id).first()
+            except ListParamsError as e:
+                return {'error': str(e)}, 400
             if feed:
-                return jsonify(feed.to_dict())
+                return jsonify(feed.to_dict(fields, include))
             return jsonify({'message': 'Feed not found'}), 404
         else:
-            feeds = Feed.query.all()
-            return jsonify([f.to_dict() for f in feeds])
+            try:
+                feeds, next_cursor = paginate(apply_filters(query_for('feed', fields, include), Feed), Feed)
+            except ListParamsError as e:
+                return {'error': str(e)}, 400
+            return list_response([f.to_dict(fields, include) for f in feeds], next_cursor)
     
     # POST request handler
     
@@ -288,15 +369,24 @@ api.add_resource(FeedResource, '/feeds', '/feeds/<int:id>')
 
 # AnimalType Resource (CRUD for Animal Types)
 class AnimalTypeResource(Resource):
+    @conditional('animal_types')
+    @cached('animal_types')
     def get(self, id=None):
+        fields, include = sparse_fieldset()
         if id:
-            animal_type = AnimalType.query.get(id)
+            try:
+                animal_type = query_for('animal_type', fields, include).filter_by(id=id).first()
+            except ListParamsError as e:
+                return {'error': str(e)}, 400
             if animal_type:
-                return jsonify(animal_type.to_dict())
+                return jsonify(animal_type.to_dict(fields, include))
             return jsonify({'message': f'Animal Type with ID {id} does not exist'}), 404
         else:
-            types = AnimalType.query.all()
-            return jsonify([t.to_dict() for t in types])
+            try:
+                types, next_cursor = paginate(query_for('animal_type', fields, include), AnimalType)
+            except ListParamsError as e:
+                return {'error': str(e)}, 400
+            return list_response([t.to_dict(fields, include) for t in types], next_cursor)
 
     def post(self):
         try:
@@ -341,15 +431,23 @@ class AnimalTypeResource(Resource):
 
 # HealthRecord Resource (CRUD for Health Records)
 class HealthRecordResource(Resource):
+    @conditional('health_records')
     def get(self, id=None):
+        fields, include = sparse_fieldset()
         if id:
-            health_record = HealthRecord.query.get(id)
+            try:
+                health_record = query_for('health_record', fields, include).filter_by(id=id).first()
+            except ListParamsError as e:
+                return {'error': str(e)}, 400
             if health_record:
-                return jsonify(health_record.to_dict())
+                return jsonify(health_record.to_dict(fields, include))
             return jsonify({'message': f'Health Record with ID {id} does not exist'}), 404
         else:
-            records = HealthRecord.query.all()
-            return jsonify([r.to_dict() for r in records])
+            try:
+                records, next_cursor = paginate(apply_filters(query_for('health_record', fields, include), HealthRecord), HealthRecord)
+            except ListParamsError as e:
+                return {'error': str(e)}, 400
+            return list_response([r.to_dict(fields, include) for r in records], next_cursor)
         
     def post(self):
         try:
@@ -423,15 +521,23 @@ api.add_resource(HealthRecordResource, '/health_records', '/health_records/<int:
 
 # Production Routes
 class ProductionResource(Resource):
+    @conditional('productions')
     def get(self, id=None):
+        fields, include = sparse_fieldset()
         if id:
-            production = Production.query.get(id)
+            try:
+                production = query_for('production', fields, include).filter_by(id=id).first()
+            except ListParamsError as e:
+                return {'error': str(e)}, 400
             if production:
-                return jsonify(production.to_dict())
+                return jsonify(production.to_dict(fields, include))
             return jsonify({'message': 'Production record not found'}), 404
         else:
-            productions = Production.query.all()
-            return jsonify([p.to_dict() for p in productions])
+            try:
+                productions, next_cursor = paginate(apply_filters(query_for('production', fields, include), Production), Production)
+            except ListParamsError as e:
+                return {'error': str(e)}, 400
+            return list_response([p.to_dict(fields, include) for p in productions], next_cursor)
 
     def post(self):
         data = request.get_json()
@@ -473,15 +579,23 @@ class ProductionResource(Resource):
     
 # Sale Routes
 class SaleResource(Resource):
+    @conditional('sales')
     def get(self, id=None):
+        fields, include = sparse_fieldset()
         if id:
-            sale = Sale.query.get(id)
+            try:
+                sale = query_for('sale', fields, include).filter_by(id=id).first()
+            except ListParamsError as e:
+                return {'error': str(e)}, 400
             if sale:
-                return jsonify(sale.to_dict())
+                return jsonify(sale.to_dict(fields, include))
             return jsonify({'message': 'Sale record not found'}), 404
         else:
-            sales = Sale.query.all()
-            return jsonify([s.to_dict() for s in sales])
+            try:
+                sales, next_cursor = paginate(apply_filters(query_for('sale', fields, include), Sale), Sale)
+            except ListParamsError as e:
+                return {'error': str(e)}, 400
+            return list_response([s.to_dict(fields, include) for s in sales], next_cursor)
 
     def post(self):
         data = request.get_json()
@@ -528,6 +642,198 @@ class SaleResource(Resource):
 api.add_resource(ProductionResource, '/productions', '/productions/<int:id>')
 api.add_resource(SaleResource, '/sales', '/sales/<int:id>')
 
+# Bulk ingestion (JSON array or NDJSON, all-or-nothing, optional Idempotency-Key)
+def replayed_response(body, status):
+    response = make_response(jsonify(body), status)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+class BulkResource(Resource):
+    def post(self, kind):
+        try:
+            key = idempotency_key()
+            stored = stored_response(key) if key else None
+        except IdempotencyConflict as e:
+            return {'error': str(e)}, 409
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        if stored:
+            return replayed_response(*stored)
+
+        try:
+            rows, errors = read_batch()
+        except BatchError as e:
+            return {'error': str(e)}, 400
+
+        values, errors = validate(kind, rows, errors)
+        if errors:
+            return {
+                'error': f'{len(errors)} of {len(rows)} rows are invalid; nothing was written',
+                'errors': errors,
+            }, 400
+
+        ids = insert_batch(kind, values)
+        body = {'inserted': len(ids), 'ids': ids}
+        if key:
+            remember(key, body, 201)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            # A concurrent retry with the same key committed first
+            stored = stored_response(key) if key else None
+            if stored:
+                return replayed_response(*stored)
+            raise
+        return make_response(jsonify(body), 201)
+
+api.add_resource(BulkResource, '/<any(feeds, productions, health_records):kind>/bulk')
+
+
+# Streaming export (CSV or NDJSON, same filters as the list endpoints)
+class ExportResource(Resource):
+    def get(self, resource):
+        if resource not in EXPORTS:
+            return {'error': f'Unknown resource: {resource}'}, 404
+
+        output = request.args.get('format', 'csv')
+        if output not in FORMATS:
+            return {'error': f'format must be one of: {", ".join(FORMATS)}'}, 400
+
+        try:
+            fields, _ = sparse_fieldset()
+            chunks = export(resource, output, apply_filters, fields)
+        except ListParamsError as e:
+            return {'error': str(e)}, 400
+
+        return Response(
+            stream_with_context(chunks),
+            mimetype=FORMATS[output],
+            headers={'Content-Disposition': f'attachment; filename={resource}.{output}'},
+        )
+
+api.add_resource(ExportResource, '/export/<string:resource>')
+
+
+# Delta sync for offline clients
+class SyncResource(Resource):
+    def get(self):
+        try:
+            since = request.args.get('since')
+            cursor = request.args.get('cursor')
+            if since and cursor:
+                return {'error': 'cursor only pages a full sync, without since'}, 400
+            limit = None if since else page_limit(request.args)
+            result, next_cursor = changes(decode_token(since) if since else None, apply_filters, cursor, limit)
+        except ListParamsError as e:
+            return {'error': str(e)}, 400
+        return list_response(result, next_cursor)
+
+api.add_resource(SyncResource, '/sync')
+
+
+# Reports (week / month / year totals from the daily rollup tables)
+class ReportResource(Resource):
+    def get(self, kind):
+        if kind not in REPORTS:
+            return {'error': f'Unknown report: {kind}'}, 404
+
+        period = request.args.get('period', 'month')
+        if period not in PERIOD_FORMATS:
+            return {'error': f'period must be one of: {", ".join(PERIOD_FORMATS)}'}, 400
+
+        try:
+            rows = report(kind, period, apply_filters, request.args.get('type'))
+        except ListParamsError as e:
+            return {'error': str(e)}, 400
+        return make_response(jsonify(rows), 200)
+
+api.add_resource(ReportResource, '/reports/<string:kind>')
+
+
+# Feed conversion, rolling yield and monthly revenue, per animal or breed (see analytics.py)
+class AnalyticsResource(Resource):
+    @conditional('animals')
+    @cached('animals')
+    def get(self, metric):
+        if metric not in METRICS:
+            return {'error': f'Unknown metric: {metric}'}, 404
+        try:
+            rows = analytics(metric, apply_filters, request.args)
+        except ListParamsError as e:
+            return {'error': str(e)}, 400
+        return make_response(jsonify(rows), 200)
+
+api.add_resource(AnalyticsResource, '/analytics/<string:metric>')
+
+
+# Low-yield days flagged by the anomaly detector (see anomalies.py)
+def alert_query(fields=None, include=None):
+    # The join hides alerts of deleted animals
+    return query_for('yield_alert', fields, include).join(YieldAlert.animal)
+
+class AlertResource(Resource):
+    @conditional('yield_alerts')
+    def get(self, id=None):
+        fields, include = sparse_fieldset()
+        try:
+            if id:
+                alert = alert_query(fields, include).filter(YieldAlert.id == id).first()
+                if not alert:
+                    return {'error': 'Alert not found'}, 404
+                return jsonify(alert.to_dict(fields, include))
+
+            query = apply_filters(alert_query(fields, include), YieldAlert)
+            acknowledged = request.args.get('acknowledged')
+            if acknowledged in ('true', '1'):
+                query = query.filter(YieldAlert.acknowledged_at.isnot(None))
+            elif acknowledged in ('false', '0'):
+                query = query.filter(YieldAlert.acknowledged_at.is_(None))
+            elif acknowledged is not None:
+                return {'error': 'acknowledged must be true or false'}, 400
+            alerts, next_cursor = paginate(query, YieldAlert)
+            return list_response([alert.to_dict(fields, include) for alert in alerts], next_cursor)
+        except ListParamsError as e:
+            return {'error': str(e)}, 400
+
+    def patch(self, id):
+        alert = alert_query().filter(YieldAlert.id == id).first()
+        if not alert:
+            return {'error': 'Alert not found'}, 404
+        data = request.get_json()
+        if not isinstance(data.get('acknowledged'), bool):
+            return {'error': 'acknowledged must be true or false'}, 400
+        if data['acknowledged'] and alert.acknowledged_at is None:
+            alert.acknowledged_at = datetime.utcnow()
+        elif not data['acknowledged']:
+            alert.acknowledged_at = None
+        db.session.commit()
+        return make_response(jsonify(alert.to_dict()), 200)
+
+api.add_resource(AlertResource, '/alerts', '/alerts/<int:id>')
+
+
+# Prometheus scrape target (see metrics.py)
+class MetricsResource(Resource):
+    def get(self):
+        if not app.config['METRICS_ENABLED'] or not metrics.authorized():
+            return {'error': 'Not found'}, 404
+        return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+api.add_resource(MetricsResource, '/metrics')
+
+
+# Profiles saved by X-Profile requests (see profiling.py)
+class ProfileResource(Resource):
+    def get(self, profile_id):
+        if not profiling.authorized():
+            return {'error': 'Not found'}, 404
+        if not profiling.PROFILE_ID.match(profile_id):
+            return {'error': 'Invalid profile id'}, 400
+        return send_from_directory(app.config['PROFILE_DIR'], profile_id, as_attachment=True)
+
+api.add_resource(ProfileResource, '/profiles/<string:profile_id>')
+
 
 if __name__ == '__main__':
     with app.app_context():  
@@ -0,0 +1,126 @@
+# server/benchmarks/analytics.py
+"""
+Time to compute the /analytics metrics with analytics.py (NumPy over the
+rollup tables) vs a Python loop over the ORM objects they summarize.
+
+Synthetic animals with a daily milk production each, plus feedings
+and sales, are inserted inside a transaction that is rolled back at the end,
+so the configured database is left untouched:
+
+    python -m benchmarks.analytics [--productions 1000000] [--animals 1000] [--skip-orm]
+"""
+import argparse
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+from sqlalchemy import insert, select
+
+from config import app, db
+from analytics import feed_conversion, revenue, yield_averages
+from models import Animal, Feed, Production, Sale
+from pagination import apply_filters
+import rollups
+
+BREEDS = ('Holstein', 'Jersey', 'Ayrshire', 'Guernsey', 'Brown Swiss')
+FIRST_DAY = date(2021, 1, 1)
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def _insert(animals, productions):
+    tag = int(time.time())
+    db.session.execute(insert(Animal), [
+        {'name': f'bench-{tag}-{i}', 'breed': BREEDS[i % len(BREEDS)], 'birth_date': date(2018, 1, 1)}
+        for i in range(animals)
+    ])
+    ids = db.session.scalars(select(Animal.id).where(Animal.name.like(f'bench-{tag}-%'))).all()
+    days = max(1, productions // len(ids))
+    for start in range(0, days, 50):
+        batch = range(start, min(days, start + 50))
+        for model, rows in (
+            (Production, [
+                {'animal_id': animal_id, 'product_type': 'Milk', 'quantity': 10 + (animal_id + day) % 15,
+                 'production_date': FIRST_DAY + timedelta(days=day)}
+                for day in batch for animal_id in ids
+            ]),
+            (Feed, [
+                {'animal_id': animal_id, 'feed_type': 'Hay', 'quantity': 4 + (animal_id * day) % 5,
+                 'date': FIRST_DAY + timedelta(days=day)}
+                for day in batch if day % 5 == 0 for animal_id in ids
+            ]),
+            (Sale, [
+                {'animal_id': animal_id, 'product_type': 'Milk', 'quantity_sold': 50, 'amount': 25.0 + animal_id % 7,
+                 'sale_date': FIRST_DAY + timedelta(days=day)}
+                for day in batch if day % 7 == 0 for animal_id in ids
+            ]),
+        ):
+            if rows:
+                db.session.execute(insert(model), rows)
+                rollups.add_rows(db.session, model, rows)
+    return len(ids) * days
+
+
+def _orm_feed_conversion():
+    milk, feed = defaultdict(float), defaultdict(float)
+    for production in Production.query.filter(Production.product_type == 'Milk'):
+        milk[production.animal_id] += production.quantity
+    for record in Feed.query:
+        feed[record.animal_id] += record.quantity
+    return {animal_id: milk[animal_id] / feed[animal_id] for animal_id in milk if feed[animal_id]}
+
+
+def _orm_yield():
+    daily = defaultdict(lambda: defaultdict(float))
+    for production in Production.query.filter(Production.product_type == 'Milk'):
+        daily[production.animal_id][production.production_date] += production.quantity
+    as_of = max(day for days in daily.values() for day in days)
+    return {
+        animal_id: [sum(days.get(as_of - timedelta(days=offset), 0) for offset in range(window)) / window for window in (7, 30)]
+        for animal_id, days in daily.items()
+    }
+
+
+def _orm_revenue():
+    totals = defaultdict(float)
+    for sale in Sale.query:
+        totals[(sale.animal_id, sale.sale_date.strftime('%Y-%m'))] += sale.amount
+    return totals
+
+
+def run(productions, animals, skip_orm):
+    with app.app_context():
+        try:
+            inserted, elapsed = _timed(lambda: _insert(animals, productions))
+            print(f'inserted {inserted} productions for {animals} animals in {elapsed:.1f}s')
+            db.session.expire_all()
+
+            metrics = (
+                ('feed-conversion', lambda: feed_conversion(apply_filters, {}), _orm_feed_conversion),
+                ('yield', lambda: yield_averages(apply_filters, {}), _orm_yield),
+                ('yield by breed', lambda: yield_averages(apply_filters, {}, group='breed'), None),
+                ('revenue', lambda: revenue(apply_filters, {}), _orm_revenue),
+            )
+            for name, vectorized, orm in metrics:
+                rows, numpy_time = _timed(vectorized)
+                line = f'{name:<16} numpy {numpy_time * 1000:8.1f}ms ({len(rows)} rows)'
+                if orm and not skip_orm:
+                    _, orm_time = _timed(orm)
+                    db.session.expunge_all()
+                    line += f'   orm loop {orm_time * 1000:9.1f}ms   x{orm_time / numpy_time:.0f}'
+                print(line)
+        finally:
+            db.session.rollback()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--productions', type=int, default=1_000_000)
+    parser.add_argument('--animals', type=int, default=1000)
+    parser.add_argument('--skip-orm', action='store_true', help='only time analytics.py')
+    args = parser.parse_args()
+    run(args.productions, args.animals, args.skip_orm)
@@ -0,0 +1,69 @@
+# server/benchmarks/encodings.py
+"""
+Bytes on the wire, server time and client decode time per response encoding:
+JSON or MessagePack (Accept), each plain, gzip and brotli (Accept-Encoding).
+
+Runs in-process with the response cache off, logged in as the first farmer
+(password123, see seed.py and generate.py):
+
+    python -m benchmarks.encodings [--repeat 5] [--path /productions ...]
+"""
+import argparse
+import gzip
+import time
+
+import msgspec
+import orjson
+from sqlalchemy import select
+
+from config import app, db
+from models import Farmer
+import app as routes  # noqa: F401  registers the resources
+from compression import brotli
+
+PASSWORD = 'password123'
+PATHS = ['/animals', '/productions', '/sales', '/feeds']
+ACCEPT = {'json': 'application/json', 'msgpack': 'application/msgpack'}
+DECODE = {'json': orjson.loads, 'msgpack': msgspec.msgpack.decode}
+DECOMPRESS = {'identity': lambda data: data, 'gzip': gzip.decompress}
+if brotli is not None:
+    DECOMPRESS['br'] = brotli.decompress
+
+
+def _best(fn, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(paths, repeat):
+    app.config['CACHE_BACKEND'] = None
+    with app.app_context():
+        email = db.session.scalar(select(Farmer.email).order_by(Farmer.id).limit(1))
+        if email is None:
+            print('No farmers in the database; run seed.py or generate.py first')
+            return
+    client = app.test_client()
+    client.post('/login', json={'email': email, 'password': PASSWORD})
+
+    print(f"{'path':<14} {'format':<8} {'encoding':<9} {'bytes':>10} {'server':>9} {'decode':>9}")
+    for path in paths:
+        for name, accept in ACCEPT.items():
+            for encoding, decompress in DECOMPRESS.items():
+                headers = {'Accept': accept, 'Accept-Encoding': encoding}
+                server, response = _best(lambda: client.get(path, headers=headers), repeat)
+                body = response.get_data()
+                decode, _ = _best(lambda: DECODE[name](decompress(body)), repeat)
+                print(f'{path:<14} {name:<8} {encoding:<9} {len(body):>10} {server * 1000:>7.1f}ms {decode * 1000:>7.1f}ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5, help='runs per combination; the best is shown')
+    parser.add_argument('--path', action='append', help=f"route to measure (repeatable, default {' '.join(PATHS)})")
+    args = parser.parse_args()
+    run(args.path or PATHS, args.repeat)
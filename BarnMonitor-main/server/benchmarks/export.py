@@ -0,0 +1,80 @@
+# server/benchmarks/export.py
+"""
+Peak memory of /export/sales (streamed) vs building the whole list of the
+same flat rows and one JSON string, for growing row counts.
+
+Synthetic sales are inserted inside a transaction that is rolled back at the
+end, so the configured database is left untouched:
+
+    python -m benchmarks.export [rows ...]
+"""
+import json
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select
+
+from config import app, db
+from export import export
+from models import Animal, Sale
+from serializers import SALE_ROW
+
+
+def _measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, peak, elapsed
+
+
+def _streamed():
+    return sum(len(chunk) for chunk in export('sales', 'ndjson', lambda query, model: query))
+
+
+def _materialized():
+    return len(json.dumps([SALE_ROW.dump(sale) for sale in Sale.query.all()]))
+
+
+def run(sizes):
+    with app.app_context():
+        animal_id = db.session.scalar(select(Animal.id).limit(1))
+        if animal_id is None:
+            print('No animals in the database; run seed.py first')
+            return
+
+        try:
+            inserted = db.session.scalar(select(func.count(Sale.id)))
+            for size in sizes:
+                missing = size - inserted
+                if missing > 0:
+                    db.session.execute(insert(Sale), [
+                        {
+                            'animal_id': animal_id,
+                            'product_type': 'Milk',
+                            'quantity_sold': i % 50,
+                            'amount': i * 0.5,
+                            'sale_date': date(2020, 1, 1) + timedelta(days=i % 1500),
+                        }
+                        for i in range(missing)
+                    ])
+                    inserted = size
+                db.session.expire_all()
+
+                streamed = _measure(_streamed)
+                materialized = _measure(_materialized)
+                print(
+                    f'rows={inserted:<8} '
+                    f'streamed peak={streamed[1] / 2**20:7.1f}MiB {streamed[2]:6.2f}s  '
+                    f'list peak={materialized[1] / 2**20:7.1f}MiB {materialized[2]:6.2f}s'
+                )
+        finally:
+            db.session.rollback()
+
+
+if __name__ == '__main__':
+    run([int(arg) for arg in sys.argv[1:]] or [10000, 50000, 100000])
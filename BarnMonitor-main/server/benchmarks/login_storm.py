@@ -0,0 +1,94 @@
+# server/benchmarks/login_storm.py
+"""
+Latency of an unrelated endpoint (GET /feeds?limit=50) while many threads
+log in at once, with hashing inline on the request threads and on the
+bounded pool (see passwords.py).
+
+Runs in-process with one thread per client, like a threaded gunicorn worker.
+Logs in as the first seeded farmer, so run seed.py first; the hash method is
+set to the stored hash's, so no password is rewritten:
+
+    python -m benchmarks.login_storm [--clients 16] [--seconds 10] [--workers N]
+"""
+import argparse
+import threading
+import time
+
+from sqlalchemy import select
+
+from config import app, db
+from models import Farmer
+import app as routes  # noqa: F401  registers the resources
+from passwords import get_hasher
+
+PASSWORD = 'password123'  # see seed.py
+PROBE = '/feeds?limit=50'
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def _storm(email, stop, results):
+    client = app.test_client()
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = client.post('/login', json={'email': email, 'password': PASSWORD})
+        results.append((response.status_code, time.perf_counter() - started))
+        if response.status_code == 503:
+            # Back off like a well-behaved client
+            stop.wait(float(response.headers.get('Retry-After', 1)))
+
+
+def _probe(stop, latencies):
+    client = app.test_client()
+    while not stop.is_set():
+        started = time.perf_counter()
+        client.get(PROBE)
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.01)
+
+
+def run(clients, seconds, workers):
+    with app.app_context():
+        farmer = db.session.scalars(select(Farmer).order_by(Farmer.id)).first()
+        if farmer is None:
+            print('No farmers in the database; run seed.py first')
+            return
+        email, method = farmer.email, farmer.password.split('$', 1)[0]
+
+    app.config['PASSWORD_HASH_METHOD'] = method
+    for label, pool_workers in (('inline', 0), (f'pool({workers})', workers)):
+        app.config['PASSWORD_HASH_WORKERS'] = pool_workers
+        app.extensions.pop('password_hasher', None)
+        with app.app_context():
+            get_hasher()
+
+        stop = threading.Event()
+        logins, latencies = [], []
+        threads = [threading.Thread(target=_storm, args=(email, stop, logins)) for _ in range(clients)]
+        threads.append(threading.Thread(target=_probe, args=(stop, latencies)))
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        ok = [elapsed for status, elapsed in logins if status == 200]
+        busy = sum(1 for status, _ in logins if status == 503)
+        print(
+            f'{label:<10} {PROBE} p50 {_percentile(latencies, 0.5) * 1000:7.1f}ms '
+            f'p99 {_percentile(latencies, 0.99) * 1000:7.1f}ms   '
+            f'logins {len(ok) / seconds:6.1f}/s p99 {_percentile(ok, 0.99) * 1000:7.1f}ms  503s {busy}'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=app.config['PASSWORD_HASH_WORKERS'])
+    args = parser.parse_args()
+    run(args.clients, args.seconds, args.workers)
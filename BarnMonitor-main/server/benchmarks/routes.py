@@ -0,0 +1,361 @@
+# server/benchmarks/routes.py
+"""
+Throughput and p50 / p95 / p99 latency of every route in app.py.
+
+Each route is requested --requests times (or for at most --max-seconds) by
+--concurrency threads, through the Flask test client or, with --url, over
+HTTP against a running server (e.g. gunicorn on the same database). Read routes and the session routes run
+by default; --writes adds the POST / PUT / PATCH / DELETE routes, which
+change the data, so run them against generated data (python generate.py).
+
+Results are saved as JSON and can be compared with an earlier run; the exit
+status is 1 when a route's p50 got slower by more than --tolerance:
+
+    python -m benchmarks.routes --save before
+    python -m benchmarks.routes --compare before [--only reports]
+"""
+import argparse
+import http.client
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+from itertools import count
+from urllib.parse import urlsplit
+
+from sqlalchemy import func, select
+
+from config import app, db
+from models import Animal, AnimalType, Farmer, Feed, HealthRecord, Production, Sale, YieldAlert
+import app as routes  # noqa: F401  registers the resources
+from sync import encode_token
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+PASSWORD = 'password123'  # see generate.py / seed.py
+
+# path and body are format strings / values, or callables (fixtures, n) for per-request values
+Route = namedtuple('Route', 'name method path body write session', defaults=(None, False, False))
+
+_unique = count()
+
+
+def _production(f, n):
+    return {'animal_id': f['animal_id'], 'product_type': 'Milk', 'quantity': 20, 'production_date': f['today']}
+
+
+ROUTES = [
+    Route('login', 'POST', '/login', lambda f, n: {'email': f['email'], 'password': PASSWORD}),
+    Route('check_session', 'GET', '/check_session', session=True),
+    Route('animals', 'GET', '/animals?limit=100'),
+    Route('animals by farmer', 'GET', '/animals?farmer_id={farmer_id}'),
+    Route('animal', 'GET', '/animals/{animal_id}'),
+    Route('animal timeline', 'GET', '/animals/{animal_id}/timeline?limit=100'),
+    Route('farmers', 'GET', '/farmers?limit=100'),
+    Route('farmer', 'GET', '/farmers/{farmer_id}'),
+    Route('feeds', 'GET', '/feeds?limit=100'),
+    Route('feed', 'GET', '/feeds/{feed_id}'),
+    Route('animal types', 'GET', '/animal_types'),
+    Route('animal type', 'GET', '/animal_types/{animal_type_id}'),
+    Route('health records', 'GET', '/health_records?limit=100'),
+    Route('health record', 'GET', '/health_records/{health_record_id}'),
+    Route('productions', 'GET', '/productions?limit=100'),
+    Route('productions window', 'GET', '/productions?animal_id={animal_id}&start_date={month_ago}&end_date={today}'),
+    Route('production', 'GET', '/productions/{production_id}'),
+    Route('sales', 'GET', '/sales?limit=100'),
+    Route('sale', 'GET', '/sales/{sale_id}'),
+    Route('export', 'GET', '/export/productions?format=csv&farmer_id={farmer_id}&start_date={month_ago}'),
+    Route('sync', 'GET', '/sync?farmer_id={farmer_id}&since={sync_token}'),
+    Route('report', 'GET', '/reports/production?period=month&farmer_id={farmer_id}'),
+    Route('report all', 'GET', '/reports/sales?period=week&start_date={year_ago}'),
+    Route('feed conversion', 'GET', '/analytics/feed-conversion?farmer_id={farmer_id}'),
+    Route('yield', 'GET', '/analytics/yield?farmer_id={farmer_id}'),
+    Route('revenue', 'GET', '/analytics/revenue?group=breed&start_date={year_ago}'),
+    Route('alerts', 'GET', '/alerts?limit=100'),
+    Route('logout', 'DELETE', '/logout', session=True),
+    Route('clear session', 'DELETE', '/clear_session', session=True),
+
+    Route('signup', 'POST', '/signup', lambda f, n: {
+        'name': 'Bench Farmer', 'email': f'bench{next(_unique)}-{time.time_ns()}@example.com',
+        'phone': '555-0100', 'address': '1 Bench Road', 'password': PASSWORD,
+    }, write=True),
+    Route('create animal', 'POST', '/animals', lambda f, n: {
+        'name': f'bench {next(_unique)}-{time.time_ns()}', 'breed': 'Jersey', 'age': 3, 'health_status': 'Healthy',
+        'birth_date': '2020-01-01', 'image': None, 'farmer_id': f['farmer_id'], 'animal_type_id': f['animal_type_id'],
+    }, write=True),
+    Route('update animal', 'PATCH', '/animals/{animal_id}', {'age': 4}, write=True),
+    Route('create feed', 'POST', '/feeds', lambda f, n: {
+        'animal_id': f['animal_id'], 'feed_type': 'Hay', 'quantity': 10, 'date': f['today'],
+    }, write=True),
+    Route('create animal type', 'POST', '/animal_types', lambda f, n: {
+        'type_name': f'Bench {next(_unique)}-{time.time_ns()}', 'description': 'benchmark',
+    }, write=True),
+    Route('replace animal type', 'PUT', '/animal_types/{animal_type_id}', {'type_name': 'Dairy', 'description': 'Dairy animals for milk production'}, write=True),
+    Route('create health record', 'POST', '/health_records', lambda f, n: {
+        'name': f['animal_name'], 'checkup_date': f['today'], 'treatment': 'Routine Checkup', 'notes': '', 'vet_name': 'Dr. Lee',
+    }, write=True),
+    Route('update health record', 'PATCH', '/health_records/{health_record_id}', lambda f, n: {'name': f['animal_name'], 'notes': 'benchmark'}, write=True),
+    Route('create production', 'POST', '/productions', _production, write=True),
+    Route('update production', 'PATCH', '/productions/{production_id}', {'quantity': 21}, write=True),
+    Route('create sale', 'POST', '/sales', lambda f, n: {
+        'animal_id': f['animal_id'], 'product_type': 'Milk', 'quantity_sold': 10, 'sale_date': f['today'], 'amount': 5.0,
+    }, write=True),
+    Route('update sale', 'PATCH', '/sales/{sale_id}', {'amount': 6.0}, write=True),
+    Route('bulk productions', 'POST', '/productions/bulk', lambda f, n: [_production(f, n)] * 100, write=True),
+    Route('acknowledge alert', 'PATCH', '/alerts/{alert_id}', {'acknowledged': True}, write=True),
+    # Deletes use a different existing row for every request
+    Route('delete feed', 'DELETE', lambda f, n: f"/feeds/{f['feed_ids'][n]}", write=True),
+    Route('delete health record', 'DELETE', lambda f, n: f"/health_records/{f['health_record_ids'][n]}", write=True),
+    Route('delete sale', 'DELETE', lambda f, n: f"/sales/{f['sale_ids'][n]}", write=True),
+    Route('delete production', 'DELETE', lambda f, n: f"/productions/{f['production_ids'][n]}", write=True),
+    Route('delete animal', 'DELETE', lambda f, n: f"/animals/{f['animal_ids'][n]}", write=True),
+    Route('delete farmer', 'DELETE', lambda f, n: f"/farmers/{f['farmer_ids'][n]}", write=True),
+]
+
+
+def _first(model):
+    return db.session.scalar(select(func.min(model.id)))
+
+
+def _last(model, n):
+    # Deletes take rows from the end, away from the ids the reads use
+    return db.session.scalars(select(model.id).order_by(model.id.desc()).limit(n)).all()
+
+
+def fixtures(requests):
+    """Ids and dates the route paths and bodies are filled in with."""
+    with app.app_context():
+        animal_id = db.session.scalar(select(Production.animal_id).order_by(Production.id).limit(1)) or _first(Animal)
+        farmer_id = db.session.scalar(select(Animal.farmer_id).where(Animal.id == animal_id))
+        if animal_id is None or farmer_id is None:
+            raise SystemExit('No data in the database; run generate.py (or seed.py) first')
+        today = db.session.scalar(select(func.max(Production.production_date)))
+        return {
+            'animal_id': animal_id,
+            'animal_name': db.session.scalar(select(Animal.name).where(Animal.id == animal_id)),  # health record writes name the animal
+            'farmer_id': farmer_id,
+            'email': db.session.scalar(select(Farmer.email).where(Farmer.id == farmer_id)),
+            'animal_type_id': _first(AnimalType),
+            'feed_id': _first(Feed),
+            'health_record_id': _first(HealthRecord),
+            'production_id': _first(Production),
+            'sale_id': _first(Sale),
+            'alert_id': _first(YieldAlert),
+            'today': today.isoformat(),
+            'month_ago': (today - timedelta(days=30)).isoformat(),
+            'year_ago': (today - timedelta(days=365)).isoformat(),
+            'sync_token': encode_token(datetime.utcnow() - timedelta(days=1)),
+            'feed_ids': _last(Feed, requests),
+            'health_record_ids': _last(HealthRecord, requests),
+            'sale_ids': _last(Sale, requests),
+            'production_ids': _last(Production, requests),
+            'animal_ids': [i for i in _last(Animal, requests + 1) if i != animal_id][:requests],
+            'farmer_ids': [i for i in _last(Farmer, requests + 1) if i != farmer_id][:requests],
+        }
+
+
+class TestClient:
+    def __init__(self):
+        self.client = app.test_client()
+
+    def request(self, method, path, body):
+        response = self.client.open(path, method=method, json=body)
+        response.get_data()
+        response.close()
+        return response.status_code
+
+
+class HttpClient:
+    """One keep-alive connection per thread, with the session cookie carried along."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        self.prefix = parts.path.rstrip('/')
+        self.cookie = None
+
+    def request(self, method, path, body):
+        headers = {}
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        payload = None if body is None else json.dumps(body)
+        self.connection.request(method, self.prefix + path, body=payload, headers=headers)
+        response = self.connection.getresponse()
+        response.read()
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        return response.status
+
+
+def _resolve(route, fixture, n):
+    path = route.path(fixture, n) if callable(route.path) else route.path.format(**fixture)
+    body = route.body(fixture, n) if callable(route.body) else route.body
+    return path, body
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def run_route(route, fixture, make_client, requests, concurrency, warmup, max_seconds):
+    """Stats for one route: throughput, latency percentiles (ms) and status counts."""
+    latencies, statuses = [], Counter()
+    numbers = iter(range(requests))
+    lock = threading.Lock()
+
+    def worker(client):
+        while time.perf_counter() < deadline:
+            with lock:
+                n = next(numbers, None)
+            if n is None:
+                return
+            try:
+                path, body = _resolve(route, fixture, n)
+            except IndexError:
+                return  # no rows left to delete
+            started = time.perf_counter()
+            status = client.request(route.method, path, body)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+
+    clients = [make_client() for _ in range(concurrency)]
+    for client in clients:
+        if route.session:
+            client.request('POST', '/login', {'email': fixture['email'], 'password': PASSWORD})
+    # Deletes cannot repeat a request, and their ids are only enough for the measured ones
+    for n in range(0 if route.write else warmup):
+        client = clients[n % len(clients)]
+        client.request(route.method, *_resolve(route, fixture, n))
+
+    threads = [threading.Thread(target=worker, args=(client,)) for client in clients]
+    started = time.perf_counter()
+    # Slow routes stop early rather than stall the suite; their request count shows it
+    deadline = started + max_seconds
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    return {
+        'method': route.method,
+        'requests': len(latencies),
+        'throughput': len(latencies) / wall if wall else 0.0,
+        'p50': _percentile(latencies, 0.50) * 1000,
+        'p95': _percentile(latencies, 0.95) * 1000,
+        'p99': _percentile(latencies, 0.99) * 1000,
+        'statuses': {str(status): n for status, n in sorted(statuses.items())},
+    }
+
+
+def _results_path(name):
+    return name if name.endswith('.json') else os.path.join(RESULTS_DIR, f'{name}.json')
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _sizes():
+    with app.app_context():
+        return {model.__tablename__: db.session.scalar(select(func.count()).select_from(model))
+                for model in (Farmer, Animal, Feed, HealthRecord, Production, Sale)}
+
+
+def compare(results, meta, baseline, tolerance):
+    """Print the change against baseline; returns the names of routes whose p50 regressed."""
+    regressions = []
+    print(f"\ncompared with {baseline['meta'].get('commit')} ({baseline['meta']['started']})")
+    for key in ('target', 'database', 'concurrency', 'cache', 'rows'):
+        if baseline['meta'].get(key) != meta.get(key):
+            print(f"warning: {key} differs: {baseline['meta'].get(key)} -> {meta.get(key)}")
+    for name, now in results.items():
+        before = baseline['routes'].get(name)
+        if not before or not before['p50']:
+            continue
+        change = now['p50'] / before['p50'] - 1
+        flag = ''
+        if change > tolerance:
+            regressions.append(name)
+            flag = '  SLOWER'
+        elif change < -tolerance:
+            flag = '  faster'
+        print(f"{name:<22} p50 {before['p50']:8.2f} -> {now['p50']:8.2f}ms ({change:+6.1%})  "
+              f"p99 {before['p99']:8.2f} -> {now['p99']:8.2f}ms  "
+              f"{before['throughput']:7.1f} -> {now['throughput']:7.1f}/s{flag}")
+    return regressions
+
+
+def main(args):
+    if args.no_cache:
+        app.config['CACHE_BACKEND'] = None
+    selected = [
+        route for route in ROUTES
+        if (args.writes or not route.write) and (not args.only or re.search(args.only, route.name))
+    ]
+    fixture = fixtures(args.requests)
+    make_client = (lambda: HttpClient(args.url)) if args.url else TestClient
+
+    meta = {
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'target': args.url or 'test client',
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split('://', 1)[0],
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'max_seconds': args.max_seconds,
+        'cache': app.config['CACHE_BACKEND'],
+        'rows': _sizes(),
+    }
+    print(f"{meta['target']}, {meta['database']}, {args.concurrency} thread(s), {args.requests} requests per route")
+
+    results = {}
+    for route in selected:
+        stats = run_route(route, fixture, make_client, args.requests, args.concurrency, args.warmup, args.max_seconds)
+        results[route.name] = stats
+        statuses = ' '.join(f'{status}x{n}' for status, n in stats['statuses'].items())
+        print(f"{route.name:<22} {route.method:<6} {stats['requests']:>5}  {stats['throughput']:8.1f}/s  p50 {stats['p50']:8.2f}ms  "
+              f"p95 {stats['p95']:8.2f}ms  p99 {stats['p99']:8.2f}ms  {statuses}")
+
+    if args.save:
+        path = _results_path(args.save)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'meta': meta, 'routes': results}, f, indent=2)
+        print(f'saved {path}')
+
+    if args.compare:
+        with open(_results_path(args.compare)) as f:
+            baseline = json.load(f)
+        if compare(results, meta, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per route')
+    parser.add_argument('--concurrency', type=int, default=1, help='client threads')
+    parser.add_argument('--warmup', type=int, default=5, help='unmeasured requests per read route')
+    parser.add_argument('--max-seconds', type=float, default=10, help='time limit per route, after which no more requests are sent')
+    parser.add_argument('--url', help='benchmark a running server, e.g. http://127.0.0.1:5555')
+    parser.add_argument('--only', help='regular expression on the route names')
+    parser.add_argument('--writes', action='store_true', help='also run the routes that change data')
+    parser.add_argument('--no-cache', action='store_true', help='disable the response cache (test client only)')
+    parser.add_argument('--save', help=f'name (saved in {RESULTS_DIR}) or path of a results file')
+    parser.add_argument('--compare', help='results file to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='p50 slowdown that counts as a regression')
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,55 @@
+# server/benchmarks/serializers.py
+"""
+Micro-benchmark: precompiled serializers vs SerializerMixin.to_dict.
+
+Run from the server directory against the configured database:
+
+    python -m benchmarks.serializers [repeat]
+"""
+import sys
+import timeit
+
+from sqlalchemy_serializer import SerializerMixin
+
+from config import app
+from models import Animal, Production, Sale
+from queries import query_for
+
+
+# SerializerMixin leaks the nested farmer's password hash, and dumps the
+# change-tracking columns that only /sync exposes.
+HIDDEN = {'password', 'updated_at', 'deleted_at'}
+
+
+def _strip_passwords(value):
+    if isinstance(value, dict):
+        return {k: _strip_passwords(v) for k, v in value.items() if k not in HIDDEN}
+    if isinstance(value, list):
+        return [_strip_passwords(v) for v in value]
+    return value
+
+
+def run(repeat=5):
+    with app.app_context():
+        for shape, model in (('animal', Animal), ('production', Production), ('sale', Sale)):
+            rows = query_for(shape).all()
+            if not rows:
+                print(f'{model.__name__:<12} no rows, skipped')
+                continue
+
+            mismatches = sum(
+                _strip_passwords(SerializerMixin.to_dict(row)) != row.to_dict()
+                for row in rows
+            )
+
+            mixin = min(timeit.repeat(lambda: [SerializerMixin.to_dict(r) for r in rows], number=1, repeat=repeat))
+            compiled = min(timeit.repeat(lambda: [r.to_dict() for r in rows], number=1, repeat=repeat))
+            print(
+                f'{model.__name__:<12} rows={len(rows):<6} '
+                f'mixin={mixin * 1000:8.1f}ms  compiled={compiled * 1000:7.2f}ms  '
+                f'speedup={mixin / compiled:6.1f}x  mismatches={mismatches}'
+            )
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,172 @@
+# server/benchmarks/sqlite_stress.py
+"""
+Concurrent readers and writers against a copy of the SQLite database, once
+per PRAGMA profile (see SQLITE_PROFILES in config.py).
+
+Every worker is its own process with its own engine, like gunicorn workers.
+Writers repeat the write path of POST /feeds/bulk (insert the rows, update
+the rollups, bump the version tags, commit). Readers page through the feeds
+of an animal and run a monthly report. Exporters stream the whole feeds
+table to a slow client like /export does, which keeps a read cursor open
+for a long time. The configured database is only copied, never written:
+
+    python -m benchmarks.sqlite_stress [--readers 4] [--writers 4] [--exporters 1] [--seconds 10] [profile ...]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from config import SQLITE_PROFILES, app, db
+from models import Animal, DailyFeed, Feed
+import rollups
+import versions
+
+
+ROWS_PER_WRITE = 10
+EXPORT_BATCH_SIZE = 100
+EXPORT_PAUSE = 0.05  # seconds the slow client takes per batch
+
+
+def _engine(path, profile):
+    # The connect hook in config.py reads the pragmas from the app config
+    app.config['SQLITE_PRAGMAS'] = SQLITE_PROFILES[profile]
+    return create_engine(f'sqlite:///{path}')
+
+
+def _write(session, animal_ids):
+    animal_id = random.choice(animal_ids)
+    rows = [
+        {
+            'animal_id': animal_id,
+            'feed_type': random.choice(['Hay', 'Grain', 'Silage']),
+            'quantity': random.randint(1, 50),
+            'date': date(2024, 1, 1) + timedelta(days=random.randint(0, 365)),
+        }
+        for _ in range(ROWS_PER_WRITE)
+    ]
+    session.execute(insert(Feed), rows)
+    rollups.add_rows(session, Feed, rows)
+    versions.touch(session, Feed, {animal_id})
+    session.commit()
+
+
+def _read(session, animal_ids):
+    animal_id = random.choice(animal_ids)
+    session.scalars(select(Feed).where(Feed.animal_id == animal_id).order_by(Feed.id).limit(100)).all()
+    session.execute(
+        select(func.strftime('%Y-%m', DailyFeed.day), DailyFeed.feed_type, func.sum(DailyFeed.quantity))
+        .where(DailyFeed.animal_id == animal_id)
+        .group_by(func.strftime('%Y-%m', DailyFeed.day), DailyFeed.feed_type)
+    ).all()
+    session.rollback()
+
+
+def _export(session, animal_ids):
+    result = session.execute(select(Feed).execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for _ in result.partitions():
+        time.sleep(EXPORT_PAUSE)
+    session.rollback()
+
+
+OPERATIONS = {'reader': _read, 'writer': _write, 'exporter': _export}
+
+
+def _worker(path, profile, role, seconds, animal_ids, results):
+    engine = _engine(path, profile)
+    operation = OPERATIONS[role]
+    done, errors, latencies = 0, 0, []
+    deadline = time.monotonic() + seconds
+    with Session(engine) as session:
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                operation(session, animal_ids)
+                done += 1
+                latencies.append(time.perf_counter() - started)
+            except OperationalError as error:
+                # 'database is locked' / 'database is busy'
+                session.rollback()
+                errors += 1
+                if 'locked' not in str(error) and 'busy' not in str(error):
+                    raise
+    engine.dispose()
+    results.put((role, done, errors, latencies))
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(profiles, readers, writers, exporters, seconds):
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            print('The stress test copies the SQLite file; DATABASE_URL points at another database')
+            return
+        source = db.engine.url.database
+        animal_ids = db.session.scalars(select(Animal.id)).all()
+        # Closing the last connection checkpoints a WAL database into the file
+        db.session.remove()
+        db.engine.dispose()
+    if not animal_ids:
+        print('No animals in the database; run seed.py first')
+        return
+
+    context = multiprocessing.get_context('spawn')
+    for profile in profiles:
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'stress.db')
+        shutil.copy(source, path)
+        # Switch the copy's journal mode before the workers start
+        _engine(path, profile).connect().close()
+        try:
+            results = context.Queue()
+            workers = [
+                context.Process(target=_worker, args=(path, profile, role, seconds, animal_ids, results))
+                for role in ['reader'] * readers + ['writer'] * writers + ['exporter'] * exporters
+            ]
+            for worker in workers:
+                worker.start()
+            totals = {role: [0, 0, []] for role in OPERATIONS}
+            for _ in workers:
+                role, done, errors, latencies = results.get()
+                totals[role][0] += done
+                totals[role][1] += errors
+                totals[role][2].extend(latencies)
+            for worker in workers:
+                worker.join()
+        finally:
+            shutil.rmtree(directory)
+
+        for role, (done, errors, latencies) in totals.items():
+            if done or errors:
+                print(
+                    f'{profile:<12} {role:<9} {done / seconds:8.1f} ops/s  '
+                    f'p99 {_percentile(latencies, 0.99) * 1000:8.1f}ms  max {max(latencies, default=0) * 1000:8.1f}ms  '
+                    f'locked {errors}'
+                )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('profiles', nargs='*', default=['legacy', 'production'])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--exporters', type=int, default=1)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+    unknown = set(args.profiles) - set(SQLITE_PROFILES)
+    if unknown:
+        parser.error(f"unknown profile(s) {', '.join(sorted(unknown))}; choose from {', '.join(sorted(SQLITE_PROFILES))}")
+    run(args.profiles, args.readers, args.writers, args.exporters, args.seconds)
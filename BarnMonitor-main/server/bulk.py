@@ -0,0 +1,181 @@
+# server/bulk.py
+"""
+Batch ingestion of feed, production and health records.
+
+A batch is a JSON array or NDJSON (one object per line). Every row is checked
+before anything is written: a batch with a bad row is rejected with per-row
+errors, otherwise all rows go in with a single executemany INSERT.
+"""
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from flask import current_app, request
+from sqlalchemy import insert, select
+
+import anomalies
+import rollups
+from versions import touch
+from config import db
+from dates import parse_date
+from models import Animal, Feed, HealthRecord, Production
+
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+
+class BatchError(ValueError):
+    """Raised when the batch as a whole cannot be read."""
+
+
+def _animal_id(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError('must be an integer')
+    return value
+
+
+def _string(value):
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError('must be a non-empty string')
+    return value
+
+
+def _optional_string(value):
+    if not isinstance(value, str):
+        raise ValueError('must be a string')
+    return value
+
+
+def _quantity(value):
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError('must be a non-negative integer')
+    return value
+
+
+def _date(value):
+    try:
+        return parse_date(value)
+    except ValueError:
+        raise ValueError('must be in the format YYYY-MM-DD')
+
+
+def _datetime(value):
+    return datetime.combine(_date(value), datetime.min.time())
+
+
+# model, {field: (converter, required)}
+Batch = namedtuple('Batch', 'model fields')
+
+BATCHES = {
+    'feeds': Batch(Feed, {
+        'animal_id': (_animal_id, True),
+        'feed_type': (_string, True),
+        'quantity': (_quantity, True),
+        'date': (_date, True),
+    }),
+    'productions': Batch(Production, {
+        'animal_id': (_animal_id, True),
+        'product_type': (_string, True),
+        'quantity': (_quantity, True),
+        'production_date': (_date, True),
+    }),
+    'health_records': Batch(HealthRecord, {
+        'animal_id': (_animal_id, True),
+        'checkup_date': (_datetime, True),
+        'treatment': (_string, True),
+        'notes': (_optional_string, False),
+        'vet_name': (_string, True),
+    }),
+}
+
+
+def read_batch():
+    """
+    Rows of the request body and the rows that could not be parsed as
+    {index: {field: message}}. Raises BatchError for an unusable body.
+    """
+    errors = {}
+    if request.mimetype in NDJSON_TYPES:
+        rows = []
+        lines = [line for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        for index, line in enumerate(lines):
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                rows.append(None)
+                errors[index] = {'row': 'Invalid JSON'}
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            raise BatchError('Expected a JSON array or an NDJSON body')
+
+    if not rows:
+        raise BatchError('Batch is empty')
+    max_rows = current_app.config['BULK_MAX_ROWS']
+    if len(rows) > max_rows:
+        raise BatchError(f'Batch has {len(rows)} rows; the limit is {max_rows}')
+    return rows, errors
+
+
+def validate(kind, rows, errors=None):
+    """
+    Convert rows to column values for BATCHES[kind].
+
+    Returns (values, errors) where errors is a list of
+    {'index': n, 'errors': {field: message}} for every rejected row.
+    """
+    fields = BATCHES[kind].fields
+    errors = dict(errors or {})
+    values = []
+
+    for index, row in enumerate(rows):
+        if index in errors:
+            continue
+        if not isinstance(row, dict):
+            errors[index] = {'row': 'must be an object'}
+            continue
+
+        row_errors = {name: 'unknown field' for name in row if name not in fields}
+        converted = {}
+        for name, (convert, required) in fields.items():
+            value = row.get(name)
+            if value is None:
+                if required:
+                    row_errors[name] = 'is required'
+                else:
+                    converted[name] = None
+                continue
+            try:
+                converted[name] = convert(value)
+            except ValueError as e:
+                row_errors[name] = str(e)
+
+        if row_errors:
+            errors[index] = row_errors
+        else:
+            values.append((index, converted))
+
+    # One lookup for every referenced animal
+    animal_ids = {row['animal_id'] for _, row in values}
+    known = set(db.session.scalars(select(Animal.id).where(Animal.id.in_(animal_ids)))) if animal_ids else set()
+    for index, row in values:
+        if row['animal_id'] not in known:
+            errors[index] = {'animal_id': f"Animal {row['animal_id']} does not exist"}
+
+    return (
+        [row for index, row in values if index not in errors],
+        [{'index': index, 'errors': errors[index]} for index in sorted(errors)],
+    )
+
+
+def insert_batch(kind, values):
+    """Insert validated rows with one executemany and return their ids in order."""
+    model = BATCHES[kind].model
+    ids = db.session.scalars(
+        insert(model).returning(model.id, sort_by_parameter_order=True),
+        values,
+    ).all()
+    rollups.add_rows(db.session, model, values)
+    anomalies.add_rows(db.session, model, values)
+    touch(db.session, model, {row['animal_id'] for row in values})
+    return ids
@@ -0,0 +1,153 @@
+# server/cache.py
+"""
+Response cache for read-mostly GET endpoints.
+
+Entries are keyed by route, query string, user and the current version of
+every tag the route depends on (e.g. 'animals', 'animal:3', 'farmers'; see
+versions.route_tags). The versions are the counters in the versions table,
+the same ones the ETags are built from, which every write bumps in its own
+transaction. So a commit in any worker changes the keys that every worker
+looks up. Entries are never deleted on write; stale ones age out of the
+LRU / TTL. A read that raced a write stores its result under the old
+versions, where nobody looks any more.
+
+Backends: in-process LRU + TTL ('memory', the default; each worker fills its
+own) or a Redis-compatible server ('redis', needs the redis package; shared
+by all workers). CACHE_BACKEND = None disables it.
+"""
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import click
+from flask import current_app, request, session
+
+from config import app
+from representations import negotiated
+from responses import to_response
+from versions import bump_all, request_versions, route_tags
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class MemoryCache:
+    """Thread-safe LRU with a per-entry TTL."""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """Entries expire through Redis TTLs."""
+
+    def __init__(self, url, ttl=300, prefix='barnmonitor:cache:'):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND = 'redis' needs the redis package")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=self.ttl)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(f'{self.prefix}*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+def get_cache():
+    """The configured backend for the current app, or None when caching is off."""
+    if 'response_cache' not in current_app.extensions:
+        backend = current_app.config['CACHE_BACKEND']
+        ttl = current_app.config['CACHE_TTL']
+        if backend == 'memory':
+            cache = MemoryCache(current_app.config['CACHE_MAX_ENTRIES'], ttl)
+        elif backend == 'redis':
+            cache = RedisCache(current_app.config['CACHE_REDIS_URL'], ttl)
+        elif backend is None:
+            cache = None
+        else:
+            raise RuntimeError(f'Unknown CACHE_BACKEND: {backend}')
+        current_app.extensions['response_cache'] = cache
+    return current_app.extensions['response_cache']
+
+
+def _key(tags, versions):
+    query = '&'.join(sorted(f'{k}={v}' for k, v in request.args.items(multi=True)))
+    user = session.get('user_id')
+    versions = ','.join(f'{tag}={version}' for tag, version in zip(tags, versions))
+    raw = f'{request.path}?{query}|{negotiated()}|user={user}|{versions}'
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def cached(collection):
+    """Cache 200 responses of a Resource.get(self, id=None) for collection."""
+    def decorator(get):
+        @wraps(get)
+        def wrapper(self, *args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return get(self, *args, **kwargs)
+
+            tags = route_tags(collection, kwargs.get('id'))
+            key = _key(tags, request_versions(tags)[0])
+            hit = cache.get(key)
+            if hit is not None:
+                body, status, headers = hit
+                return current_app.response_class(body, status=status, headers=headers)
+
+            response = to_response(get(self, *args, **kwargs))
+            if response.status_code == 200:
+                headers = [(name, value) for name, value in response.headers if name != 'Content-Length']
+                cache.set(key, (response.get_data(), 200, headers))
+            return response
+        return wrapper
+    return decorator
+
+
+@app.cli.command('clear-cache')
+def clear_cache_command():
+    """Invalidate every cached response and ETag (use after writing to the database outside the app)."""
+    # Bumping the versions reaches every worker's cache; clearing only frees the space
+    bump_all()
+    cache = get_cache()
+    if cache is not None:
+        cache.clear()
+    click.echo('Response cache cleared')
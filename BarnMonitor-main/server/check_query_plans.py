@@ -0,0 +1,73 @@
+# server/check_query_plans.py
+"""
+Run EXPLAIN QUERY PLAN on the registered hot queries and fail if any of them
+falls back to a full table scan.
+
+    python check_query_plans.py           # against the configured database
+    python check_query_plans.py --memory  # against a fresh schema built from the models
+"""
+import sys
+from datetime import date, datetime
+
+from sqlalchemy import create_engine, select, text
+
+from config import app, db
+from models import Animal, Feed, HealthRecord, Production, Sale
+from timeline import RANKS, SOURCES, page_statement
+
+
+def hot_queries():
+    """(name, statement) pairs for the lookups the API and reports rely on."""
+    farmer_animals = select(Animal.id).where(Animal.farmer_id == 1)
+    return [
+        ('animals by farmer', select(Animal).where(Animal.farmer_id == 1)),
+        ('animals by type', select(Animal).where(Animal.animal_type_id == 1)),
+        ('feeds by animal', select(Feed).where(Feed.animal_id.in_([1, 2, 3]))),
+        ('feeds by animal and date', select(Feed).where(Feed.animal_id == 1, Feed.date >= date(2019, 1, 1), Feed.date <= date(2019, 12, 31))),
+        ('feeds by farmer', select(Feed).where(Feed.animal_id.in_(farmer_animals))),
+        ('feeds by date', select(Feed).where(Feed.date >= date(2019, 1, 1), Feed.date <= date(2019, 1, 31))),
+        ('health records by animal', select(HealthRecord).where(HealthRecord.animal_id.in_([1, 2, 3]))),
+        ('health records by animal and date', select(HealthRecord).where(HealthRecord.animal_id == 1, HealthRecord.checkup_date >= datetime(2019, 1, 1))),
+        ('health records by date', select(HealthRecord).where(HealthRecord.checkup_date >= datetime(2019, 1, 1), HealthRecord.checkup_date < datetime(2019, 2, 1))),
+        ('productions by animal', select(Production).where(Production.animal_id.in_([1, 2, 3]))),
+        ('productions by animal and date', select(Production).where(Production.animal_id == 1, Production.production_date >= date(2021, 1, 1), Production.production_date <= date(2021, 12, 31))),
+        ('productions by farmer', select(Production).where(Production.animal_id.in_(farmer_animals))),
+        ('productions by date', select(Production).where(Production.production_date >= date(2021, 1, 1), Production.production_date <= date(2021, 1, 31))),
+        ('sales by animal', select(Sale).where(Sale.animal_id.in_([1, 2, 3]))),
+        ('sales by animal and date', select(Sale).where(Sale.animal_id == 1, Sale.sale_date >= date(2021, 1, 1), Sale.sale_date <= date(2021, 12, 31))),
+        ('sales by production', select(Sale).where(Sale.production_id.in_([1, 2, 3]))),
+        ('sales by date', select(Sale).where(Sale.sale_date >= date(2021, 1, 1), Sale.sale_date <= date(2021, 1, 31))),
+    ] + [
+        # /animals/<id>/timeline, a page past the cursor
+        (f'timeline {kind}s after cursor', page_statement(kind, 1, after=(datetime(2019, 6, 1), RANKS['feed'], 10)))
+        for kind in SOURCES
+    ]
+
+
+def check(engine):
+    failures = []
+    with engine.connect() as conn:
+        for name, statement in hot_queries():
+            sql = str(statement.compile(engine, compile_kwargs={'literal_binds': True}))
+            plan = [row[-1] for row in conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+            scans = [step for step in plan if step.startswith('SCAN')]
+            status = 'SCAN' if scans else 'ok'
+            print(f'{status:<5} {name:<36} {" | ".join(plan)}')
+            if scans:
+                failures.append(name)
+    return failures
+
+
+if __name__ == '__main__':
+    if '--memory' in sys.argv:
+        engine = create_engine('sqlite://')
+        db.metadata.create_all(engine)
+        failures = check(engine)
+    else:
+        with app.app_context():
+            failures = check(db.engine)
+
+    if failures:
+        print(f'\n{len(failures)} hot queries fall back to a table scan: {", ".join(failures)}')
+        sys.exit(1)
+    print('\nAll hot queries use an index.')
@@ -0,0 +1,88 @@
+# server/compression.py
+"""
+Compression of response bodies, negotiated from Accept-Encoding.
+
+Brotli ('br', needs the brotli package) is preferred when the client takes
+both it and gzip. Bodies smaller than COMPRESSION_MIN_SIZE bytes are sent
+as they are; streamed responses (/export) are compressed chunk by chunk and
+flushed after every chunk, so clients still get each batch as it is read.
+COMPRESSION_MIN_SIZE = None turns compression off.
+
+A compressed response's ETag becomes weak (W/"..."): the bytes differ from
+the uncompressed ones, but they are the same representation, and
+If-None-Match compares weakly (see versions.py).
+"""
+import gzip
+import zlib
+
+from flask import current_app, request
+
+from config import app
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESSION_BROTLI_QUALITY'])
+    return gzip.compress(data, compresslevel=config['COMPRESSION_GZIP_LEVEL'], mtime=0)
+
+
+def _compress_stream(chunks, encoding, config):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=config['COMPRESSION_BROTLI_QUALITY'])
+        compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(config['COMPRESSION_GZIP_LEVEL'], wbits=31)  # 31: gzip container
+        compress, flush, finish = compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+    try:
+        for chunk in chunks:
+            if chunk:
+                yield compress(chunk.encode() if isinstance(chunk, str) else chunk) + flush()
+        yield finish()
+    finally:
+        # Ends stream_with_context's request context along with the stream
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+@app.after_request
+def compress_response(response):
+    config = current_app.config
+    if (
+        config['COMPRESSION_MIN_SIZE'] is None
+        or response.mimetype not in config['COMPRESSION_MIMETYPES']
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+        or request.method == 'HEAD'
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(_encodings())
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding, config)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESSION_MIN_SIZE']:
+            return response
+        response.set_data(_compress(data, encoding, config))
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,18 @@
+# server/dates.py
+from datetime import date, datetime
+
+
+def parse_date(value):
+    """
+    Return a date for a date/datetime object or a 'YYYY-MM-DD' string.
+    Raises ValueError for anything else.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    # date.fromisoformat is implemented in C and much cheaper than strptime;
+    # the length/separator check keeps the accepted format to YYYY-MM-DD only.
+    if isinstance(value, str) and len(value) == 10 and value[4] == '-' and value[7] == '-':
+        return date.fromisoformat(value)
+    raise ValueError(f'Invalid date: {value!r}')
@@ -0,0 +1,100 @@
+# server/export.py
+"""
+Streaming CSV / NDJSON export of whole collections.
+
+Rows are read through a server-side cursor (yield_per) and written out one
+batch at a time, so memory use does not grow with the size of the export.
+"""
+import csv
+import io
+
+from flask import current_app
+from sqlalchemy import select
+
+from config import db
+from models import Animal, AnimalType, Farmer, Feed, HealthRecord, Production, Sale
+from pagination import ListParamsError
+from serializers import (
+    ANIMAL_COLUMNS, ANIMAL_TYPE_COLUMNS, FARMER_COLUMNS, FEED_COLUMNS,
+    HEALTH_RECORD_COLUMNS, PRODUCTION_COLUMNS, SALE_COLUMNS,
+)
+
+
+# /export/<resource> -> (model, serializer columns)
+EXPORTS = {
+    'animals': (Animal, ANIMAL_COLUMNS),
+    'animal_types': (AnimalType, ANIMAL_TYPE_COLUMNS),
+    'farmers': (Farmer, FARMER_COLUMNS),
+    'feeds': (Feed, FEED_COLUMNS),
+    'health_records': (HealthRecord, HEALTH_RECORD_COLUMNS),
+    'productions': (Production, PRODUCTION_COLUMNS),
+    'sales': (Sale, SALE_COLUMNS),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def export_columns(resource, fields=None):
+    """[(name, formatter)] for resource, narrowed to fields in their given order."""
+    columns = [column if isinstance(column, tuple) else (column, None) for column in EXPORTS[resource][1]]
+    if fields is None:
+        return columns
+
+    by_name = dict(columns)
+    unknown = [name for name in fields if name not in by_name]
+    if unknown:
+        raise ListParamsError(f'Unknown fields for {resource}: {", ".join(unknown)}')
+    return [(name, by_name[name]) for name in fields]
+
+
+def _batches(statement, columns):
+    result = db.session.execute(
+        statement,
+        execution_options={'yield_per': current_app.config['EXPORT_BATCH_SIZE']},
+    )
+    try:
+        for partition in result.partitions():
+            yield [
+                [formatter(value) if formatter else value for value, (_, formatter) in zip(row, columns)]
+                for row in partition
+            ]
+    finally:
+        result.close()
+
+
+def _csv(batches, names):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when there are no rows
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson(batches, names):
+    dumps = current_app.json.dumps
+    for batch in batches:
+        yield ''.join(dumps(dict(zip(names, row))) + '\n' for row in batch)
+
+
+def export(resource, output, query_filters, fields=None):
+    """
+    Generator of text chunks for the whole (filtered) collection.
+
+    The statement is built, and query_filters applied, before the first chunk
+    is requested, so bad parameters raise ListParamsError up front.
+    """
+    model = EXPORTS[resource][0]
+    columns = export_columns(resource, fields)
+    statement = query_filters(select(*[getattr(model, name) for name, _ in columns]), model).order_by(model.id)
+    names = [name for name, _ in columns]
+    write = _csv if output == 'csv' else _ndjson
+    return write(_batches(statement, columns), names)
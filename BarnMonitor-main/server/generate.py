@@ -0,0 +1,161 @@
+# server/generate.py
+"""
+Synthetic data at production scale: farmers x animals x days of history.
+
+Unlike seed.py, every table is written with executemany INSERTs of
+--chunk-size rows, committed chunk by chunk, and the rollups, yield
+baselines and ETag versions are rebuilt once at the end. Every animal has a
+daily milk production and feeding, a sale every --sale-every days and a
+checkup every --checkup-every days, so the defaults (50 x 40 x 730) write
+about 3.2 million rows.
+
+Existing data is deleted first, like seed.py. Every farmer's password is
+password123 (see benchmarks/routes.py).
+
+    python generate.py [--farmers 50] [--animals 40] [--days 730] [--seed 1]
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, time as clock, timedelta
+
+from faker import Faker
+from sqlalchemy import delete, func, insert, select
+
+import anomalies
+import rollups
+import versions
+from config import app, db
+from models import (
+    Animal, AnimalType, DailyFeed, DailyProduction, DailySale, Farmer, Feed, HealthRecord,
+    IdempotencyKey, Production, Sale, Version, YieldAlert, YieldBaseline,
+)
+from passwords import hash_password
+
+PASSWORD = 'password123'
+BREEDS = ['Holstein', 'Jersey', 'Guernsey', 'Ayrshire', 'Brown Swiss']
+FEEDS = ['Hay', 'Grain', 'Silage', 'Mineral Supplement', 'Protein Supplement', 'Grass', 'Alfalfa', 'Barley', 'Corn', 'Oats']
+TREATMENTS = ['Routine Checkup', 'Vaccination', 'Antibiotic Treatment', 'Deworming', 'Injury Treatment', 'Nutritional Supplement']
+VETS = ['Dr. Brown', 'Dr. Smith', 'Dr. Johnson', 'Dr. Patel', 'Dr. Garcia', 'Dr. Lee']
+
+# Child tables first; the rollups and baselines are rebuilt at the end
+CLEARED = (
+    YieldAlert, YieldBaseline, DailySale, DailyProduction, DailyFeed, Sale, Feed, Production, HealthRecord,
+    Animal, AnimalType, Farmer, IdempotencyKey, Version,
+)
+
+
+class Writer:
+    """Buffers rows per model and writes them chunk_size at a time."""
+
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+        self.pending = {}
+        self.written = {}
+
+    def add(self, model, row):
+        rows = self.pending.setdefault(model, [])
+        rows.append(row)
+        if len(rows) >= self.chunk_size:
+            self.flush(model)
+
+    def flush(self, model=None):
+        for target in [model] if model else list(self.pending):
+            rows = self.pending.pop(target, [])
+            if rows:
+                db.session.execute(insert(target), rows)
+                db.session.commit()
+                self.written[target] = self.written.get(target, 0) + len(rows)
+
+
+def _farmers(fake, count):
+    password = hash_password(PASSWORD)  # one hash for everyone, hashing is the slow part
+    rows = [
+        {'name': fake.name(), 'email': f'farmer{i}@example.com', 'phone': fake.phone_number(),
+         'address': fake.address(), 'password': password}
+        for i in range(1, count + 1)
+    ]
+    db.session.execute(insert(Farmer), rows)
+    db.session.commit()
+    return db.session.scalars(select(Farmer.id).order_by(Farmer.id)).all()
+
+
+def _animals(fake, rng, farmer_ids, per_farmer, type_ids, first_day):
+    rows = [
+        {'name': f'{fake.first_name()} {farmer_id}-{i}', 'breed': rng.choice(BREEDS), 'age': rng.randint(2, 8),
+         'animal_type_id': rng.choice(type_ids), 'farmer_id': farmer_id, 'health_status': 'Healthy',
+         'birth_date': first_day - timedelta(days=rng.randint(700, 2900)), 'image': None}
+        for farmer_id in farmer_ids for i in range(per_farmer)
+    ]
+    for start in range(0, len(rows), 5000):
+        db.session.execute(insert(Animal), rows[start:start + 5000])
+    db.session.commit()
+    return db.session.scalars(select(Animal.id).order_by(Animal.id)).all()
+
+
+def generate(farmers, animals, days, seed=1, chunk_size=10000, sale_every=7, checkup_every=30, drop_rate=0.002):
+    rng = random.Random(seed)
+    fake = Faker()
+    Faker.seed(seed)
+    first_day = date.today() - timedelta(days=days)
+    started = time.perf_counter()
+
+    with app.app_context():
+        for model in CLEARED:
+            db.session.execute(delete(model))
+        db.session.commit()
+
+        db.session.execute(insert(AnimalType), [
+            {'type_name': 'Dairy', 'description': 'Dairy animals for milk production'},
+            {'type_name': 'Beef', 'description': 'Beef animals for beef production'},
+        ])
+        type_ids = db.session.scalars(select(AnimalType.id)).all()
+        farmer_ids = _farmers(fake, farmers)
+        animal_ids = _animals(fake, rng, farmer_ids, animals, type_ids, first_day)
+
+        # A steady base yield per animal, daily noise and the odd sudden drop
+        base = {animal_id: rng.uniform(15, 30) for animal_id in animal_ids}
+        writer = Writer(chunk_size)
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            for animal_id in animal_ids:
+                quantity = base[animal_id] * rng.uniform(0.9, 1.1)
+                if rng.random() < drop_rate:
+                    quantity *= 0.5
+                writer.add(Production, {'animal_id': animal_id, 'product_type': 'Milk', 'quantity': round(quantity), 'production_date': day})
+                writer.add(Feed, {'animal_id': animal_id, 'feed_type': rng.choice(FEEDS), 'quantity': rng.randint(5, 20), 'date': day})
+                if (offset + animal_id) % sale_every == 0:
+                    sold = rng.randint(10, 20) * sale_every
+                    writer.add(Sale, {'animal_id': animal_id, 'product_type': 'Milk', 'quantity_sold': sold,
+                                      'amount': round(sold * rng.uniform(0.4, 0.6), 2), 'sale_date': day})
+                if (offset + animal_id) % checkup_every == 0:
+                    writer.add(HealthRecord, {'animal_id': animal_id, 'checkup_date': datetime.combine(day, clock(rng.randint(7, 17))),
+                                              'treatment': rng.choice(TREATMENTS), 'notes': None, 'vet_name': rng.choice(VETS)})
+        writer.flush()
+        inserted = time.perf_counter() - started
+
+        # Bulk inserts skip the flush listeners; rebuild everything they maintain
+        rollups.rebuild()
+        anomalies.rebuild()
+        versions.bump_all()
+
+        total = sum(writer.written.values())
+        print(f'{len(farmer_ids)} farmers, {len(animal_ids)} animals, {days} days')
+        for model, count in writer.written.items():
+            print(f'  {model.__tablename__:<15} {count:>10}')
+        print(f'  yield_alerts    {db.session.scalar(select(func.count()).select_from(YieldAlert)):>10}')
+        print(f'{total} rows in {inserted:.0f}s ({total / inserted:,.0f} rows/s), '
+              f'rollups and baselines {time.perf_counter() - started - inserted:.0f}s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--farmers', type=int, default=50)
+    parser.add_argument('--animals', type=int, default=40, help='animals per farmer')
+    parser.add_argument('--days', type=int, default=730, help='days of history, ending today')
+    parser.add_argument('--seed', type=int, default=1, help='random seed, for repeatable data')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='rows per INSERT')
+    parser.add_argument('--sale-every', type=int, default=7)
+    parser.add_argument('--checkup-every', type=int, default=30)
+    args = parser.parse_args()
+    generate(args.farmers, args.animals, args.days, args.seed, args.chunk_size, args.sale_every, args.checkup_every)
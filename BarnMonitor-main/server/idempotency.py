@@ -0,0 +1,70 @@
+# server/idempotency.py
+"""
+Idempotency-Key support for POST endpoints that clients retry.
+
+The response to the first request with a key is stored in the same
+transaction as the write it describes. A retry with the same key and body
+gets that response back instead of writing a second time.
+
+Keys belong to the user who sent them: they are stored and fingerprinted
+together with session['user_id'], so two clients that happen to pick the
+same key never see each other's responses.
+"""
+import hashlib
+import json
+from datetime import datetime
+
+from flask import current_app, request, session
+from sqlalchemy import delete
+
+from config import db
+from models import IdempotencyKey
+
+
+class IdempotencyConflict(ValueError):
+    """Raised when a key is reused for a different request."""
+
+
+def idempotency_key():
+    """
+    The Idempotency-Key header scoped to the current user ('<user_id>:<key>'),
+    or None. Raises ValueError if it is malformed.
+    """
+    key = request.headers.get('Idempotency-Key')
+    if key is None:
+        return None
+    if not 0 < len(key) <= 255:
+        raise ValueError('Idempotency-Key must be 1 to 255 characters')
+    return f"{session.get('user_id')}:{key}"
+
+
+def fingerprint():
+    digest = hashlib.sha256(f"{session.get('user_id')} {request.method} {request.path}\n".encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _expires_before():
+    return datetime.utcnow() - current_app.config['IDEMPOTENCY_KEY_TTL']
+
+
+def stored_response(key):
+    """(body, status) recorded for key, or None if the key is new or expired."""
+    record = db.session.get(IdempotencyKey, key)
+    if record is None or record.created_at < _expires_before():
+        return None
+    if record.fingerprint != fingerprint():
+        raise IdempotencyConflict('Idempotency-Key was already used for a different request')
+    return json.loads(record.response), record.status_code
+
+
+def remember(key, body, status):
+    """Record the response for key; committed with the caller's transaction."""
+    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < _expires_before()))
+    db.session.merge(IdempotencyKey(
+        key=key,
+        fingerprint=fingerprint(),
+        status_code=status,
+        response=json.dumps(body),
+        created_at=datetime.utcnow(),
+    ))
@@ -0,0 +1,298 @@
+# server/metrics.py
+"""
+Per-route request, SQL and session timings, exposed on GET /metrics in the
+Prometheus text format.
+
+Request hooks time every request from before_request to teardown (so a
+streamed response is timed until its last chunk), Engine events time every
+SQL statement and count the rows every SELECT returns (Core queries
+included), the ORM load event counts the objects each request builds,
+and the session interface is wrapped to time loading and saving sessions.
+Everything is labelled with the method and the route rule ('/animals/<int:id>',
+not the URL), so the number of series stays fixed.
+
+A statement slower than SLOW_QUERY_THRESHOLD_MS is logged to the
+'barnmonitor.slow_queries' logger with its endpoint (and to
+SLOW_QUERY_LOG_FILE when set). Parameters are left out: they can hold
+passwords and personal data.
+
+GET /metrics needs `Authorization: Bearer <METRICS_TOKEN>`; while
+METRICS_TOKEN is unset the timings are still collected (and the slow query
+log written) but not served.
+
+Metrics live in the process: with several gunicorn workers each one reports
+its own, so scrape them per worker or sum them in Prometheus.
+"""
+import hmac
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import sessions  # noqa: F401  installs the session interface wrapped below
+from config import app, db
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+slow_query_log = logging.getLogger('barnmonitor.slow_queries')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f'{self.name}{_labels(self.labels, labels)} {_number(value)}'
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._values = {}  # labels -> [count per bucket (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {labels: (list(counts), total) for labels, (counts, total) in self._values.items()}
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.labels, labels, [('le', bound)])} {cumulative}"
+            yield f'{self.name}_sum{_labels(self.labels, labels)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.labels, labels)} {cumulative}'
+
+
+ROUTE = ('method', 'route')
+
+REQUESTS = Counter('barnmonitor_http_requests_total', 'Requests handled.', ('method', 'route', 'status'))
+REQUEST_SECONDS = Histogram('barnmonitor_http_request_duration_seconds', 'Time from before_request to teardown, streaming included.', ROUTE, LATENCY_BUCKETS)
+RESPONSE_BYTES = Histogram('barnmonitor_http_response_bytes', 'Size of response bodies with a known length.', ROUTE, SIZE_BUCKETS)
+SQL_PER_REQUEST = Histogram('barnmonitor_sql_statements_per_request', 'SQL statements run by one request.', ROUTE, COUNT_BUCKETS)
+SQL_STATEMENTS = Counter('barnmonitor_sql_statements_total', 'SQL statements run (an executemany counts once).', ROUTE)
+SQL_SECONDS = Histogram('barnmonitor_sql_statement_duration_seconds', 'Time the database took for each statement.', ROUTE, SQL_BUCKETS)
+SQL_SLOW = Counter('barnmonitor_sql_slow_statements_total', 'Statements slower than SLOW_QUERY_THRESHOLD_MS.', ROUTE)
+ROWS_FETCHED = Counter('barnmonitor_sql_rows_fetched_total', 'Rows fetched from query results, ORM or Core.', ROUTE)
+ROWS_LOADED = Counter('barnmonitor_orm_rows_loaded_total', 'Model instances loaded from query results.', ROUTE)
+ROWS_WRITTEN = Counter('barnmonitor_sql_rows_written_total', 'Rows inserted, updated or deleted.', ROUTE)
+SESSION_SECONDS = Histogram('barnmonitor_session_store_duration_seconds', 'Time spent loading and saving the user session.', ('method', 'route', 'operation'), SQL_BUCKETS)
+
+METRICS = (REQUESTS, REQUEST_SECONDS, RESPONSE_BYTES, SQL_PER_REQUEST, SQL_STATEMENTS, SQL_SECONDS, SQL_SLOW,
+           ROWS_FETCHED, ROWS_LOADED, ROWS_WRITTEN, SESSION_SECONDS)
+
+
+def render():
+    """Every metric in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in METRICS:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+def _route():
+    """(method, route rule) of the current request; ('', '') outside of one, e.g. in the CLI."""
+    if not has_request_context():
+        return ('', '')
+    rule = request.url_rule
+    return (request.method, rule.rule if rule is not None else '<unmatched>')
+
+
+def authorized():
+    """Whether the request carries the metrics token (always False while METRICS_TOKEN is unset)."""
+    token = current_app.config['METRICS_TOKEN']
+    scheme, _, given = request.headers.get('Authorization', '').partition(' ')
+    return bool(token and given) and scheme.lower() == 'bearer' and hmac.compare_digest(given.encode(), token.encode())
+
+
+def _enabled():
+    return current_app.config['METRICS_ENABLED'] if has_request_context() else app.config['METRICS_ENABLED']
+
+
+@app.before_request
+def start_request():
+    if current_app.config['METRICS_ENABLED']:
+        g.metrics = {'started': time.perf_counter(), 'statements': 0, 'status': 500}
+
+
+@app.after_request
+def record_response(response):
+    state = g.get('metrics')
+    if state is not None:
+        state['status'] = response.status_code
+        if not response.is_streamed and response.content_length is not None:
+            RESPONSE_BYTES.observe(_route(), response.content_length)
+    return response
+
+
+@app.teardown_request
+def finish_request(exc):
+    state = g.pop('metrics', None)
+    if state is None:
+        return
+    route = _route()
+    if 'metrics_session_open' in g:
+        SESSION_SECONDS.observe((*route, 'open'), g.pop('metrics_session_open'))
+    REQUEST_SECONDS.observe(route, time.perf_counter() - state['started'])
+    REQUESTS.inc((*route, str(state['status'])))
+    SQL_PER_REQUEST.observe(route, state['statements'])
+
+
+class CountingCursor:
+    """
+    DBAPI cursor wrapper counting the rows fetched through it. Most drivers
+    leave rowcount at -1 for SELECTs, and streamed results (/export, /sync)
+    are only fetched after the statement has run.
+    """
+
+    def __init__(self, cursor, route):
+        self._cursor = cursor
+        self._route = route
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            ROWS_FETCHED.inc(self._route)
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        if rows:
+            ROWS_FETCHED.inc(self._route, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        if rows:
+            ROWS_FETCHED.inc(self._route, len(rows))
+        return rows
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_statement(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_statement(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['metrics_started'].pop()
+    if not _enabled():
+        return
+    route = _route()
+    SQL_STATEMENTS.inc(route)
+    SQL_SECONDS.observe(route, elapsed)
+    if has_request_context() and 'metrics' in g:
+        g.metrics['statements'] += 1
+    if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+        if cursor.rowcount > 0:
+            ROWS_WRITTEN.inc(route, cursor.rowcount)
+    elif context is not None and cursor.description is not None and context.cursor is cursor:
+        # The result is built from context.cursor once this hook returns
+        context.cursor = CountingCursor(cursor, route)
+
+    threshold = app.config['SLOW_QUERY_THRESHOLD_MS']
+    if threshold is not None and elapsed * 1000 >= threshold:
+        SQL_SLOW.inc(route)
+        endpoint = f'{request.method} {request.full_path.rstrip("?")}' if has_request_context() else '-'
+        slow_query_log.warning('%.1f ms %s: %s', elapsed * 1000, endpoint, ' '.join(statement.split()))
+
+
+@event.listens_for(db.Model, 'load', propagate=True)
+def count_loaded(target, context):
+    if _enabled():
+        ROWS_LOADED.inc(_route())
+
+
+@event.listens_for(db.Model, 'refresh', propagate=True)
+def count_refreshed(target, context, attrs):
+    if _enabled():
+        ROWS_LOADED.inc(_route())
+
+
+class TimedSessionInterface:
+    """Wraps the configured session interface (see sessions.py) to time open and save."""
+
+    def __init__(self, interface):
+        self.interface = interface
+
+    def __getattr__(self, name):
+        return getattr(self.interface, name)
+
+    def open_session(self, app, request):
+        started = time.perf_counter()
+        try:
+            return self.interface.open_session(app, request)
+        finally:
+            # The URL is matched after the session is opened: finish_request records this
+            g.metrics_session_open = time.perf_counter() - started
+
+    def save_session(self, app, session, response):
+        started = time.perf_counter()
+        try:
+            return self.interface.save_session(app, session, response)
+        finally:
+            if current_app.config['METRICS_ENABLED']:
+                SESSION_SECONDS.observe((*_route(), 'save'), time.perf_counter() - started)
+
+
+app.session_interface = TimedSessionInterface(app.session_interface)
+
+if app.config['SLOW_QUERY_LOG_FILE']:
+    handler = logging.FileHandler(app.config['SLOW_QUERY_LOG_FILE'])
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    slow_query_log.addHandler(handler)
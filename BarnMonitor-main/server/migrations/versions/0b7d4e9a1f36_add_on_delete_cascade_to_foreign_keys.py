@@ -0,0 +1,51 @@
+"""add ON DELETE CASCADE to foreign keys
+
+Revision ID: 0b7d4e9a1f36
+Revises: f41b7c2d9e65
+Create Date: 2026-10-18 19:03:51.447102
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7d4e9a1f36'
+down_revision = 'f41b7c2d9e65'
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table, ondelete)
+FOREIGN_KEYS = [
+    ('animals', 'farmer_id', 'farmers', 'CASCADE'),
+    ('animals', 'animal_type_id', 'animal_types', 'SET NULL'),
+    ('feeds', 'animal_id', 'animals', 'CASCADE'),
+    ('health_records', 'animal_id', 'animals', 'CASCADE'),
+    ('productions', 'animal_id', 'animals', 'CASCADE'),
+    ('sales', 'animal_id', 'animals', 'CASCADE'),
+    ('sales', 'production_id', 'productions', 'CASCADE'),
+    ('daily_productions', 'animal_id', 'animals', 'CASCADE'),
+    ('daily_sales', 'animal_id', 'animals', 'CASCADE'),
+    ('daily_feeds', 'animal_id', 'animals', 'CASCADE'),
+]
+
+
+def _recreate(ondelete_for):
+    # On SQLite each batch rebuilds the table; migrations/env.py turns foreign
+    # keys off first so dropping the old table cannot cascade.
+    for table in dict.fromkeys(table for table, *_ in FOREIGN_KEYS):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for fk_table, column, referred, ondelete in FOREIGN_KEYS:
+                if fk_table != table:
+                    continue
+                name = batch_op.f(f'fk_{table}_{column}_{referred}')
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete_for(ondelete))
+
+
+def upgrade():
+    _recreate(lambda ondelete: ondelete)
+
+
+def downgrade():
+    _recreate(lambda ondelete: None)
@@ -0,0 +1,51 @@
+"""add foreign key and date indexes
+
+Revision ID: 3f9c2a7b5e14
+Revises: d84ad824cd42
+Create Date: 2026-10-18 12:05:41.302518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7b5e14'
+down_revision = 'd84ad824cd42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Foreign keys used by filters, eager loaders and cascades
+    op.create_index(op.f('ix_animals_farmer_id'), 'animals', ['farmer_id'], unique=False)
+    op.create_index(op.f('ix_animals_animal_type_id'), 'animals', ['animal_type_id'], unique=False)
+    op.create_index(op.f('ix_sales_production_id'), 'sales', ['production_id'], unique=False)
+
+    # Per-animal history: (animal_id, date) also serves plain animal_id lookups
+    op.create_index('ix_feeds_animal_id_date', 'feeds', ['animal_id', 'date'], unique=False)
+    op.create_index('ix_health_records_animal_id_checkup_date', 'health_records', ['animal_id', 'checkup_date'], unique=False)
+    op.create_index('ix_productions_animal_id_production_date', 'productions', ['animal_id', 'production_date'], unique=False)
+    op.create_index('ix_sales_animal_id_sale_date', 'sales', ['animal_id', 'sale_date'], unique=False)
+
+    # Date ranges across all animals (reports, exports)
+    op.create_index(op.f('ix_feeds_date'), 'feeds', ['date'], unique=False)
+    op.create_index(op.f('ix_health_records_checkup_date'), 'health_records', ['checkup_date'], unique=False)
+    op.create_index(op.f('ix_productions_production_date'), 'productions', ['production_date'], unique=False)
+    op.create_index(op.f('ix_sales_sale_date'), 'sales', ['sale_date'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_sales_sale_date'), table_name='sales')
+    op.drop_index(op.f('ix_productions_production_date'), table_name='productions')
+    op.drop_index(op.f('ix_health_records_checkup_date'), table_name='health_records')
+    op.drop_index(op.f('ix_feeds_date'), table_name='feeds')
+
+    op.drop_index('ix_sales_animal_id_sale_date', table_name='sales')
+    op.drop_index('ix_productions_animal_id_production_date', table_name='productions')
+    op.drop_index('ix_health_records_animal_id_checkup_date', table_name='health_records')
+    op.drop_index('ix_feeds_animal_id_date', table_name='feeds')
+
+    op.drop_index(op.f('ix_sales_production_id'), table_name='sales')
+    op.drop_index(op.f('ix_animals_animal_type_id'), table_name='animals')
+    op.drop_index(op.f('ix_animals_farmer_id'), table_name='animals')
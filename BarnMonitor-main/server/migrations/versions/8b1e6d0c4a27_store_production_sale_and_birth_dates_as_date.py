@@ -0,0 +1,91 @@
+"""store production, sale and birth dates as DATE
+
+Revision ID: 8b1e6d0c4a27
+Revises: 3f9c2a7b5e14
+Create Date: 2026-10-18 12:41:09.815230
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1e6d0c4a27'
+down_revision = '3f9c2a7b5e14'
+branch_labels = None
+depends_on = None
+
+# (table, column) pairs converted from String to Date
+DATE_COLUMNS = [
+    ('animals', 'birth_date'),
+    ('productions', 'production_date'),
+    ('sales', 'sale_date'),
+]
+
+BATCH_SIZE = 1000
+
+
+def _backfill(table, column):
+    """
+    Rewrite values that strptime('%Y-%m-%d') accepted but that are not
+    canonical YYYY-MM-DD (e.g. '2021-1-5'), in id-ordered batches so each
+    UPDATE holds the write lock briefly.
+    """
+    conn = op.get_bind()
+    rows = sa.table(table, sa.column('id', sa.Integer), sa.column(column, sa.String))
+    value = rows.c[column]
+    last_id = 0
+    while True:
+        batch = conn.execute(
+            sa.select(rows.c.id, value)
+            .where(rows.c.id > last_id, sa.func.length(value) != 10)
+            .order_by(rows.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not batch:
+            break
+        conn.execute(
+            rows.update().where(rows.c.id == sa.bindparam('row_id')).values({column: sa.bindparam('value')}),
+            [
+                {'row_id': row_id, 'value': datetime.strptime(raw[:10].strip(), '%Y-%m-%d').date().isoformat()}
+                for row_id, raw in batch
+            ],
+        )
+        last_id = batch[-1][0]
+
+
+def _retype(table, column, existing_type, type_, using):
+    conn = op.get_bind()
+    if conn.dialect.name == 'sqlite':
+        # A batch alter_column would copy rows through CAST(... AS DATE), which
+        # SQLite evaluates with NUMERIC affinity ('2021-12-28' -> 2021). SQLite
+        # stores Date as YYYY-MM-DD text anyway, so rebuild the table from a
+        # reflected copy with the new type and move the values over untouched.
+        reflected = sa.Table(table, sa.MetaData(), autoload_with=conn)
+        reflected.c[column].type = type_
+        with op.batch_alter_table(table, recreate='always', copy_from=reflected):
+            pass
+    else:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(
+                column,
+                existing_type=existing_type,
+                type_=type_,
+                existing_nullable=False,
+                postgresql_using=using,
+            )
+
+
+def upgrade():
+    for table, column in DATE_COLUMNS:
+        _backfill(table, column)
+
+    for table, column in DATE_COLUMNS:
+        _retype(table, column, sa.String(), sa.Date(), f'{column}::date')
+
+
+def downgrade():
+    for table, column in DATE_COLUMNS:
+        _retype(table, column, sa.Date(), sa.String(), f"to_char({column}, 'YYYY-MM-DD')")
@@ -0,0 +1,53 @@
+"""add yield anomaly tables
+
+Revision ID: 9d2f6b8e4c71
+Revises: 5e8a3c1d7b42
+Create Date: 2026-10-18 22:41:09.276315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2f6b8e4c71'
+down_revision = '5e8a3c1d7b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The baselines are an exponential moving average over each animal's
+    # history, which SQL cannot backfill; run `flask rebuild-yield-baselines`
+    op.create_table('yield_baselines',
+    sa.Column('animal_id', sa.Integer(), nullable=False),
+    sa.Column('product_type', sa.String(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('day_total', sa.Float(), nullable=False),
+    sa.Column('mean', sa.Float(), nullable=False),
+    sa.Column('variance', sa.Float(), nullable=False),
+    sa.Column('days', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['animal_id'], ['animals.id'], name=op.f('fk_yield_baselines_animal_id_animals'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('animal_id', 'product_type', name=op.f('pk_yield_baselines'))
+    )
+    op.create_table('yield_alerts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('animal_id', sa.Integer(), nullable=False),
+    sa.Column('product_type', sa.String(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('quantity', sa.Float(), nullable=False),
+    sa.Column('expected', sa.Float(), nullable=False),
+    sa.Column('z_score', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('acknowledged_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['animal_id'], ['animals.id'], name=op.f('fk_yield_alerts_animal_id_animals'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_yield_alerts')),
+    sa.UniqueConstraint('animal_id', 'product_type', 'day', name='uq_yield_alerts_animal_id_product_type_day')
+    )
+    op.create_index(op.f('ix_yield_alerts_day'), 'yield_alerts', ['day'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_yield_alerts_day'), table_name='yield_alerts')
+    op.drop_table('yield_alerts')
+    op.drop_table('yield_baselines')
@@ -0,0 +1,58 @@
+"""add daily rollup tables
+
+Revision ID: a7c4e2f19d53
+Revises: 8b1e6d0c4a27
+Create Date: 2026-10-18 14:02:37.512904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c4e2f19d53'
+down_revision = '8b1e6d0c4a27'
+branch_labels = None
+depends_on = None
+
+# rollup table, source table, source date column, type column, measure columns
+ROLLUPS = [
+    ('daily_productions', 'productions', 'production_date', 'product_type', ['quantity']),
+    ('daily_sales', 'sales', 'sale_date', 'product_type', ['quantity_sold', 'amount']),
+    ('daily_feeds', 'feeds', 'date', 'feed_type', ['quantity']),
+]
+
+MEASURE_TYPES = {
+    'quantity': sa.Integer(),
+    'quantity_sold': sa.Integer(),
+    'amount': sa.Float(),
+}
+
+
+def upgrade():
+    for rollup, source, date_column, type_column, measures in ROLLUPS:
+        op.create_table(
+            rollup,
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('animal_id', sa.Integer(), nullable=False),
+            sa.Column(type_column, sa.String(), nullable=False),
+            *[sa.Column(name, MEASURE_TYPES[name], nullable=False) for name in measures],
+            sa.Column('record_count', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['animal_id'], ['animals.id'], name=op.f(f'fk_{rollup}_animal_id_animals')),
+            sa.PrimaryKeyConstraint('day', 'animal_id', type_column, name=op.f(f'pk_{rollup}')),
+        )
+        op.create_index(f'ix_{rollup}_animal_id_day', rollup, ['animal_id', 'day'], unique=False)
+
+        # Backfill from the existing rows
+        sums = ', '.join(f'SUM({name})' for name in measures)
+        op.execute(
+            f'INSERT INTO {rollup} (day, animal_id, {type_column}, {", ".join(measures)}, record_count) '
+            f'SELECT {date_column}, animal_id, {type_column}, {sums}, COUNT(*) FROM {source} '
+            f'GROUP BY {date_column}, animal_id, {type_column}'
+        )
+
+
+def downgrade():
+    for rollup, *_ in reversed(ROLLUPS):
+        op.drop_index(f'ix_{rollup}_animal_id_day', table_name=rollup)
+        op.drop_table(rollup)
@@ -0,0 +1,39 @@
+"""add versions table
+
+Revision ID: e2a6f0b93c18
+Revises: c5d83e1f7a90
+Create Date: 2026-10-18 16:27:05.338170
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a6f0b93c18'
+down_revision = 'c5d83e1f7a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('versions',
+    sa.Column('tag', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('tag', name=op.f('pk_versions'))
+    )
+
+    # Start every table at version 1 so Last-Modified is available right away
+    versions = sa.table('versions', sa.column('tag', sa.String), sa.column('version', sa.Integer), sa.column('updated_at', sa.DateTime))
+    now = datetime.utcnow()
+    op.bulk_insert(versions, [
+        {'tag': tag, 'version': 1, 'updated_at': now}
+        for tag in ('animal_types', 'animals', 'farmers', 'feeds', 'health_records', 'productions', 'sales')
+    ])
+
+
+def downgrade():
+    op.drop_table('versions')
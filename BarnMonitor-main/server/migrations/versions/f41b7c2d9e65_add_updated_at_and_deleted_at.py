@@ -0,0 +1,68 @@
+"""add updated_at and deleted_at
+
+Revision ID: f41b7c2d9e65
+Revises: e2a6f0b93c18
+Create Date: 2026-10-18 17:45:22.901846
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f41b7c2d9e65'
+down_revision = 'e2a6f0b93c18'
+branch_labels = None
+depends_on = None
+
+TABLES = ['animal_types', 'farmers', 'animals', 'feeds', 'health_records', 'productions', 'sales']
+
+# Unique columns that become unique among rows that are not deleted
+UNIQUE = [
+    ('animal_types', 'type_name'),
+    ('farmers', 'email'),
+    ('animals', 'name'),
+]
+
+ACTIVE = sa.text('deleted_at IS NULL')
+
+
+def upgrade():
+    now = datetime.utcnow()
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+            batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+        rows = sa.table(table, sa.column('updated_at', sa.DateTime))
+        op.execute(rows.update().values(updated_at=now))
+
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+            batch_op.create_index(batch_op.f(f'ix_{table}_updated_at'), ['updated_at'], unique=False)
+
+    for table, column in UNIQUE:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(batch_op.f(f'uq_{table}_{column}'), type_='unique')
+        op.create_index(
+            f'uq_{table}_{column}_active', table, [column], unique=True,
+            sqlite_where=ACTIVE, postgresql_where=ACTIVE,
+        )
+
+
+def downgrade():
+    for table, column in UNIQUE:
+        op.drop_index(f'uq_{table}_{column}_active', table_name=table)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_unique_constraint(batch_op.f(f'uq_{table}_{column}'), [column])
+
+    for table in reversed(TABLES):
+        # Rows that were only soft deleted go away for good
+        rows = sa.table(table, sa.column('deleted_at', sa.DateTime))
+        op.execute(rows.delete().where(rows.c.deleted_at.isnot(None)))
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_updated_at'))
+            batch_op.drop_column('deleted_at')
+            batch_op.drop_column('updated_at')
@@ -8,16 +8,21 @@ from .feed import Feed
 from .health_record import HealthRecord
 from .production import Production
 from .sale import Sale
+from .rollup import DailyProduction, DailySale, DailyFeed
+from .idempotency_key import IdempotencyKey
+from .version import Version
+from .server_session import ServerSession
+from .yield_alert import YieldBaseline, YieldAlert
 
 # Import the db instance from config
 from config import db
 
 # Register models with db to ensure they can be used with SQLAlchemy
-__all__ = ['Animal', 'AnimalType', 'Farmer', 'Feed', 'HealthRecord', 'Production', 'Sale']
+__all__ = ['Animal', 'AnimalType', 'Farmer', 'Feed', 'HealthRecord', 'Production', 'Sale', 'DailyProduction', 'DailySale', 'DailyFeed', 'IdempotencyKey', 'Version', 'ServerSession', 'YieldBaseline', 'YieldAlert']
 
 # This allows easier importing of models in other parts of the app
 def register_models():
-    models = [Animal, AnimalType, Farmer, Feed, HealthRecord, Production, Sale]
+    models = [Animal, AnimalType, Farmer, Feed, HealthRecord, Production, Sale, DailyProduction, DailySale, DailyFeed, IdempotencyKey, Version, ServerSession, YieldBaseline, YieldAlert]
     for model in models:
         db.Model.metadata.create_all(db.engine)
 
@@ -1,35 +1,52 @@
 from config import db, SerializerMixin, validates
+from .tracking import ChangeTrackingMixin
+from serializers import ANIMAL
+from dates import parse_date
 from datetime import date
 
-class Animal(db.Model, SerializerMixin):
+class Animal(db.Model, SerializerMixin, ChangeTrackingMixin):
     __tablename__ = 'animals'
+    __table_args__ = (
+        # Names only need to be unique among animals that are not deleted
+        db.Index('uq_animals_name_active', 'name', unique=True, sqlite_where=db.text('deleted_at IS NULL'), postgresql_where=db.text('deleted_at IS NULL')),
+    )
 
     serialize_rules =('-farmer.animals','-animal_type.animals','-health_records.animal','-production.animal','-feed_records.animal','-sales.animal',)
 
     id= db.Column(db.Integer, primary_key=True)
-    name= db.Column(db.String, unique=True, nullable=False) 
+    name= db.Column(db.String, nullable=False) 
     image= db.Column(db.String)   
     breed= db.Column(db.String)
     age= db.Column(db.Integer)    
     health_status= db.Column(db.String)
-    birth_date= db.Column(db.String, nullable=False)
+    birth_date= db.Column(db.Date, nullable=False)
 
-    farmer_id= db.Column(db.Integer,db.ForeignKey('farmers.id'))
-    animal_type_id= db.Column(db.Integer,db.ForeignKey('animal_types.id'))
+    farmer_id= db.Column(db.Integer,db.ForeignKey('farmers.id', ondelete='CASCADE'), index=True)
+    animal_type_id= db.Column(db.Integer,db.ForeignKey('animal_types.id', ondelete='SET NULL'), index=True)
 
     farmer= db.relationship('Farmer', back_populates='animals')
     animal_type= db.relationship('AnimalType', back_populates='animals')
-    health_records= db.relationship('HealthRecord', back_populates='animal', cascade='all, delete-orphan')
-    production= db.relationship('Production', back_populates='animal', cascade='all, delete-orphan')
-    feed_records = db.relationship('Feed', back_populates='animal', cascade='all, delete-orphan')
-    sales = db.relationship('Sale', back_populates='animal', cascade='all, delete-orphan')
+    # passive_deletes: the database (ON DELETE CASCADE) or models/tracking.py
+    # handles children that are not loaded, instead of loading them to delete
+    health_records= db.relationship('HealthRecord', back_populates='animal', cascade='all, delete-orphan', passive_deletes=True)
+    production= db.relationship('Production', back_populates='animal', cascade='all, delete-orphan', passive_deletes=True)
+    feed_records = db.relationship('Feed', back_populates='animal', cascade='all, delete-orphan', passive_deletes=True)
+    sales = db.relationship('Sale', back_populates='animal', cascade='all, delete-orphan', passive_deletes=True)
 
     @validates('birth_date')
     def validates_birth_date(self, key, dob):
+        try:
+            dob = parse_date(dob)
+        except ValueError:
+            raise ValueError("Date of birth must be in the format YYYY-MM-DD.")
         if dob >= date.today():
             raise ValueError("Date of birth cannot be in the future.")
         
         return dob
     
+    def to_dict(self, fields=None, include=None):
+        # Precompiled serializer (see serializers.py) instead of SerializerMixin reflection
+        return ANIMAL.dump(self, fields, include)
+
     def __repr__(self):
         return f'<Animal {self.id} {self.name} {self.breed}>'
@@ -1,24 +1,25 @@
 # models/animal_types.py
 from config import db, SerializerMixin
+from serializers import ANIMAL_TYPE
+from .tracking import ChangeTrackingMixin
 
-class AnimalType(db.Model, SerializerMixin):
+class AnimalType(db.Model, SerializerMixin, ChangeTrackingMixin):
     __tablename__ = 'animal_types'
+    __table_args__ = (
+        db.Index('uq_animal_types_type_name_active', 'type_name', unique=True, sqlite_where=db.text('deleted_at IS NULL'), postgresql_where=db.text('deleted_at IS NULL')),
+    )
 
     serialize_rules=('-animals.animal_type',)
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    type_name = db.Column(db.String, nullable=False, unique=True)
+    type_name = db.Column(db.String, nullable=False)
     description = db.Column(db.String)
 
-    animals = db.relationship('Animal', back_populates='animal_type')
+    animals = db.relationship('Animal', back_populates='animal_type', passive_deletes=True)
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'type_name': self.type_name,
-            'description': self.description,
-            # Avoid serializing related animals to prevent recursion
-        }
+    def to_dict(self, fields=None, include=None):
+        # Related animals are only serialized on request to prevent recursion
+        return ANIMAL_TYPE.dump(self, fields, include)
 
     def __repr__(self):
         return f"<AnimalType(id={self.id}, type_name='{self.type_name}', description='{self.description}')>"
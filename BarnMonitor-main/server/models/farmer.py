@@ -1,37 +1,36 @@
 from config import db, SerializerMixin
-from werkzeug.security import generate_password_hash
+from passwords import hash_password
+from serializers import FARMER
+from .tracking import ChangeTrackingMixin
 
-class Farmer(db.Model, SerializerMixin):
+class Farmer(db.Model, SerializerMixin, ChangeTrackingMixin):
     __tablename__ = 'farmers'
+    __table_args__ = (
+        db.Index('uq_farmers_email_active', 'email', unique=True, sqlite_where=db.text('deleted_at IS NULL'), postgresql_where=db.text('deleted_at IS NULL')),
+    )
 
     serialize_rules = ('-animals.farmer',)  # Exclude farmer info from animals when serializing
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
-    email = db.Column(db.String, unique=True, nullable=False)
+    email = db.Column(db.String, nullable=False)
     phone = db.Column(db.String, nullable=False)
     address = db.Column(db.String)  # Optional address field
     password = db.Column(db.String, nullable=False)
 
     # One-to-Many relationship with Animal
-    animals = db.relationship('Animal', back_populates='farmer', cascade='all, delete-orphan')
+    animals = db.relationship('Animal', back_populates='farmer', cascade='all, delete-orphan', passive_deletes=True)
 
     def __repr__(self):
         return f'<Farmer {self.id} {self.name} {self.email}>'
 
-    def to_dict(self):
+    def to_dict(self, fields=None, include=None):
         """
         Convert the Farmer instance into a dictionary.
         Exclude sensitive information like the password.
         """
-        return {
-            'id': self.id,
-            'name': self.name,
-            'email': self.email,
-            'phone': self.phone,
-            'address': self.address,
-            # Note: password is not included in the dictionary for security
-        }
+        # Note: password is not part of the FARMER schema for security
+        return FARMER.dump(self, fields, include)
 
     @staticmethod
     def create_farmer(name, email, phone, address, password):
@@ -39,7 +38,7 @@ class Farmer(db.Model, SerializerMixin):
         Static method to create a new Farmer instance.
         The password is hashed before storing it in the database.
         """
-        hashed_password = generate_password_hash(password)
+        hashed_password = hash_password(password)
         new_farmer = Farmer(
             name=name,
             email=email,
@@ -1,17 +1,22 @@
 from config import db, SerializerMixin   
+from .tracking import ChangeTrackingMixin
 from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey 
 from sqlalchemy.orm import relationship  
+from serializers import FEED
 
-class Feed(db.Model, SerializerMixin):
+class Feed(db.Model, SerializerMixin, ChangeTrackingMixin):
     __tablename__ = 'feeds'  
+    __table_args__ = (
+        db.Index('ix_feeds_animal_id_date', 'animal_id', 'date'),  # per-animal history, FK lookups
+    )
 
     serialize_rules=('-animal.feed_records',)
     
     id = Column(Integer, primary_key=True, autoincrement=True) 
-    animal_id = Column(Integer, ForeignKey('animals.id'), nullable=False)  
+    animal_id = Column(Integer, ForeignKey('animals.id', ondelete='CASCADE'), nullable=False)  
     feed_type = Column(String, nullable=False)  
     quantity = Column(Integer, nullable=False)  
-    date = Column(Date, nullable=False)  
+    date = Column(Date, nullable=False, index=True)  
 
     # Many-to-One relationship with Animal
     animal = relationship('Animal', back_populates='feed_records')  
@@ -19,11 +24,6 @@ class Feed(db.Model, SerializerMixin):
     def __repr__(self):
         return f"<Feed(id={self.id}, animal_id={self.animal_id}, feed_type='{self.feed_type}', quantity={self.quantity}, date='{self.date}')>"
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'animal_id': self.animal_id,
-            'feed_type': self.feed_type,
-            'quantity': self.quantity,
-            'date': self.date.isoformat()  # Format date as ISO string for JSON serialization
-        }
+    def to_dict(self, fields=None, include=None):
+        # date is formatted as an ISO string for JSON serialization
+        return FEED.dump(self, fields, include)
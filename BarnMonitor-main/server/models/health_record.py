@@ -1,29 +1,28 @@
 from config import db, SerializerMixin
+from .tracking import ChangeTrackingMixin
 from datetime import datetime
+from serializers import HEALTH_RECORD
 
-class HealthRecord(db.Model, SerializerMixin):
+class HealthRecord(db.Model, SerializerMixin, ChangeTrackingMixin):
     __tablename__ = 'health_records'
+    __table_args__ = (
+        db.Index('ix_health_records_animal_id_checkup_date', 'animal_id', 'checkup_date'),
+    )
 
     serialize_rules = ('-animal.health_records',)
 
     id = db.Column(db.Integer, primary_key=True)
-    animal_id = db.Column(db.Integer, db.ForeignKey('animals.id'), nullable=False)
-    checkup_date = db.Column(db.DateTime, nullable=False)  # Ensure it's non-nullable
+    animal_id = db.Column(db.Integer, db.ForeignKey('animals.id', ondelete='CASCADE'), nullable=False)
+    checkup_date = db.Column(db.DateTime, nullable=False, index=True)  # Ensure it's non-nullable
     treatment = db.Column(db.String, nullable=False)
     notes = db.Column(db.String)
     vet_name = db.Column(db.String, nullable=False)
 
     animal = db.relationship("Animal", back_populates="health_records")
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'animal_id': self.animal_id,
-            'checkup_date': self.checkup_date.strftime('%Y-%m-%d'),
-            'treatment': self.treatment,
-            'vet_name': self.vet_name,
-            'notes': self.notes,  # Add notes field to the response
-        }
+    def to_dict(self, fields=None, include=None):
+        # checkup_date is formatted as YYYY-MM-DD
+        return HEALTH_RECORD.dump(self, fields, include)
 
     def __repr__(self):
         return f"<HealthRecord(id={self.id}, animal_id={self.animal_id}, checkup_date='{self.checkup_date}', treatment='{self.treatment}', vet_name='{self.vet_name}')>"
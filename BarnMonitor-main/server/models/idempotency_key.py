@@ -0,0 +1,20 @@
+# models/idempotency_key.py
+from datetime import datetime
+
+from config import db
+
+
+# Responses of requests sent with an Idempotency-Key header, replayed when a
+# client retries the same request (see idempotency.py).
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+
+    key = db.Column(db.String, primary_key=True)  # '<user_id>:<Idempotency-Key>'
+    fingerprint = db.Column(db.String, nullable=False)  # sha256 of user, method, path and body
+    status_code = db.Column(db.Integer, nullable=False)
+    response = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key} {self.status_code}>'
@@ -1,23 +1,28 @@
 from config import db, SerializerMixin
+from .tracking import ChangeTrackingMixin
+from serializers import PRODUCTION
 
 from sqlalchemy.orm import validates
-from datetime import datetime
+from dates import parse_date
 
 
-class Production(db.Model, SerializerMixin):
+class Production(db.Model, SerializerMixin, ChangeTrackingMixin):
     __tablename__ = 'productions'
+    __table_args__ = (
+        db.Index('ix_productions_animal_id_production_date', 'animal_id', 'production_date'),
+    )
 
     serialize_rules = ('-animal.production','-sales.production',)
 
     id = db.Column(db.Integer, primary_key=True)
-    animal_id = db.Column(db.Integer, db.ForeignKey('animals.id'), nullable=False)
+    animal_id = db.Column(db.Integer, db.ForeignKey('animals.id', ondelete='CASCADE'), nullable=False)
     product_type = db.Column(db.String, nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
-    production_date = db.Column(db.String, nullable=False)
+    production_date = db.Column(db.Date, nullable=False, index=True)
 
     # Relationships
     animal = db.relationship('Animal', back_populates='production')
-    sales = db.relationship('Sale', back_populates='production', cascade='all, delete-orphan')
+    sales = db.relationship('Sale', back_populates='production', cascade='all, delete-orphan', passive_deletes=True)
 
     # Validations
     @validates('product_type')
@@ -35,11 +40,13 @@ class Production(db.Model, SerializerMixin):
     @validates('production_date')
     def validate_production_date(self, key, value):
         try:
-            # Ensure the date is in YYYY-MM-DD format
-            datetime.strptime(value, "%Y-%m-%d")
+            # Accept a date or a YYYY-MM-DD string, store a date
+            return parse_date(value)
         except ValueError:
             raise ValueError("Production date must be in the format YYYY-MM-DD.")
-        return value
+
+    def to_dict(self, fields=None, include=None):
+        return PRODUCTION.dump(self, fields, include)
 
     def __repr__(self):
         return f'<Production {self.id} {self.product_type} {self.quantity}>'
\ No newline at end of file
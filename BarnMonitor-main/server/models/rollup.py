@@ -0,0 +1,55 @@
+# models/rollup.py
+from config import db
+
+
+# Daily rollups (day x animal x type) maintained by rollups.py on every
+# insert, update and delete of the source rows. Reports read these instead of
+# scanning productions / sales / feeds.
+
+class DailyProduction(db.Model):
+    __tablename__ = 'daily_productions'
+    __table_args__ = (
+        db.Index('ix_daily_productions_animal_id_day', 'animal_id', 'day'),
+    )
+
+    day = db.Column(db.Date, primary_key=True)
+    animal_id = db.Column(db.Integer, db.ForeignKey('animals.id', ondelete='CASCADE'), primary_key=True)
+    product_type = db.Column(db.String, primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    record_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DailyProduction {self.day} {self.animal_id} {self.product_type} {self.quantity}>'
+
+
+class DailySale(db.Model):
+    __tablename__ = 'daily_sales'
+    __table_args__ = (
+        db.Index('ix_daily_sales_animal_id_day', 'animal_id', 'day'),
+    )
+
+    day = db.Column(db.Date, primary_key=True)
+    animal_id = db.Column(db.Integer, db.ForeignKey('animals.id', ondelete='CASCADE'), primary_key=True)
+    product_type = db.Column(db.String, primary_key=True)
+    quantity_sold = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Float, nullable=False, default=0)
+    record_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DailySale {self.day} {self.animal_id} {self.product_type} {self.amount}>'
+
+
+class DailyFeed(db.Model):
+    __tablename__ = 'daily_feeds'
+    __table_args__ = (
+        db.Index('ix_daily_feeds_animal_id_day', 'animal_id', 'day'),
+    )
+
+    day = db.Column(db.Date, primary_key=True)
+    animal_id = db.Column(db.Integer, db.ForeignKey('animals.id', ondelete='CASCADE'), primary_key=True)
+    feed_type = db.Column(db.String, primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    record_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DailyFeed {self.day} {self.animal_id} {self.feed_type} {self.quantity}>'
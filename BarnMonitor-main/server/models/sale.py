@@ -1,20 +1,25 @@
 from config import db, SerializerMixin
+from .tracking import ChangeTrackingMixin
+from serializers import SALE
 from sqlalchemy.orm import validates
-from datetime import datetime
+from dates import parse_date
 
 
-class Sale(db.Model, SerializerMixin):
+class Sale(db.Model, SerializerMixin, ChangeTrackingMixin):
     __tablename__ = 'sales'
+    __table_args__ = (
+        db.Index('ix_sales_animal_id_sale_date', 'animal_id', 'sale_date'),
+    )
 
     serialize_rules=('-animal.sales','-production.sales',)
     
     id = db.Column(db.Integer, primary_key=True)
-    animal_id = db.Column(db.Integer, db.ForeignKey('animals.id'), nullable=False)
+    animal_id = db.Column(db.Integer, db.ForeignKey('animals.id', ondelete='CASCADE'), nullable=False)
     product_type = db.Column(db.String, nullable=False)
     quantity_sold = db.Column(db.Integer, nullable=False)
-    sale_date = db.Column(db.String, nullable=False)
+    sale_date = db.Column(db.Date, nullable=False, index=True)
     amount = db.Column(db.Float, nullable=False)
-    production_id = db.Column(db.Integer, db.ForeignKey('productions.id'))
+    production_id = db.Column(db.Integer, db.ForeignKey('productions.id', ondelete='CASCADE'), index=True)
 
     # Relationships
     animal = db.relationship('Animal', back_populates='sales')
@@ -36,11 +41,10 @@ class Sale(db.Model, SerializerMixin):
     @validates('sale_date')
     def validate_sale_date(self, key, value):
         try:
-            # Ensure the date is in YYYY-MM-DD format
-            datetime.strptime(value, "%Y-%m-%d")
+            # Accept a date or a YYYY-MM-DD string, store a date
+            return parse_date(value)
         except ValueError:
             raise ValueError("Sale date must be in the format YYYY-MM-DD.")
-        return value
 
     @validates('amount')
     def validate_amount(self, key, value):
@@ -48,6 +52,9 @@ class Sale(db.Model, SerializerMixin):
             raise ValueError("Amount must be a non-negative number.")
         return float(value)
 
+    def to_dict(self, fields=None, include=None):
+        return SALE.dump(self, fields, include)
+
     def __repr__(self):
         return f'<Sale {self.id} {self.product_type} {self.quantity_sold}>'
     
\ No newline at end of file
@@ -0,0 +1,16 @@
+# models/server_session.py
+from config import db
+
+
+# Server-side sessions for SESSION_BACKEND = 'sql' (see sessions.py). Rows are
+# read and written on their own connection, outside the request's db.session.
+
+class ServerSession(db.Model):
+    __tablename__ = 'sessions'
+
+    id = db.Column(db.String(64), primary_key=True)  # the session id the signed cookie carries
+    data = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<ServerSession {self.id} {self.expires_at}>'
@@ -0,0 +1,84 @@
+# models/tracking.py
+from datetime import datetime
+
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import with_loader_criteria
+
+from config import db
+
+
+# updated_at / deleted_at tracking for the API models, used by /sync.
+#
+# Deleting a tracked row marks it with deleted_at instead of removing it, so
+# offline clients can learn about the deletion. Every ORM SELECT then hides
+# rows with a deleted_at, unless it is run with
+# execution_options(include_deleted=True).
+
+class ChangeTrackingMixin:
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    deleted_at = db.Column(db.DateTime)
+
+
+# Called as hook(session, model, where) just before a cascaded soft delete
+# marks the model rows matching where; rollups.py and versions.py use this
+# to account for rows that never enter the session.
+cascade_hooks = []
+
+
+def _cascade(session, model, parent_ids, now, skip):
+    """
+    Soft delete the children of the model rows in parent_ids (a list or a
+    SELECT of ids) with one UPDATE per relationship, deepest level first so
+    each level can still find its live parents.
+    """
+    for relationship in inspect(model).relationships:
+        if not (relationship.cascade.delete and relationship.passive_deletes):
+            continue
+        child = relationship.mapper.class_
+        [(_, foreign_key)] = relationship.local_remote_pairs
+        where = [foreign_key.in_(parent_ids), child.deleted_at.is_(None)]
+        if skip.get(child):
+            # Children already loaded into the session are soft deleted as objects
+            where.append(child.id.not_in(skip[child]))
+
+        _cascade(session, child, select(child.id).where(*where), now, skip)
+        for hook in cascade_hooks:
+            hook(session, child, where)
+        session.execute(
+            update(child).where(*where).values(deleted_at=now, updated_at=now),
+            execution_options={'synchronize_session': False},
+        )
+
+
+@event.listens_for(db.session, 'before_flush', insert=True)
+def soft_delete(session, flush_context, instances):
+    # Runs before the other before_flush listeners, which then see an update
+    # that sets deleted_at rather than a delete. Children that were not loaded
+    # (passive_deletes) are marked with set-based UPDATEs instead.
+    deleted = [obj for obj in session.deleted if isinstance(obj, ChangeTrackingMixin)]
+    if not deleted:
+        return
+
+    now = datetime.utcnow()
+    skip = {}
+    for obj in deleted:
+        skip.setdefault(type(obj), []).append(obj.id)
+    for model, ids in skip.items():
+        _cascade(session, model, ids, now, skip)
+
+    for obj in deleted:
+        obj.deleted_at = now
+        session.add(obj)
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def hide_deleted(execute_state):
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+        and not execute_state.execution_options.get('include_deleted', False)
+    ):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(ChangeTrackingMixin, lambda cls: cls.deleted_at.is_(None), include_aliases=True)
+        )
@@ -0,0 +1,20 @@
+# models/version.py
+from datetime import datetime
+
+from config import db
+
+
+# Change counters per table ('animals', split into shards 'animals#0'...),
+# farmer ('farmer:1') and animal ('animal:3'), bumped in the same transaction
+# as every write (see versions.py).
+# ETags and Last-Modified headers are derived from these without touching rows.
+
+class Version(db.Model):
+    __tablename__ = 'versions'
+
+    tag = db.Column(db.String, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Version {self.tag} {self.version}>'
@@ -0,0 +1,50 @@
+# models/yield_alert.py
+from datetime import datetime
+
+from config import db
+from serializers import YIELD_ALERT
+
+
+# Streaming yield anomaly detection (see anomalies.py). One baseline row per
+# animal and product type holds everything the detector needs, so a new
+# production never has to look at the animal's history.
+
+class YieldBaseline(db.Model):
+    __tablename__ = 'yield_baselines'
+
+    animal_id = db.Column(db.Integer, db.ForeignKey('animals.id', ondelete='CASCADE'), primary_key=True)
+    product_type = db.Column(db.String, primary_key=True)
+    day = db.Column(db.Date, nullable=False)  # latest day seen, not scored yet
+    day_total = db.Column(db.Float, nullable=False)  # its total so far
+    mean = db.Column(db.Float, nullable=False)  # EWMA of the scored daily totals
+    variance = db.Column(db.Float, nullable=False)  # EWMA variance
+    days = db.Column(db.Integer, nullable=False)  # number of scored days
+
+    def __repr__(self):
+        return f'<YieldBaseline {self.animal_id} {self.product_type} {self.mean:.1f}>'
+
+
+class YieldAlert(db.Model):
+    __tablename__ = 'yield_alerts'
+    __table_args__ = (
+        db.UniqueConstraint('animal_id', 'product_type', 'day', name='uq_yield_alerts_animal_id_product_type_day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    animal_id = db.Column(db.Integer, db.ForeignKey('animals.id', ondelete='CASCADE'), nullable=False)
+    product_type = db.Column(db.String, nullable=False)
+    day = db.Column(db.Date, nullable=False, index=True)
+    quantity = db.Column(db.Float, nullable=False)  # the day's total
+    expected = db.Column(db.Float, nullable=False)  # the baseline average before that day
+    z_score = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    acknowledged_at = db.Column(db.DateTime)
+
+    # No back_populates: alerts stay out of the animal's nested shapes and soft-delete cascade
+    animal = db.relationship('Animal')
+
+    def to_dict(self, fields=None, include=None):
+        return YIELD_ALERT.dump(self, fields, include)
+
+    def __repr__(self):
+        return f'<YieldAlert {self.animal_id} {self.product_type} {self.day} {self.z_score:.1f}>'
@@ -0,0 +1,164 @@
+# server/pagination.py
+import base64
+import binascii
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+from flask import current_app, jsonify, make_response, request
+from sqlalchemy import DateTime, select
+
+from dates import parse_date
+from models import Animal, DailyFeed, DailyProduction, DailySale, Farmer, Feed, HealthRecord, Production, Sale, YieldAlert
+
+
+class ListParamsError(ValueError):
+    """Raised when a list endpoint receives a bad limit, cursor or filter."""
+
+
+# Column used by the start_date / end_date filters on each collection
+DATE_COLUMNS = {
+    Animal: Animal.birth_date,
+    Feed: Feed.date,
+    HealthRecord: HealthRecord.checkup_date,
+    Production: Production.production_date,
+    Sale: Sale.sale_date,
+    DailyFeed: DailyFeed.day,
+    DailyProduction: DailyProduction.day,
+    DailySale: DailySale.day,
+    YieldAlert: YieldAlert.day,
+}
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(f'id:{last_id}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        prefix, _, value = base64.urlsafe_b64decode(padded).decode().partition(':')
+        if prefix != 'id':
+            raise ValueError
+        return int(value)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ListParamsError('Invalid cursor')
+
+
+def _int_arg(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ListParamsError(f'{name} must be an integer')
+
+
+def _date_arg(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return parse_date(value)
+    except ValueError:
+        raise ListParamsError(f'{name} must be in the format YYYY-MM-DD')
+
+
+def apply_filters(query, model, args=None):
+    """
+    Narrow a collection query with the animal_id, farmer_id,
+    start_date and end_date query string filters.
+    """
+    args = request.args if args is None else args
+
+    animal_id = _int_arg(args, 'animal_id')
+    if animal_id is not None:
+        if model is Animal:
+            query = query.filter(Animal.id == animal_id)
+        elif hasattr(model, 'animal_id'):
+            query = query.filter(model.animal_id == animal_id)
+
+    farmer_id = _int_arg(args, 'farmer_id')
+    if farmer_id is not None:
+        if model is Farmer:
+            query = query.filter(Farmer.id == farmer_id)
+        elif model is Animal:
+            query = query.filter(Animal.farmer_id == farmer_id)
+        elif hasattr(model, 'animal_id'):
+            # Child records reach the farmer through their animal
+            farmer_animals = select(Animal.id).where(Animal.farmer_id == farmer_id)
+            query = query.filter(model.animal_id.in_(farmer_animals))
+
+    column = DATE_COLUMNS.get(model)
+    start_date = _date_arg(args, 'start_date')
+    end_date = _date_arg(args, 'end_date')
+    if column is not None and (start_date or end_date):
+        if isinstance(column.type, DateTime):
+            # end_date is inclusive, so compare against the following midnight
+            if start_date:
+                query = query.filter(column >= datetime.combine(start_date, datetime.min.time()))
+            if end_date:
+                query = query.filter(column < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+        else:
+            if start_date:
+                query = query.filter(column >= start_date)
+            if end_date:
+                query = query.filter(column <= end_date)
+
+    return query
+
+
+def page_limit(args):
+    """The page size asked for with limit (or implied by a cursor), capped at PAGINATION_MAX_LIMIT."""
+    limit = _int_arg(args, 'limit')
+    if limit is None and args.get('cursor'):
+        limit = current_app.config['PAGINATION_PAGE_SIZE']
+    if limit is None:
+        limit = current_app.config['PAGINATION_DEFAULT_LIMIT']
+    if limit is not None:
+        if limit < 1:
+            raise ListParamsError('limit must be a positive integer')
+        limit = min(limit, current_app.config['PAGINATION_MAX_LIMIT'])
+    return limit
+
+
+def paginate(query, model, args=None):
+    """
+    Keyset pagination on the primary key.
+
+    Returns (items, next_cursor). Without a limit the page holds
+    PAGINATION_DEFAULT_LIMIT rows (the whole collection if that is None);
+    every limit is capped at PAGINATION_MAX_LIMIT.
+    """
+    args = request.args if args is None else args
+
+    limit = page_limit(args)
+    cursor = args.get('cursor')
+    query = query.order_by(model.id)
+    if cursor:
+        query = query.filter(model.id > decode_cursor(cursor))
+
+    if limit is None:
+        return query.all(), None
+
+    # Fetch one extra row to learn whether another page exists
+    items = query.limit(limit + 1).all()
+    if len(items) > limit:
+        items = items[:limit]
+        return items, encode_cursor(items[-1].id)
+    return items, None
+
+
+def list_response(data, next_cursor, status=200):
+    """
+    Build a JSON list response. The body stays as it is (a plain list, or
+    /sync's collections); the next page is advertised through the
+    X-Next-Cursor and Link headers.
+    """
+    response = make_response(jsonify(data), status)
+    if next_cursor:
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{request.path}?{urlencode(args)}>; rel="next"'
+    return response
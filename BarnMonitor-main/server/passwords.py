@@ -0,0 +1,91 @@
+# server/passwords.py
+"""
+Password hashing on a bounded thread pool.
+
+scrypt / pbkdf2 take 100ms+ of CPU per call. hashlib releases the GIL while
+hashing, so running them inline lets a burst of logins occupy every core and
+starve the other requests. Here at most PASSWORD_HASH_WORKERS hashes run at
+once and PASSWORD_HASH_QUEUE more may wait; anything beyond that is refused
+with PasswordHashingBusy (503 + Retry-After) instead of piling up.
+
+PASSWORD_HASH_METHOD is any werkzeug method, e.g. 'scrypt:32768:8:1' or
+'pbkdf2:sha256:600000'. Hashes made with another method (or cost) are
+replaced on the next successful login.
+
+PASSWORD_HASH_WORKERS = 0 hashes inline on the request thread, as before.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHashingBusy(RuntimeError):
+    """Raised when the hashing pool and its queue are full."""
+
+
+class PasswordHasher:
+    def __init__(self, method, workers, queue):
+        self.method = method
+        self._executor = None
+        if workers:
+            # The executor's own queue is unbounded; the semaphore bounds it
+            self._slots = threading.BoundedSemaphore(workers + queue)
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._current_prefix = None
+
+    def _run(self, fn, *args):
+        if self._executor is None:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashingBusy('Too many password hashes in progress')
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def _hash(self, password):
+        return generate_password_hash(password, method=self.method)
+
+    def _verify(self, stored, password):
+        if not check_password_hash(stored, password):
+            return False, None
+        if self.needs_rehash(stored):
+            return True, self._hash(password)
+        return True, None
+
+    def needs_rehash(self, stored):
+        if self._current_prefix is None:
+            # werkzeug fills in default parameters ('scrypt' -> 'scrypt:32768:8:1')
+            self._current_prefix = self._hash('').split('$', 1)[0]
+        return stored.split('$', 1)[0] != self._current_prefix
+
+    def hash(self, password):
+        return self._run(self._hash, password)
+
+    def verify(self, stored, password):
+        """(matches, new_hash); new_hash is set when stored used an outdated method."""
+        return self._run(self._verify, stored, password)
+
+
+def get_hasher():
+    """The pool for the current app, created on first use (so after a gunicorn fork)."""
+    if 'password_hasher' not in current_app.extensions:
+        current_app.extensions['password_hasher'] = PasswordHasher(
+            current_app.config['PASSWORD_HASH_METHOD'],
+            current_app.config['PASSWORD_HASH_WORKERS'],
+            current_app.config['PASSWORD_HASH_QUEUE'],
+        )
+    return current_app.extensions['password_hasher']
+
+
+def hash_password(password):
+    return get_hasher().hash(password)
+
+
+def verify_password(stored, password):
+    return get_hasher().verify(stored, password)
@@ -0,0 +1,151 @@
+# server/profiling.py
+"""
+Profile one request in a running server.
+
+A request sent with `X-Profile: <PROFILE_TOKEN>` runs under a profiler and
+its profile is saved in PROFILE_DIR; the response names it in the
+X-Profile-Id header and GET /profiles/<id> (same header) downloads it.
+Without PROFILE_TOKEN set, or without the header, a request only pays for
+one header lookup.
+
+`X-Profile-Mode` picks the profiler:
+
+- 'sample' (default): a thread samples the request's stack every
+  PROFILE_INTERVAL seconds and writes collapsed stacks ('a;b;c 12' per
+  line), which flamegraph.pl, speedscope and inferno read directly.
+- 'cprofile': cProfile traces every call and writes a pstats file, for
+  snakeviz or `python -m pstats`. Slower, but exact call counts.
+
+The profile covers before_request to teardown, so a streamed export is
+profiled until its last chunk.
+"""
+import cProfile
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app, g, request
+
+from config import app
+
+
+MODES = ('sample', 'cprofile')
+PROFILE_ID = re.compile(r'^[\w.-]+$')
+
+
+def authorized():
+    """Whether the request carries the profiling token (always False while PROFILE_TOKEN is unset)."""
+    token = current_app.config['PROFILE_TOKEN']
+    given = request.headers.get('X-Profile')
+    return bool(token and given) and hmac.compare_digest(given.encode(), token.encode())
+
+
+def _frame_name(code, prefixes):
+    filename = code.co_filename
+    for prefix in prefixes:
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):].lstrip(os.sep)
+            break
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+class Sampler:
+    """Samples one thread's stack from a background thread into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+        # Longest first, so site-packages wins over the lib directory holding it
+        self._prefixes = sorted({path for path in sys.path if path}, key=len, reverse=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code, self._prefixes))
+                frame = frame.f_back
+            if stack:
+                key = ';'.join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f'{stack} {count}\n')
+
+
+class TracingProfiler:
+    """cProfile with the Sampler's interface."""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def save(self, path):
+        self.profile.dump_stats(path)
+
+
+def _profile_id(mode):
+    rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    slug = re.sub(r'[^\w]+', '-', rule).strip('-') or 'root'
+    suffix = 'collapsed' if mode == 'sample' else 'pstats'
+    return f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{request.method.lower()}-{slug}.{suffix}"
+
+
+@app.before_request
+def start_profile():
+    if 'X-Profile' not in request.headers or not authorized():
+        return None
+    mode = request.headers.get('X-Profile-Mode', 'sample')
+    if mode not in MODES:
+        return {'error': f"X-Profile-Mode must be one of: {', '.join(MODES)}"}, 400
+
+    config = current_app.config
+    os.makedirs(config['PROFILE_DIR'], exist_ok=True)
+    if mode == 'sample':
+        profiler = Sampler(threading.get_ident(), config['PROFILE_INTERVAL'])
+    else:
+        profiler = TracingProfiler()
+    g.profile = {'id': _profile_id(mode), 'profiler': profiler, 'started': time.perf_counter()}
+    profiler.start()
+    return None
+
+
+@app.after_request
+def name_profile(response):
+    profile = g.get('profile')
+    if profile is not None:
+        response.headers['X-Profile-Id'] = profile['id']
+    return response
+
+
+@app.teardown_request
+def save_profile(exc):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return
+    profile['profiler'].stop()
+    path = os.path.join(current_app.config['PROFILE_DIR'], profile['id'])
+    profile['profiler'].save(path)
+    current_app.logger.info('Profiled %s %s in %.0f ms: %s', request.method, request.path,
+                            (time.perf_counter() - profile['started']) * 1000, path)
@@ -0,0 +1,160 @@
+# server/queries.py
+from contextlib import contextmanager
+
+from flask import request
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+from config import db
+from models import Animal, AnimalType, Farmer, Feed, HealthRecord, Production, Sale, YieldAlert
+from pagination import ListParamsError
+import serializers
+
+
+# Loader strategies matched to what each model's to_dict() walks.
+# Many-to-one relationships use joinedload (one row per parent, safe with LIMIT);
+# collections use selectinload (one extra SELECT ... IN per relationship).
+
+def animal_loaders():
+    """Everything Animal.to_dict() touches."""
+    return [
+        joinedload(Animal.farmer),
+        joinedload(Animal.animal_type),
+        selectinload(Animal.health_records),
+        selectinload(Animal.feed_records),
+        selectinload(Animal.production).selectinload(Production.sales),
+        selectinload(Animal.sales).joinedload(Sale.production),
+    ]
+
+
+def farmer_detail_loaders():
+    """Farmer plus every animal serialized by GET /farmers/<id>."""
+    return [selectinload(Farmer.animals).options(*animal_loaders())]
+
+
+def production_loaders():
+    return [
+        selectinload(Production.animal).options(*animal_loaders()),
+        selectinload(Production.sales),
+    ]
+
+
+def sale_loaders():
+    return [
+        selectinload(Sale.animal).options(*animal_loaders()),
+        joinedload(Sale.production),
+    ]
+
+
+# Endpoint serialization shape -> (model, loader options)
+SHAPES = {
+    'animal': (Animal, animal_loaders),
+    'animal_type': (AnimalType, list),
+    'farmer': (Farmer, list),
+    'farmer_detail': (Farmer, farmer_detail_loaders),
+    'feed': (Feed, list),
+    'health_record': (HealthRecord, list),
+    'production': (Production, production_loaders),
+    'sale': (Sale, sale_loaders),
+    'yield_alert': (YieldAlert, list),
+}
+
+SCHEMAS = {
+    Animal: serializers.ANIMAL,
+    AnimalType: serializers.ANIMAL_TYPE,
+    Farmer: serializers.FARMER,
+    Feed: serializers.FEED,
+    HealthRecord: serializers.HEALTH_RECORD,
+    Production: serializers.PRODUCTION,
+    Sale: serializers.SALE,
+    YieldAlert: serializers.YIELD_ALERT,
+}
+
+
+def sparse_fieldset(args=None):
+    """Read the comma separated ?fields= and ?include= parameters (None when absent)."""
+    args = request.args if args is None else args
+    fields = args.get('fields')
+    include = args.get('include')
+    return (
+        None if fields is None else [f.strip() for f in fields.split(',') if f.strip()],
+        None if include is None else [i.strip() for i in include.split(',') if i.strip()],
+    )
+
+
+def sparse_loaders(model, schema, fields=None, include=None, required=()):
+    """
+    Loader options for a fields/include request: load_only() restricts the
+    SELECT to the requested columns (plus keys needed to join), and only the
+    included relationships get an eager loader.
+    """
+    columns, relationships = schema.selection(fields, include)
+    mapper = inspect(model)
+
+    keep = set(mapper.primary_key) | set(required)
+    keep |= {mapper.columns[name] for name in columns}
+    options = []
+    for name, (child_schema, child_fields, child_include) in relationships.items():
+        rel = mapper.relationships[name]
+        keep |= set(rel.local_columns)
+        strategy = selectinload if rel.uselist else joinedload
+        child_options = sparse_loaders(rel.mapper.class_, child_schema, child_fields, child_include, rel.remote_side)
+        options.append(strategy(getattr(model, name)).options(*child_options))
+
+    attributes = [getattr(model, mapper.get_property_by_column(column).key) for column in keep]
+    options.append(load_only(*attributes))
+    return options
+
+
+def query_for(shape, fields=None, include=None):
+    """
+    Return a query for the given shape with its eager loaders applied.
+    With fields/include the column list and loaders follow the request instead.
+    """
+    model, loaders = SHAPES[shape]
+    if fields is None and include is None:
+        return model.query.options(*loaders())
+    try:
+        return model.query.options(*sparse_loaders(model, SCHEMAS[model], fields, include))
+    except ValueError as e:
+        raise ListParamsError(str(e))
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine=None):
+    """
+    Count the SQL statements executed inside the block.
+
+        with count_queries() as counter:
+            client.get('/animals')
+        print(counter.count)
+    """
+    engine = engine or db.engine
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+    """Fail with AssertionError if the block runs more than `limit` SQL statements."""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        statements = '\n'.join(counter.statements)
+        raise AssertionError(f'Expected at most {limit} queries, got {counter.count}:\n{statements}')
@@ -0,0 +1,110 @@
+# server/representations.py
+"""
+Response encodings: JSON with orjson, or MessagePack with msgspec.
+
+app.json (behind jsonify, request.get_json and the NDJSON export) and
+Flask-RESTful's representations (used when a Resource returns a dict or a
+(dict, status) tuple) both go through OrjsonProvider, so every route answers
+`Accept: application/msgpack` with MessagePack and anything else with JSON.
+
+JSON is compact, and indented only in debug mode or when the request asks
+for ?pretty=1. Keys are sorted, as Flask's own provider sorts them, so the
+wire format does not depend on how a dict was built. date and datetime
+values come out as ISO 8601, numpy arrays and scalars are written natively,
+and Decimal is written as a string (as Flask's own provider does) so no
+precision is lost. MessagePack carries the same values in the same order.
+"""
+import decimal
+
+import msgspec
+import orjson
+from flask import current_app, has_request_context, request
+from flask.json.provider import JSONProvider
+
+from config import api, app
+
+
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SORT_KEYS
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+# Offered to clients in this order, so JSON wins when Accept allows both equally
+MEDIATYPES = (JSON, MSGPACK, 'application/x-msgpack')
+
+
+def _default(value):
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if hasattr(value, '__html__'):  # markupsafe.Markup, like Flask's provider
+        return str(value.__html__())
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _msgpack_default(value):
+    if hasattr(value, 'tolist'):  # numpy arrays and scalars
+        return value.tolist()
+    return _default(value)
+
+
+msgpack_encoder = msgspec.msgpack.Encoder(enc_hook=_msgpack_default, order='sorted')
+
+
+def negotiated():
+    """The response mediatype for the current request's Accept header."""
+    if not has_request_context():
+        return JSON
+    return request.accept_mimetypes.best_match(MEDIATYPES, default=JSON)
+
+
+def pretty():
+    """Whether responses to the current request are indented."""
+    if current_app.debug:
+        return True
+    return has_request_context() and request.args.get('pretty') in ('1', 'true')
+
+
+class OrjsonProvider(JSONProvider):
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def encode(self, obj, mediatype=JSON):
+        """
+        Response body for mediatype. JSON is UTF-8 with a trailing newline,
+        indented if pretty().
+        """
+        if mediatype != JSON:
+            return msgpack_encoder.encode(obj)
+        option = OPTIONS | orjson.OPT_APPEND_NEWLINE
+        if pretty():
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        mediatype = negotiated()
+        return self._app.response_class(self.encode(obj, mediatype), mimetype=mediatype)
+
+
+app.json = OrjsonProvider(app)
+
+
+def _output(mediatype):
+    def output(data, code, headers=None):
+        response = app.response_class(app.json.encode(data, mediatype), status=code, mimetype=mediatype)
+        response.headers.extend(headers or {})
+        return response
+    return output
+
+
+for mediatype in MEDIATYPES:
+    api.representation(mediatype)(_output(mediatype))
+
+
+@app.after_request
+def vary_on_accept(response):
+    if response.mimetype in MEDIATYPES:
+        response.vary.add('Accept')
+    return response
@@ -0,0 +1,17 @@
+# server/responses.py
+from flask import current_app
+from flask_restful.utils import unpack
+
+from config import api
+
+
+def to_response(result):
+    """
+    Turn whatever a Resource method returned (a Response, a dict or a
+    (data, status[, headers]) tuple) into a Response, the way Flask-RESTful
+    would, so decorators can inspect and adjust it.
+    """
+    if isinstance(result, current_app.response_class):
+        return result
+    data, code, headers = unpack(result)
+    return api.make_response(data, code, headers=headers)
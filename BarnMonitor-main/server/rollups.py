@@ -0,0 +1,250 @@
+# server/rollups.py
+"""
+Daily rollups of production, sales and feed (day x animal x type).
+
+An after_flush listener turns every insert, update and delete of Production,
+Sale and Feed rows into deltas and upserts them into the rollup tables in the
+same transaction, so /reports never has to scan the raw tables.
+"""
+from collections import namedtuple
+
+import click
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import app, db
+from dates import parse_date
+from models import DailyFeed, DailyProduction, DailySale, Feed, Production, Sale
+from models.tracking import cascade_hooks
+
+
+# source model -> rollup model, source date / type attributes, {source measure: rollup column}
+RollupSpec = namedtuple('RollupSpec', 'rollup date_attr type_attr measures')
+
+ROLLUPS = {
+    Production: RollupSpec(DailyProduction, 'production_date', 'product_type', {'quantity': 'quantity'}),
+    Sale: RollupSpec(DailySale, 'sale_date', 'product_type', {'quantity_sold': 'quantity_sold', 'amount': 'amount'}),
+    Feed: RollupSpec(DailyFeed, 'date', 'feed_type', {'quantity': 'quantity'}),
+}
+
+# /reports/<kind>
+REPORTS = {
+    'production': DailyProduction,
+    'sales': DailySale,
+    'feed': DailyFeed,
+}
+
+PERIOD_FORMATS = {
+    # period: (SQLite strftime format, PostgreSQL to_char format)
+    'day': ('%Y-%m-%d', 'YYYY-MM-DD'),
+    'week': ('%Y-W%W', None),  # see _postgresql_week
+    'month': ('%Y-%m', 'YYYY-MM'),
+    'year': ('%Y', 'YYYY'),
+}
+
+
+def _key_and_measures(spec, value):
+    key = (parse_date(value(spec.date_attr)), value('animal_id'), value(spec.type_attr))
+    measures = {column: value(attr) or 0 for attr, column in spec.measures.items()}
+    return key, measures
+
+
+def _values(obj, spec, old=False):
+    """Rollup key and measures for obj, either as it is now or as it was loaded."""
+    state = inspect(obj)
+
+    def value(attr):
+        if old:
+            history = state.attrs[attr].history
+            if history.deleted:
+                return history.deleted[0]
+        return getattr(obj, attr)
+
+    return _key_and_measures(spec, value)
+
+
+def _was_live(obj):
+    """Whether obj counted towards the rollups before this flush (deleted_at was unset)."""
+    history = inspect(obj).attrs['deleted_at'].history
+    if history.added:
+        return not history.deleted or history.deleted[0] is None
+    return obj.deleted_at is None
+
+
+def _add(deltas, spec, key, measures, sign):
+    entry = deltas.setdefault((spec.rollup, key), {'record_count': 0})
+    entry['record_count'] += sign
+    for column, amount in measures.items():
+        entry[column] = entry.get(column, 0) + sign * amount
+
+
+def _upsert(session, rollup, rows):
+    table = rollup.__table__
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        stmt = postgresql_insert(table)
+    elif dialect == 'sqlite':
+        stmt = sqlite_insert(table)
+    else:
+        raise RuntimeError(f'Rollups do not support the {dialect} dialect')
+
+    keys = [column.name for column in table.primary_key]
+    measures = [column.name for column in table.columns if column.name not in keys]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: table.c[name] + stmt.excluded[name] for name in measures},
+    )
+    session.execute(stmt, rows)
+
+
+def _write(session, deltas):
+    by_rollup = {}
+    for (rollup, key), entry in deltas.items():
+        if any(entry.values()):
+            by_rollup.setdefault(rollup, []).append((key, entry))
+
+    for rollup, entries in by_rollup.items():
+        keys = [column.name for column in rollup.__table__.primary_key]
+        _upsert(session, rollup, [{**dict(zip(keys, key)), **entry} for key, entry in entries])
+        # Drop buckets whose last source row went away, one statement per rollup
+        emptied = {key[1] for key, entry in entries if entry['record_count'] < 0}
+        if emptied:
+            session.execute(
+                delete(rollup)
+                .where(rollup.animal_id.in_(sorted(emptied)))
+                .where(rollup.record_count <= 0)
+            )
+
+
+@event.listens_for(db.session, 'after_flush')
+def maintain_rollups(session, flush_context):
+    # After the flush, so records of an animal inserted in the same flush
+    # have its animal_id; new / dirty / deleted and the attribute history
+    # still describe the flush until after_flush_postexec
+    deltas = {}
+
+    for obj in session.new:
+        spec = ROLLUPS.get(type(obj))
+        if spec:
+            _add(deltas, spec, *_values(obj, spec), +1)
+
+    for obj in session.dirty:
+        spec = ROLLUPS.get(type(obj))
+        if spec and session.is_modified(obj):
+            # A soft delete (see models/tracking.py) only removes the old values
+            if _was_live(obj):
+                _add(deltas, spec, *_values(obj, spec, old=True), -1)
+            if obj.deleted_at is None:
+                _add(deltas, spec, *_values(obj, spec), +1)
+
+    for obj in session.deleted:
+        spec = ROLLUPS.get(type(obj))
+        if spec:
+            _add(deltas, spec, *_values(obj, spec, old=True), -1)
+
+    _write(session, deltas)
+
+
+def subtract_cascade(session, source, where):
+    """Take source rows about to be soft deleted by a cascade out of the rollups, one GROUP BY per table."""
+    spec = ROLLUPS.get(source)
+    if not spec:
+        return
+    date_column = getattr(source, spec.date_attr)
+    type_column = getattr(source, spec.type_attr)
+    groups = session.execute(
+        select(date_column, source.animal_id, type_column, *[func.sum(getattr(source, attr)) for attr in spec.measures], func.count())
+        .where(*where)
+        .group_by(date_column, source.animal_id, type_column)
+    )
+    deltas = {}
+    for day, animal_id, type_name, *totals, count in groups:
+        entry = deltas.setdefault((spec.rollup, (day, animal_id, type_name)), {'record_count': 0})
+        entry['record_count'] -= count
+        for column, total in zip(spec.measures.values(), totals):
+            entry[column] = entry.get(column, 0) - (total or 0)
+    _write(session, deltas)
+
+cascade_hooks.append(subtract_cascade)
+
+
+def add_rows(session, source, rows):
+    """
+    Fold rows written with a bulk INSERT into the rollups. Bulk inserts skip
+    the unit of work, so maintain_rollups never sees them.
+    """
+    spec = ROLLUPS.get(source)
+    if not spec:
+        return
+    deltas = {}
+    for row in rows:
+        _add(deltas, spec, *_key_and_measures(spec, row.get), +1)
+    _write(session, deltas)
+
+
+def rebuild(session=None):
+    """Recompute every rollup from the source tables with one INSERT ... SELECT each."""
+    session = session or db.session
+    for source, spec in ROLLUPS.items():
+        rollup = spec.rollup
+        date_column = getattr(source, spec.date_attr)
+        type_column = getattr(source, spec.type_attr)
+        aggregates = [func.sum(getattr(source, attr)) for attr in spec.measures]
+
+        session.execute(delete(rollup))
+        session.execute(
+            insert(rollup).from_select(
+                ['day', 'animal_id', spec.type_attr, *spec.measures.values(), 'record_count'],
+                select(date_column, source.animal_id, type_column, *aggregates, func.count())
+                .where(source.deleted_at.is_(None))
+                .group_by(date_column, source.animal_id, type_column),
+            )
+        )
+    session.commit()
+
+
+def _postgresql_week(day):
+    """
+    strftime's %W on PostgreSQL: weeks start on Monday and the days before the
+    first Monday are week 00. to_char only has ISO weeks, which disagree around
+    new year.
+    """
+    week = func.floor((func.extract('doy', day) + 7 - func.extract('isodow', day)) / 7)
+    return func.concat(func.to_char(day, 'YYYY-"W"'), func.to_char(week, 'FM00'))
+
+
+def report(kind, period, query_filters, type_name=None):
+    """
+    Totals per period and type from the rollups.
+
+    query_filters is a callable narrowing a query on the rollup model
+    (see pagination.apply_filters); type_name keeps a single product / feed type.
+    """
+    rollup = REPORTS[kind]
+    sqlite_format, postgresql_format = PERIOD_FORMATS[period]
+    if db.session.get_bind().dialect.name == 'postgresql':
+        bucket = func.to_char(rollup.day, postgresql_format) if postgresql_format else _postgresql_week(rollup.day)
+    else:
+        bucket = func.strftime(sqlite_format, rollup.day)
+
+    type_column = rollup.feed_type if rollup is DailyFeed else rollup.product_type
+    measures = [column for column in rollup.__table__.columns if column.name not in ('day', 'animal_id', type_column.name)]
+
+    query = db.session.query(
+        bucket.label('period'),
+        type_column,
+        *[func.sum(column).label(column.name) for column in measures],
+    )
+    if type_name:
+        query = query.filter(type_column == type_name)
+    query = query_filters(query, rollup).group_by(bucket, type_column).order_by(bucket, type_column)
+    return [row._asdict() for row in query]
+
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the daily rollup tables from productions, sales and feeds."""
+    rebuild()
+    for rollup in REPORTS.values():
+        click.echo(f'{rollup.__tablename__}: {db.session.query(rollup).count()} rows')
@@ -1,6 +1,8 @@
 import random
 from models import AnimalType, HealthRecord, Farmer, Sale, Animal, Production, Feed
 from config import db, app
+import rollups
+import versions
 from datetime import datetime, date, timedelta
 from faker import Faker
 from werkzeug.security import generate_password_hash
@@ -167,6 +169,10 @@ def seed():
         # Commit the transaction
         db.session.commit()       
 
+        # The clears above bypass the rollup listener, so recompute from scratch
+        rollups.rebuild()
+        versions.bump_all()
+
 if __name__ == '__main__':
     # Seed the data
     seed()
@@ -0,0 +1,187 @@
+# server/serializers.py
+"""
+Precompiled serializers for the API models.
+
+Each schema lists its columns and nested relationships explicitly. A schema is
+compiled into a plain Python function (one dict literal, no reflection) the
+first time a given fields/include combination is requested, and the default
+shape is compiled at import.
+"""
+
+DATE_FORMAT = '%Y-%m-%d'
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def format_date(value):
+    if value is None or isinstance(value, str):
+        return value
+    return value.strftime(DATE_FORMAT)
+
+
+def format_datetime(value):
+    if value is None or isinstance(value, str):
+        return value
+    return value.strftime(DATETIME_FORMAT)
+
+
+def _split_paths(paths):
+    """Split dotted paths into (top level names, {name: [rest of path]})."""
+    top, nested = [], {}
+    for path in paths:
+        head, _, rest = path.partition('.')
+        if rest:
+            nested.setdefault(head, []).append(rest)
+        else:
+            top.append(head)
+    return top, nested
+
+
+def _normalize(paths):
+    return None if paths is None else tuple(sorted(set(paths)))
+
+
+class Schema:
+    def __init__(self, fields, nested=None, expand=None):
+        # fields: column names, or (name, formatter) pairs
+        self.fields = {}
+        for field in fields:
+            name, formatter = field if isinstance(field, tuple) else (field, None)
+            self.fields[name] = formatter
+        # nested: {relationship name: (Schema, many)}
+        self.nested = dict(nested or {})
+        # relationships expanded in the default shape (None means all of them)
+        self.expand = tuple(self.nested) if expand is None else tuple(expand)
+        self._compiled = {}
+        self.default = self.compile()
+
+    def without(self, *names):
+        """Copy of this schema with some nested relationships dropped."""
+        nested = {k: v for k, v in self.nested.items() if k not in names}
+        expand = [name for name in self.expand if name not in names]
+        return Schema(self.fields.items(), nested, expand)
+
+    def dump(self, obj, fields=None, include=None):
+        if fields is None and include is None:
+            return self.default(obj)
+        return self.compile(fields, include)(obj)
+
+    def selection(self, fields=None, include=None):
+        """
+        Resolve a fields/include request into
+        (column names, {relationship: (schema, child fields, child include)}).
+
+        fields: column names to keep (None keeps every column). Dotted names
+            such as 'farmer.name' select columns of a nested relationship.
+        include: relationships to expand (None expands the default shape).
+            Dotted names such as 'animal.farmer' expand deeper levels; an
+            included relationship with no deeper paths only gets its columns.
+
+        Raises ValueError for unknown names.
+        """
+        if fields is None and include is None:
+            return list(self.fields), {name: (self.nested[name][0], None, None) for name in self.expand}
+
+        field_names, nested_fields = _split_paths(fields or ())
+        include_names, nested_include = _split_paths(include or ())
+
+        for name in field_names:
+            if name not in self.fields and name not in self.nested:
+                raise ValueError(f'Unknown field: {name}')
+        for name in list(include_names) + list(nested_include) + list(nested_fields):
+            if name not in self.nested:
+                raise ValueError(f'Unknown relationship: {name}')
+
+        if fields is None:
+            columns = list(self.fields)
+        else:
+            columns = [name for name in field_names if name in self.fields]
+
+        # A relationship named in fields (or a dotted field) is expanded too
+        names = set(include_names) | set(nested_include) | set(nested_fields)
+        names |= {name for name in field_names if name in self.nested}
+        relationships = {
+            name: (self.nested[name][0], _normalize(nested_fields.get(name)), _normalize(nested_include.get(name, ())))
+            for name in names
+        }
+        return columns, relationships
+
+    def compile(self, fields=None, include=None):
+        """Return a function turning a model instance into a dict (see selection())."""
+        key = (_normalize(fields), _normalize(include))
+        if key not in self._compiled:
+            self._compiled[key] = self._build(*key)
+        return self._compiled[key]
+
+    def _build(self, fields, include):
+        columns, relationships = self.selection(fields, include)
+
+        env = {}
+        items = []
+        for name in sorted(set(columns) | set(relationships)):
+            if name in self.fields:
+                formatter = self.fields[name]
+                if formatter is None:
+                    items.append(f'{name!r}: obj.{name}')
+                else:
+                    env[f'_fmt_{name}'] = formatter
+                    items.append(f'{name!r}: _fmt_{name}(obj.{name})')
+                continue
+
+            schema, child_fields, child_include = relationships[name]
+            env[f'_dump_{name}'] = schema.compile(child_fields, child_include)
+            if self.nested[name][1]:
+                items.append(f'{name!r}: [_dump_{name}(x) for x in obj.{name}]')
+            else:
+                items.append(f'{name!r}: None if (v := obj.{name}) is None else _dump_{name}(v)')
+
+        source = 'def dump(obj):\n    return {\n' + ''.join(f'        {item},\n' for item in items) + '    }\n'
+        exec(source, env)
+        return env['dump']
+
+
+ANIMAL_COLUMNS = ('age', 'animal_type_id', ('birth_date', format_date), 'breed', 'farmer_id', 'health_status', 'id', 'image', 'name')
+ANIMAL_TYPE_COLUMNS = ('description', 'id', 'type_name')
+FARMER_COLUMNS = ('address', 'email', 'id', 'name', 'phone')
+FEED_COLUMNS = ('animal_id', ('date', format_date), 'feed_type', 'id', 'quantity')
+PRODUCTION_COLUMNS = ('animal_id', 'id', 'product_type', ('production_date', format_date), 'quantity')
+SALE_COLUMNS = ('amount', 'animal_id', 'id', 'product_type', 'production_id', 'quantity_sold', ('sale_date', format_date))
+HEALTH_RECORD_COLUMNS = ('animal_id', ('checkup_date', format_date), 'id', 'notes', 'treatment', 'vet_name')
+YIELD_ALERT_COLUMNS = (('acknowledged_at', format_datetime), 'animal_id', ('created_at', format_datetime), ('day', format_date), 'expected', 'id', 'product_type', 'quantity', 'z_score')
+
+# Row-only schemas used at the leaves of nested shapes.
+# Production <-> Sale is cyclic; nested levels stop at the row columns.
+ANIMAL_ROW = Schema(ANIMAL_COLUMNS)
+FARMER_ROW = Schema(FARMER_COLUMNS)
+PRODUCTION_ROW = Schema(PRODUCTION_COLUMNS)
+SALE_ROW = Schema(SALE_COLUMNS)
+
+ANIMAL = Schema(ANIMAL_COLUMNS, {
+    'farmer': (FARMER_ROW, False),
+    'animal_type': (Schema(ANIMAL_TYPE_COLUMNS), False),
+    'feed_records': (Schema(FEED_COLUMNS), True),
+    # Nested health records keep SerializerMixin's datetime format
+    'health_records': (Schema(('animal_id', ('checkup_date', format_datetime), 'id', 'notes', 'treatment', 'vet_name')), True),
+    'production': (Schema(PRODUCTION_COLUMNS, {'sales': (SALE_ROW, True)}), True),
+    'sales': (Schema(SALE_COLUMNS, {'production': (PRODUCTION_ROW, False)}), True),
+})
+
+PRODUCTION = Schema(PRODUCTION_COLUMNS, {
+    'animal': (ANIMAL.without('production'), False),
+    'sales': (SALE_ROW, True),
+})
+
+SALE = Schema(SALE_COLUMNS, {
+    'animal': (ANIMAL.without('sales'), False),
+    'production': (PRODUCTION_ROW, False),
+})
+
+# Lighter models: relationships are only expanded on request (?include=)
+FARMER = Schema(FARMER_COLUMNS, {'animals': (ANIMAL, True)}, expand=())
+
+ANIMAL_TYPE = Schema(ANIMAL_TYPE_COLUMNS, {'animals': (ANIMAL_ROW, True)}, expand=())
+
+FEED = Schema(FEED_COLUMNS, {'animal': (ANIMAL, False)}, expand=())
+
+HEALTH_RECORD = Schema(HEALTH_RECORD_COLUMNS, {'animal': (ANIMAL, False)}, expand=())
+
+YIELD_ALERT = Schema(YIELD_ALERT_COLUMNS, {'animal': (ANIMAL_ROW, False)}, expand=())
@@ -0,0 +1,203 @@
+# server/sessions.py
+"""
+Session backends, picked with SESSION_BACKEND:
+
+- 'signed' (the default when SECRET_KEY is set): the session lives in the
+  cookie itself, signed with SECRET_KEY. Reading or writing it never touches
+  the server's disk or database, and every host can verify it. Logging out
+  clears the cookie but cannot revoke a copy of it before it expires.
+  Whoever knows the key can log in as anyone, so the app refuses to start
+  with this backend and no SECRET_KEY.
+- 'sql' (the default without SECRET_KEY): the cookie carries a signed
+  session id; the data sits in the sessions table
+  (models/server_session.py), shared by every host and revocable. A session
+  is written when it changes or, for permanent sessions, once more than half
+  of its lifetime has gone, not on every request. Expired rows are deleted
+  in batches every SESSION_CLEANUP_N_WRITES writes and by
+  `flask cleanup-sessions`.
+
+Both give the session a random sid, returned to clients as their token.
+"""
+import secrets
+import threading
+from datetime import datetime
+
+import click
+from flask.sessions import SecureCookieSession, SecureCookieSessionInterface, SessionInterface, session_json_serializer
+from itsdangerous import BadSignature, Signer, want_bytes
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import app, db
+from models import ServerSession
+
+
+DEVELOPMENT_SID_KEY = b'barnmonitor-development-session-id'
+
+
+def _new_sid():
+    return secrets.token_urlsafe(32)
+
+
+class Session(SecureCookieSession):
+    """Session dict with a sid and, for the sql backend, the stored expiry."""
+
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        super().__init__(initial)
+        self._sid = sid
+        self.expires_at = expires_at
+
+    @property
+    def sid(self):
+        if self._sid is None:
+            # Signed sessions keep their id in the cookie
+            if '_sid' not in self:
+                self['_sid'] = _new_sid()
+            self._sid = self['_sid']
+        return self._sid
+
+
+def _is_permanent(app, session):
+    return session.permanent or app.config['SESSION_PERMANENT']
+
+
+class SignedSessionInterface(SecureCookieSessionInterface):
+    session_class = Session
+
+    def get_expiration_time(self, app, session):
+        if _is_permanent(app, session):
+            return datetime.utcnow() + app.permanent_session_lifetime
+        return None
+
+    def should_set_cookie(self, app, session):
+        return session.modified or (_is_permanent(app, session) and app.config['SESSION_REFRESH_EACH_REQUEST'])
+
+
+class SqlSessionInterface(SessionInterface):
+    serializer = session_json_serializer
+
+    def __init__(self):
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _signer(self, app):
+        # The sid is random and unguessable, so the signature only turns away
+        # made-up cookies before the lookup; without SECRET_KEY a fixed
+        # development key keeps cookies valid across workers
+        return Signer(app.secret_key or DEVELOPMENT_SID_KEY, salt='barnmonitor-session-id', key_derivation='hmac')
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(want_bytes(cookie)).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                with db.engine.connect() as connection:
+                    row = connection.execute(
+                        select(ServerSession.data, ServerSession.expires_at)
+                        .where(ServerSession.id == sid, ServerSession.expires_at > datetime.utcnow())
+                    ).first()
+                if row is not None:
+                    return Session(self.serializer.loads(row.data), sid=sid, expires_at=row.expires_at)
+        return Session(sid=_new_sid())
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified:
+                if session.expires_at is not None:
+                    with db.engine.begin() as connection:
+                        connection.execute(delete(ServerSession).where(ServerSession.id == session.sid))
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = datetime.utcnow()
+        lifetime = app.permanent_session_lifetime
+        renew = _is_permanent(app, session) and (
+            session.expires_at is None or session.expires_at - now < lifetime / 2
+        )
+        if not (session.modified or renew):
+            return
+
+        expires_at = now + lifetime
+        with db.engine.begin() as connection:
+            _upsert(connection, {'id': session.sid, 'data': self.serializer.dumps(dict(session)), 'expires_at': expires_at})
+        self._count_write(app)
+
+        response.set_cookie(
+            name,
+            self._signer(app).sign(want_bytes(session.sid)).decode(),
+            expires=expires_at if _is_permanent(app, session) else None,
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+    def _count_write(self, app):
+        every = app.config['SESSION_CLEANUP_N_WRITES']
+        if not every:
+            return
+        with self._lock:
+            self._writes += 1
+            due = self._writes % every == 0
+        if due:
+            delete_expired(app.config['SESSION_CLEANUP_BATCH_SIZE'], max_batches=1)
+
+
+def _upsert(connection, row):
+    table = ServerSession.__table__
+    if connection.dialect.name == 'postgresql':
+        stmt = postgresql_insert(table)
+    else:
+        stmt = sqlite_insert(table)
+    stmt = stmt.values(row).on_conflict_do_update(
+        index_elements=['id'],
+        set_={'data': stmt.excluded.data, 'expires_at': stmt.excluded.expires_at},
+    )
+    connection.execute(stmt)
+
+
+def delete_expired(batch_size, max_batches=None):
+    """Delete expired sessions batch_size rows per transaction; returns how many went."""
+    deleted = batches = 0
+    while max_batches is None or batches < max_batches:
+        expired = (
+            select(ServerSession.id)
+            .where(ServerSession.expires_at <= datetime.utcnow())
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        with db.engine.begin() as connection:
+            count = connection.execute(delete(ServerSession).where(ServerSession.id.in_(expired))).rowcount
+        deleted += count
+        batches += 1
+        if count < batch_size:
+            break
+    return deleted
+
+
+BACKENDS = {
+    'signed': SignedSessionInterface,
+    'sql': SqlSessionInterface,
+}
+
+if app.config['SESSION_BACKEND'] not in BACKENDS:
+    raise RuntimeError(f"Unknown SESSION_BACKEND: {app.config['SESSION_BACKEND']}")
+if app.config['SESSION_BACKEND'] == 'signed' and not app.secret_key:
+    raise RuntimeError("SESSION_BACKEND = 'signed' needs the SECRET_KEY environment variable")
+app.session_interface = BACKENDS[app.config['SESSION_BACKEND']]()
+
+
+@app.cli.command('cleanup-sessions')
+def cleanup_sessions_command():
+    """Delete expired rows from the sessions table (SESSION_BACKEND = 'sql')."""
+    deleted = delete_expired(app.config['SESSION_CLEANUP_BATCH_SIZE'])
+    click.echo(f'Deleted {deleted} expired sessions')
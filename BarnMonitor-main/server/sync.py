@@ -0,0 +1,172 @@
+# server/sync.py
+"""
+Delta sync for offline clients.
+
+GET /sync returns every live row of the synced collections, a page at a
+time (keyset cursors, like the list endpoints), and a token with the last
+page; GET /sync?since=<token> returns only the rows created or changed since
+then, and the ids of rows deleted since then. Deltas read through the
+updated_at index, so their cost follows the number of changes rather than
+table size.
+"""
+import base64
+import binascii
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, text
+
+from config import db
+from models import Animal, Feed, HealthRecord, Production, Sale
+from pagination import ListParamsError
+from serializers import (
+    ANIMAL_COLUMNS, FEED_COLUMNS, HEALTH_RECORD_COLUMNS, PRODUCTION_COLUMNS, SALE_COLUMNS,
+    format_datetime,
+)
+
+
+SYNCED = {
+    'animals': (Animal, ANIMAL_COLUMNS),
+    'feeds': (Feed, FEED_COLUMNS),
+    'health_records': (HealthRecord, HEALTH_RECORD_COLUMNS),
+    'productions': (Production, PRODUCTION_COLUMNS),
+    'sales': (Sale, SALE_COLUMNS),
+}
+
+
+def encode_token(moment):
+    return base64.urlsafe_b64encode(f'ts:{moment.isoformat()}'.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        prefix, _, value = base64.urlsafe_b64decode(padded).decode().partition(':')
+        if prefix != 'ts':
+            raise ValueError
+        return datetime.fromisoformat(value)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ListParamsError('Invalid sync token')
+
+
+def horizon():
+    """
+    The earliest updated_at a row that is not committed yet can carry.
+
+    updated_at is stamped when a row is flushed, not when it commits. On
+    PostgreSQL that is bounded by the start of the oldest open transaction;
+    SQLite has one writer at a time, whose stamps can predate its commit by
+    the busy_timeout it waited for the lock. SYNC_OVERLAP is added on top for
+    the transaction's own run time and clock skew between workers.
+    """
+    now = datetime.utcnow()
+    if db.session.get_bind().dialect.name == 'postgresql':
+        oldest = db.session.scalar(text(
+            "SELECT timezone('utc', min(xact_start)) FROM pg_stat_activity"
+            " WHERE datname = current_database() AND pid <> pg_backend_pid()"
+        ))
+        start = min(now, oldest) if oldest else now
+    else:
+        busy_timeout = current_app.config['SQLITE_PRAGMAS'].get('busy_timeout', 0)
+        start = now - timedelta(milliseconds=busy_timeout)
+    return start - current_app.config['SYNC_OVERLAP']
+
+
+def _columns(columns):
+    columns = [column if isinstance(column, tuple) else (column, None) for column in columns]
+    return columns + [('updated_at', format_datetime)]
+
+
+def encode_cursor(collection, last_id, started):
+    raw = f'snapshot:{collection}:{last_id}:{started.isoformat()}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(collection, last id, horizon of the first page) from a snapshot cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        prefix, collection, last_id, started = base64.urlsafe_b64decode(padded).decode().split(':', 3)
+        if prefix != 'snapshot' or collection not in SYNCED:
+            raise ValueError
+        return collection, int(last_id), datetime.fromisoformat(started)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ListParamsError('Invalid cursor')
+
+
+def _rows(statement, columns):
+    """(upserted rows, deleted ids, last id) of a statement selecting columns + deleted_at."""
+    id_index = [column for column, _ in columns].index('id')
+    upserted, deleted, last_id = [], [], None
+    rows = db.session.execute(statement, execution_options={'include_deleted': True})
+    for *values, deleted_at in rows:
+        last_id = values[id_index]
+        if deleted_at is not None:
+            deleted.append(last_id)
+        else:
+            upserted.append({
+                column: formatter(value) if formatter else value
+                for value, (column, formatter) in zip(values, columns)
+            })
+    return upserted, deleted, last_id
+
+
+def changes(since, query_filters, cursor=None, limit=None):
+    """
+    ({collection: {'upserted': [rows], 'deleted': [ids]}, 'token': ...},
+    next cursor) for rows changed at or after since (a datetime).
+
+    Without since it is a page of the full snapshot instead: up to limit live
+    rows (all of them if limit is None), collection by collection in id
+    order, resuming after cursor. Every page but the last returns the next
+    cursor and no token; the last one returns the token, which starts at the
+    horizon() of the first page, so rows written while the client was paging
+    come back with the first delta.
+
+    The token starts at horizon(), so rows written by transactions that were
+    still open are picked up on the next call; clients apply rows as
+    upserts, so seeing one twice is harmless.
+    """
+    if since is not None:
+        result = {'token': encode_token(horizon())}
+        for name, (model, columns) in SYNCED.items():
+            columns = _columns(columns)
+            statement = select(*[getattr(model, column) for column, _ in columns], model.deleted_at)
+            # Soft deletes also move updated_at forward
+            statement = statement.where(model.updated_at >= since)
+            statement = query_filters(statement, model).order_by(model.updated_at, model.id)
+            upserted, deleted, _ = _rows(statement, columns)
+            result[name] = {'upserted': upserted, 'deleted': deleted}
+        return result, None
+
+    if cursor:
+        start, last_id, started = decode_cursor(cursor)
+    else:
+        start, last_id, started = next(iter(SYNCED)), 0, horizon()
+    names = list(SYNCED)
+    result = {name: {'upserted': [], 'deleted': []} for name in names}
+    for position in range(names.index(start), len(names)):
+        name = names[position]
+        model, columns = SYNCED[name]
+        columns = _columns(columns)
+        statement = select(*[getattr(model, column) for column, _ in columns], model.deleted_at).where(
+            model.deleted_at.is_(None), model.id > last_id)
+        statement = query_filters(statement, model).order_by(model.id)
+        if limit is not None:
+            # One extra row to learn whether the collection goes on
+            statement = statement.limit(limit + 1)
+        upserted, _, _ = _rows(statement, columns)
+        last_id = 0
+
+        if limit is not None and len(upserted) > limit:
+            upserted = upserted[:limit]
+            result[name]['upserted'] = upserted
+            return result, encode_cursor(name, upserted[-1]['id'], started)
+        result[name]['upserted'] = upserted
+        if limit is not None:
+            limit -= len(upserted)
+            if limit == 0 and position + 1 < len(names):
+                return result, encode_cursor(names[position + 1], 0, started)
+
+    result['token'] = encode_token(started)
+    return result, None
@@ -0,0 +1,79 @@
+# server/tests/conftest.py
+import os
+import sys
+from datetime import date, datetime
+from types import SimpleNamespace
+
+# A throwaway in-memory database unless DATABASE_URL points elsewhere (e.g. a
+# PostgreSQL test database in CI); set before config.py reads the environment
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('SQLITE_PROFILE', 'testing')
+# Cheap hashes; the cost of the production method is not under test
+os.environ.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from config import app, db  # noqa: E402
+import app as routes  # noqa: E402,F401  registers the resources and listeners
+from models import Animal, AnimalType, Farmer, Feed, HealthRecord, Production, Sale  # noqa: E402
+
+PASSWORD = 'password123'
+
+
+@pytest.fixture
+def database():
+    with app.app_context():
+        db.create_all()
+        yield db
+        db.session.rollback()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(database):
+    return app.test_client()
+
+
+@pytest.fixture
+def farm(database):
+    """
+    Two farmers (three and two animals) sharing one animal type; every animal
+    has two feeds, health records and productions and one sale.
+    """
+    password = generate_password_hash(PASSWORD, method=app.config['PASSWORD_HASH_METHOD'])
+    cow = AnimalType(type_name='Cow', description='Dairy')
+    farmers = [
+        Farmer(name=f'Farmer {n}', email=f'farmer{n}@example.com', phone=f'0700{n}', address='Nakuru', password=password)
+        for n in (1, 2)
+    ]
+    animals = [
+        Animal(name=f'Animal {n}', breed='Jersey', age=3, health_status='Healthy', birth_date=date(2020, 1, n),
+               farmer=farmers[0 if n <= 3 else 1], animal_type=cow)
+        for n in range(1, 6)
+    ]
+    database.session.add_all([cow, *farmers, *animals])
+    database.session.flush()
+    for animal in animals:
+        for day in (1, 2):
+            database.session.add(Feed(animal_id=animal.id, feed_type='Hay', quantity=10 * day, date=date(2023, 1, day)))
+            database.session.add(HealthRecord(
+                animal_id=animal.id, checkup_date=datetime(2023, 1, day, 9, 30), treatment='Checkup', notes='Fine', vet_name='Dr. Vet'))
+        productions = [
+            Production(animal_id=animal.id, product_type='Milk', quantity=20 + day, production_date=date(2023, 1, day))
+            for day in (1, 2)
+        ]
+        database.session.add_all(productions)
+        database.session.flush()
+        database.session.add(Sale(
+            animal_id=animal.id, product_type='Milk', quantity_sold=5, sale_date=date(2023, 1, 3), amount=250.0,
+            production_id=productions[0].id))
+    database.session.commit()
+    return SimpleNamespace(animal_type=cow, farmers=farmers, animals=animals)
+
+
+def login(client, email='farmer1@example.com'):
+    response = client.post('/login', json={'email': email, 'password': PASSWORD})
+    assert response.status_code == 200
+    return response
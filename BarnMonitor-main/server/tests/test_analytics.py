@@ -0,0 +1,37 @@
+# server/tests/test_analytics.py
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+from analytics import yield_averages
+from models import Animal, DailyProduction, Farmer
+from pagination import apply_filters
+
+
+def _herd(db, yields, first_day, days):
+    """One animal per daily yield in yields, producing it every day for days days."""
+    db.session.execute(insert(Farmer), [{'id': 1, 'name': 'F', 'email': 'f@example.com', 'phone': '1', 'password': 'x'}])
+    db.session.execute(insert(Animal), [
+        {'id': i, 'name': f'A{i}', 'breed': 'Jersey', 'farmer_id': 1, 'birth_date': date(2020, 1, 1)}
+        for i in range(1, len(yields) + 1)
+    ])
+    db.session.execute(insert(DailyProduction), [
+        {'animal_id': i, 'product_type': 'Milk', 'day': first_day + timedelta(days=offset), 'quantity': quantity, 'record_count': 1}
+        for i, quantity in enumerate(yields, start=1) for offset in range(days)
+    ])
+
+
+def test_yield_as_of_end_date_after_last_data_day(database):
+    # Animal 1 produces 3 a day from Jan 1 to Feb 10, animal 2 produces 10
+    _herd(database, [3, 10], date(2022, 1, 1), 41)
+
+    for end_date, avg_7d, avg_30d in (('2022-02-20', 0.0, 2.0), ('2022-03-25', 0.0, 0.0)):
+        args = {'end_date': end_date}
+        herd = {row['animal_id']: row for row in yield_averages(apply_filters, args)}
+        alone = yield_averages(apply_filters, {**args, 'animal_id': '1'})
+
+        # The windows end on end_date, however long after the last production
+        assert herd[1]['day'] == alone[0]['day'] == end_date
+        assert herd[1]['avg_7d'] == alone[0]['avg_7d'] == avg_7d
+        assert herd[1]['avg_30d'] == alone[0]['avg_30d'] == avg_30d
+        assert herd[2]['avg_30d'] == avg_30d * 10 / 3
@@ -0,0 +1,96 @@
+# server/tests/test_anomalies.py
+from datetime import date, timedelta
+
+import pytest
+
+from anomalies import close_days
+from config import app
+from models import Animal, Production, YieldAlert, YieldBaseline
+
+START = date(2023, 3, 1)
+STEADY = [20, 21, 19, 20, 22, 20, 19, 21, 20, 20]  # past the 7 warm-up days
+
+
+def _produce(db, animal_id, quantities, start=START):
+    for offset, quantity in enumerate(quantities):
+        db.session.add(Production(animal_id=animal_id, product_type='Goat milk', quantity=quantity,
+                                  production_date=start + timedelta(days=offset)))
+        db.session.commit()
+
+
+def _alerts():
+    return [(alert.animal_id, alert.day, alert.quantity) for alert in YieldAlert.query.order_by(YieldAlert.id)]
+
+
+@pytest.fixture
+def under_observation(monkeypatch):
+    monkeypatch.setitem(app.config, 'ANOMALY_HEALTH_STATUS', 'Under observation')
+
+
+def test_a_low_day_alerts_once_the_next_day_arrives(client, database, farm, under_observation):
+    _produce(database, 1, STEADY + [5])
+    # The low day is still open
+    assert _alerts() == []
+
+    _produce(database, 1, [20], start=START + timedelta(days=len(STEADY) + 1))
+    [alert] = YieldAlert.query.all()
+    assert (alert.day, alert.quantity) == (START + timedelta(days=len(STEADY)), 5)
+    assert alert.expected == pytest.approx(20.2, abs=0.5)
+    assert alert.z_score <= -app.config['ANOMALY_Z_THRESHOLD']
+    assert database.session.get(Animal, 1).health_status == 'Under observation'
+    assert [row['id'] for row in client.get('/alerts?animal_id=1').get_json()] == [alert.id]
+
+
+def test_dips_within_the_threshold_and_warm_up_days_do_not_alert(database, farm):
+    # A drop to 5 on day 3 is still warming up; 18 after that is within three deviations
+    _produce(database, 2, [20, 21, 5, 20, 19, 20, 21, 20, 22, 20, 18, 20])
+    assert _alerts() == []
+    assert database.session.get(YieldBaseline, (2, 'Goat milk')).days == 11
+
+
+def test_sweep_scores_a_day_without_records_as_zero_output(database, farm):
+    _produce(database, 3, STEADY)
+    last = START + timedelta(days=len(STEADY) - 1)
+
+    # The morning after the last record: its day is closed, today opens empty
+    # (the farm's own Milk baselines are closed along with it)
+    assert close_days(as_of=last + timedelta(days=1)) == (6, 0)
+    baseline = database.session.get(YieldBaseline, (3, 'Goat milk'))
+    assert (baseline.day, baseline.day_total, baseline.days) == (last + timedelta(days=1), 0, len(STEADY))
+
+    # Nothing came in that day
+    assert close_days(as_of=last + timedelta(days=2)) == (6, 1)
+    assert _alerts() == [(3, last + timedelta(days=1), 0)]
+
+    # Records for the open day still count towards it
+    _produce(database, 3, [20], start=last + timedelta(days=2))
+    assert database.session.get(YieldBaseline, (3, 'Goat milk')).day_total == 20
+
+
+def test_sweep_skips_deleted_animals(client, database, farm):
+    _produce(database, 4, STEADY)
+    assert client.delete('/animals/4').status_code in (200, 204)
+    # Only the other four animals' Milk baselines
+    assert close_days(as_of=START + timedelta(days=30)) == (4, 0)
+    assert database.session.get(YieldBaseline, (4, 'Goat milk')).day == START + timedelta(days=len(STEADY) - 1)
+
+
+def test_productions_of_an_animal_added_in_the_same_flush(database, farm):
+    animal = Animal(name='Heifer', birth_date=date(2022, 1, 1), farmer_id=1)
+    database.session.add_all([animal] + [
+        Production(animal=animal, product_type='Goat milk', quantity=quantity, production_date=START + timedelta(days=offset))
+        for offset, quantity in enumerate(STEADY)
+    ])
+    database.session.commit()
+    baseline = database.session.get(YieldBaseline, (animal.id, 'Goat milk'))
+    assert baseline.days == len(STEADY) - 1
+
+
+def test_alerts_raised_by_a_flush_are_committed_with_it(database, farm, under_observation):
+    _produce(database, 5, STEADY + [5])
+    database.session.add(Production(animal_id=5, product_type='Goat milk', quantity=20,
+                                    production_date=START + timedelta(days=len(STEADY) + 1)))
+    database.session.commit()
+    database.session.expire_all()
+    assert _alerts() == [(5, START + timedelta(days=len(STEADY)), 5)]
+    assert database.session.get(Animal, 5).health_status == 'Under observation'
@@ -0,0 +1,108 @@
+# server/tests/test_bulk.py
+import json
+
+from sqlalchemy import func, select
+
+from config import app
+from conftest import login
+from models import Feed, IdempotencyKey
+
+FEEDS = [
+    {'animal_id': 1, 'feed_type': 'Silage', 'quantity': 12, 'date': '2023-02-01'},
+    {'animal_id': 2, 'feed_type': 'Silage', 'quantity': 8, 'date': '2023-02-01'},
+]
+
+
+def _feeds(database):
+    return database.session.scalar(select(func.count()).select_from(Feed))
+
+
+def test_json_batch_is_inserted(client, database, farm):
+    response = client.post('/feeds/bulk', json=FEEDS)
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['inserted'] == 2 and len(body['ids']) == 2
+    assert _feeds(database) == 12
+    assert [feed['quantity'] for feed in client.get('/feeds?animal_id=1').get_json()][-1] == 12
+
+
+def test_ndjson_batch(client, database, farm):
+    lines = '\n'.join(json.dumps(row) for row in FEEDS) + '\n\n'
+    response = client.post('/feeds/bulk', data=lines, content_type='application/x-ndjson')
+    assert response.status_code == 201
+    assert response.get_json()['inserted'] == 2
+
+
+def test_bad_rows_reject_the_whole_batch(client, database, farm):
+    rows = [
+        FEEDS[0],
+        {'animal_id': 99, 'feed_type': 'Hay', 'quantity': 1, 'date': '2023-02-01'},
+        {'animal_id': 1, 'feed_type': '', 'quantity': -1, 'date': '01/02/2023', 'colour': 'green'},
+        'not an object',
+    ]
+    response = client.post('/feeds/bulk', json=rows)
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['error'] == '3 of 4 rows are invalid; nothing was written'
+    assert body['errors'] == [
+        {'index': 1, 'errors': {'animal_id': 'Animal 99 does not exist'}},
+        {'index': 2, 'errors': {
+            'colour': 'unknown field',
+            'feed_type': 'must be a non-empty string',
+            'quantity': 'must be a non-negative integer',
+            'date': 'must be in the format YYYY-MM-DD',
+        }},
+        {'index': 3, 'errors': {'row': 'must be an object'}},
+    ]
+    assert _feeds(database) == 10
+
+
+def test_unreadable_batches(client, farm, monkeypatch):
+    assert client.post('/feeds/bulk', json={'animal_id': 1}).status_code == 400
+    assert client.post('/feeds/bulk', json=[]).get_json()['error'] == 'Batch is empty'
+
+    response = client.post('/feeds/bulk', data='{"animal_id": 1}\n{oops\n', content_type='application/x-ndjson')
+    assert response.status_code == 400
+    assert {'index': 1, 'errors': {'row': 'Invalid JSON'}} in response.get_json()['errors']
+
+    monkeypatch.setitem(app.config, 'BULK_MAX_ROWS', 1)
+    assert client.post('/feeds/bulk', json=FEEDS).get_json()['error'] == 'Batch has 2 rows; the limit is 1'
+
+
+def test_retry_with_the_same_key_is_replayed(client, database, farm):
+    headers = {'Idempotency-Key': 'batch-1'}
+    first = client.post('/feeds/bulk', json=FEEDS, headers=headers)
+    retry = client.post('/feeds/bulk', json=FEEDS, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.get_json() == first.get_json()
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    assert _feeds(database) == 12
+
+
+def test_reused_key_with_another_body_conflicts(client, database, farm):
+    headers = {'Idempotency-Key': 'batch-1'}
+    assert client.post('/feeds/bulk', json=FEEDS, headers=headers).status_code == 201
+    assert client.post('/feeds/bulk', json=FEEDS[:1], headers=headers).status_code == 409
+    # Same body, other endpoint
+    productions = [{'animal_id': 1, 'product_type': 'Milk', 'quantity': 3, 'production_date': '2023-02-01'}]
+    assert client.post('/productions/bulk', json=productions, headers=headers).status_code == 409
+    assert _feeds(database) == 12
+
+    assert client.post('/feeds/bulk', json=FEEDS, headers={'Idempotency-Key': 'x' * 256}).status_code == 400
+
+
+def test_keys_are_scoped_to_the_user(client, database, farm):
+    headers = {'Idempotency-Key': 'batch-1'}
+    login(client)
+    assert client.post('/feeds/bulk', json=FEEDS, headers=headers).status_code == 201
+
+    # Another user picking the same key writes their own batch
+    other = app.test_client()
+    login(other, 'farmer2@example.com')
+    response = other.post('/feeds/bulk', json=FEEDS[:1], headers=headers)
+    assert response.status_code == 201
+    assert 'Idempotent-Replayed' not in response.headers
+    assert _feeds(database) == 13
+    assert sorted(database.session.scalars(select(IdempotencyKey.key))) == ['1:batch-1', '2:batch-1']
@@ -0,0 +1,88 @@
+# server/tests/test_cache.py
+from datetime import date
+
+import pytest
+from flask import session
+from sqlalchemy import select
+
+from cache import MemoryCache, _key
+from config import app
+from models import Feed, Version
+from queries import count_queries
+from versions import current_versions
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    # Versions restart with every test database, so start from an empty cache too
+    cache = MemoryCache()
+    monkeypatch.setitem(app.extensions, 'response_cache', cache)
+    return cache
+
+
+def _request_key(path, tags=('animals',), versions=(1,), user=None, **headers):
+    with app.test_request_context(path, headers=headers):
+        if user is not None:
+            session['user_id'] = user
+        return _key(list(tags), list(versions))
+
+
+def test_key_ignores_query_order_but_not_user_format_or_versions():
+    key = _request_key('/animals?limit=5&fields=name')
+    assert _request_key('/animals?fields=name&limit=5') == key
+    assert _request_key('/animals?fields=name&limit=6') != key
+    assert _request_key('/animals?limit=5&fields=name', user=1) != key
+    assert _request_key('/animals?limit=5&fields=name', user=1) != _request_key('/animals?limit=5&fields=name', user=2)
+    assert _request_key('/animals?limit=5&fields=name', Accept='application/msgpack') != key
+    assert _request_key('/animals?limit=5&fields=name', versions=(2,)) != key
+
+
+def test_a_hit_only_reads_the_versions(client, farm, cache):
+    first = client.get('/animals')
+    with count_queries() as queries:
+        second = client.get('/animals')
+    assert second.get_data() == first.get_data()
+    assert queries.count == 1
+
+
+def _names(client, path='/animals'):
+    return [animal['name'] for animal in client.get(path).get_json()]
+
+
+def test_writes_invalidate_within_one_app_context(client, farm, cache):
+    # The client reuses the fixture's app context, so g lives across these requests
+    assert len(_names(client)) == 5
+
+    response = client.post('/animals', json={
+        'name': 'Daisy', 'breed': 'Jersey', 'age': 2, 'health_status': 'Healthy', 'birth_date': '2022-03-01',
+        'image': '', 'farmer_id': 1, 'animal_type_id': 1,
+    })
+    assert response.status_code == 201
+    assert 'Daisy' in _names(client)
+
+    assert client.get('/animals/1').get_json()['name'] == 'Animal 1'
+    assert client.patch('/animals/1', json={'name': 'Bella'}).status_code == 200
+    assert client.get('/animals/1').get_json()['name'] == 'Bella'
+    assert 'Bella' in _names(client)
+
+    assert len(client.get('/feeds?animal_id=1').get_json()) == 2
+    assert client.delete('/feeds/1').status_code in (200, 204)
+    assert len(client.get('/feeds?animal_id=1').get_json()) == 1
+
+    assert client.delete('/animals/2').status_code in (200, 204)
+    assert 'Animal 2' not in _names(client)
+
+
+def test_table_versions_are_sharded_and_summed(database, farm):
+    [before], _ = current_versions(['feeds'])
+    for quantity in (1, 2, 3):
+        database.session.add(Feed(animal_id=1, feed_type='Silage', quantity=quantity, date=date(2023, 2, 1)))
+        database.session.commit()
+
+    [after], _ = current_versions(['feeds'])
+    assert after == before + 3
+    tags = database.session.scalars(select(Version.tag).where(Version.tag.like('feeds%'))).all()
+    assert tags and all(tag.startswith('feeds#') for tag in tags)
+    assert len(tags) <= app.config['VERSION_SHARDS']
+    # Per-row tags are not sharded
+    assert database.session.get(Version, 'animal:1') is not None
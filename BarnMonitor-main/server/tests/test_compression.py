@@ -0,0 +1,98 @@
+# server/tests/test_compression.py
+import gzip
+import zlib
+
+import pytest
+
+import compression
+from config import app
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+needs_brotli = pytest.mark.skipif(brotli is None, reason='brotli is not installed')
+
+
+def _plain(client, path):
+    response = client.get(path, headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in response.headers
+    return response.get_data()
+
+
+def test_bodies_under_the_threshold_are_sent_as_they_are(client, farm, monkeypatch):
+    size = len(_plain(client, '/animals'))
+    monkeypatch.setitem(app.config, 'COMPRESSION_MIN_SIZE', size + 1)
+    response = client.get('/animals', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+
+    monkeypatch.setitem(app.config, 'COMPRESSION_MIN_SIZE', size)
+    response = client.get('/animals', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert int(response.headers['Content-Length']) == len(response.get_data()) < size
+
+
+@pytest.mark.parametrize('accept, encoding', [
+    ('gzip', 'gzip'),
+    pytest.param('br', 'br', marks=needs_brotli),
+    pytest.param('gzip, br', 'br', marks=needs_brotli),
+    ('br;q=0.5, gzip', 'gzip'),
+    pytest.param('*', 'br', marks=needs_brotli),
+    ('identity', None),
+    ('deflate', None),
+])
+def test_encoding_is_negotiated(client, farm, monkeypatch, accept, encoding):
+    monkeypatch.setitem(app.config, 'COMPRESSION_MIN_SIZE', 1)
+    plain = _plain(client, '/animals')
+    response = client.get('/animals', headers={'Accept-Encoding': accept})
+    assert response.headers.get('Content-Encoding') == encoding
+    body = response.get_data()
+    if encoding == 'gzip':
+        body = gzip.decompress(body)
+    elif encoding == 'br':
+        body = brotli.decompress(body)
+    assert body == plain
+
+
+def test_gzip_only_without_brotli(client, farm, monkeypatch):
+    monkeypatch.setitem(app.config, 'COMPRESSION_MIN_SIZE', 1)
+    monkeypatch.setattr(compression, 'brotli', None)
+    assert client.get('/animals', headers={'Accept-Encoding': 'gzip, br'}).headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Encoding' not in client.get('/animals', headers={'Accept-Encoding': 'br'}).headers
+
+
+@pytest.mark.parametrize('encoding, decompress', [
+    ('gzip', lambda data: zlib.decompress(data, wbits=31)),
+    pytest.param('br', lambda data: brotli.decompress(data), marks=needs_brotli),
+])
+def test_streamed_exports_are_compressed_chunk_by_chunk(client, farm, monkeypatch, encoding, decompress):
+    monkeypatch.setitem(app.config, 'EXPORT_BATCH_SIZE', 2)
+    plain = _plain(client, '/export/feeds?format=ndjson')
+
+    response = client.get('/export/feeds?format=ndjson', headers={'Accept-Encoding': encoding})
+    assert response.is_streamed
+    assert response.headers['Content-Encoding'] == encoding
+    assert 'Content-Length' not in response.headers
+    # Every chunk is flushed, so each batch can be decoded as soon as it arrives
+    chunks = [chunk for chunk in response.response if chunk]
+    assert len(chunks) > 2
+    assert decompress(b''.join(chunks)) == plain
+
+
+def test_what_is_never_compressed(client, farm, monkeypatch):
+    monkeypatch.setitem(app.config, 'COMPRESSION_MIN_SIZE', 1)
+    gzip_ok = {'Accept-Encoding': 'gzip'}
+
+    etag = client.get('/animals').get_etag()[0]
+    not_modified = client.get('/animals', headers={**gzip_ok, 'If-None-Match': f'"{etag}"'})
+    assert not_modified.status_code == 304 and 'Content-Encoding' not in not_modified.headers
+    assert 'Content-Encoding' not in client.head('/animals', headers=gzip_ok).headers
+    # Only the COMPRESSION_MIMETYPES
+    monkeypatch.setitem(app.config, 'COMPRESSION_MIMETYPES', {'text/csv'})
+    assert 'Content-Encoding' not in client.get('/animals', headers=gzip_ok).headers
+    assert client.get('/export/feeds', headers=gzip_ok).headers['Content-Encoding'] == 'gzip'
+
+    monkeypatch.setitem(app.config, 'COMPRESSION_MIN_SIZE', None)
+    assert 'Content-Encoding' not in client.get('/animals', headers=gzip_ok).headers
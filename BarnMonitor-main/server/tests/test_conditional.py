@@ -0,0 +1,67 @@
+# server/tests/test_conditional.py
+import pytest
+
+from config import app
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setitem(app.extensions, 'response_cache', None)
+
+
+def test_matching_etag_is_not_modified(client, farm):
+    response = client.get('/feeds?animal_id=1')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+    etag, weak = response.get_etag()
+    assert etag and not weak
+
+    not_modified = client.get('/feeds?animal_id=1', headers={'If-None-Match': f'"{etag}"'})
+    assert not_modified.status_code == 304
+    assert not_modified.get_data() == b''
+    assert not_modified.get_etag() == (etag, False)
+
+    # Another query, another representation
+    assert client.get('/feeds?animal_id=2', headers={'If-None-Match': f'"{etag}"'}).status_code == 200
+
+
+def test_write_changes_the_etag(client, farm):
+    etag = client.get('/feeds?animal_id=1').get_etag()[0]
+    other = client.get('/feeds?animal_id=2').get_etag()[0]
+
+    response = client.post('/feeds', json={'animal_id': 1, 'feed_type': 'Silage', 'quantity': 99, 'date': '2023-02-01'})
+    assert response.status_code == 201
+
+    response = client.get('/feeds?animal_id=1', headers={'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+    assert 99 in [feed['quantity'] for feed in response.get_json()]
+    # Another animal's feeds were not touched
+    assert client.get('/feeds?animal_id=2', headers={'If-None-Match': f'"{other}"'}).status_code == 304
+
+
+def test_if_modified_since(client, farm):
+    response = client.get('/animals/1')
+    last_modified = response.headers['Last-Modified']
+    assert client.get('/animals/1', headers={'If-Modified-Since': last_modified}).status_code == 304
+    assert client.get('/animals/1', headers={'If-Modified-Since': 'Sat, 01 Jan 2000 00:00:00 GMT'}).status_code == 200
+
+
+def test_json_and_msgpack_have_different_etags(client, farm):
+    etag = client.get('/animals/1').get_etag()[0]
+    response = client.get('/animals/1', headers={'Accept': 'application/msgpack', 'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+
+
+def test_compression_makes_the_etag_weak(client, farm, monkeypatch):
+    monkeypatch.setitem(app.config, 'COMPRESSION_MIN_SIZE', 1)
+    plain = client.get('/animals').get_etag()
+
+    response = client.get('/animals', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.get_etag() == (plain[0], True)
+
+    # Either form of the tag matches the same representation
+    for tag in (f'W/"{plain[0]}"', f'"{plain[0]}"'):
+        assert client.get('/animals', headers={'Accept-Encoding': 'gzip', 'If-None-Match': tag}).status_code == 304
@@ -0,0 +1,64 @@
+# server/tests/test_export.py
+import csv
+import io
+import json
+
+from config import app
+
+
+def _csv(response):
+    return list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+
+
+def _ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_csv_export(client, farm):
+    response = client.get('/export/farmers')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=farmers.csv'
+    assert response.get_data(as_text=True).splitlines()[0] == 'address,email,id,name,phone'
+    rows = _csv(response)
+    assert [row['email'] for row in rows] == ['farmer1@example.com', 'farmer2@example.com']
+    # Never the password hash
+    assert 'password' not in rows[0]
+
+
+def test_ndjson_export_streams_in_batches(client, farm, monkeypatch):
+    monkeypatch.setitem(app.config, 'EXPORT_BATCH_SIZE', 3)
+    response = client.get('/export/feeds?format=ndjson')
+    assert response.is_streamed
+    assert response.mimetype == 'application/x-ndjson'
+    rows = _ndjson(response)
+    assert [row['id'] for row in rows] == list(range(1, 11))
+    assert rows[0] == {'animal_id': 1, 'date': '2023-01-01', 'feed_type': 'Hay', 'id': 1, 'quantity': 10}
+
+
+def test_filters_and_fields(client, farm):
+    rows = _ndjson(client.get('/export/productions?format=ndjson&farmer_id=2&fields=quantity,animal_id'))
+    assert rows == [{'quantity': q, 'animal_id': a} for a in (4, 5) for q in (21, 22)]
+
+    response = client.get('/export/animals?format=csv&fields=name&end_date=2020-01-02')
+    assert response.get_data(as_text=True).splitlines() == ['name', 'Animal 1', 'Animal 2']
+
+    assert client.get('/export/animals?animal_id=99').get_data(as_text=True).splitlines() == [
+        'age,animal_type_id,birth_date,breed,farmer_id,health_status,id,image,name']
+
+
+def test_deleted_rows_are_not_exported(client, farm):
+    assert client.delete('/animals/2').status_code in (200, 204)
+    assert client.delete('/feeds/1').status_code == 200
+
+    assert [row['id'] for row in _csv(client.get('/export/animals'))] == ['1', '3', '4', '5']
+    # The animal's records went with it
+    feeds = _ndjson(client.get('/export/feeds?format=ndjson'))
+    assert [row['id'] for row in feeds] == [2, 5, 6, 7, 8, 9, 10]
+
+
+def test_bad_export_requests(client, farm):
+    assert client.get('/export/passwords').status_code == 404
+    assert client.get('/export/feeds?format=xml').status_code == 400
+    assert client.get('/export/feeds?fields=colour').status_code == 400
+    assert client.get('/export/feeds?farmer_id=x').status_code == 400
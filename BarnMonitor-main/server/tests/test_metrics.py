@@ -0,0 +1,100 @@
+# server/tests/test_metrics.py
+import logging
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+import metrics
+from config import app
+
+SERVER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN = 'scrape-token'
+
+
+def _sample(name, **labels):
+    """Current value of one series in the /metrics text, 0 if it has none yet."""
+    wanted = ','.join(f'{k}="{v}"' for k, v in labels.items())
+    for line in metrics.render().splitlines():
+        if line.startswith(f'{name}{{{wanted}}} '):
+            return float(line.rsplit(' ', 1)[1])
+    return 0
+
+
+@pytest.fixture
+def token(monkeypatch):
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', TOKEN)
+
+
+def test_metrics_need_the_token(client, monkeypatch):
+    assert client.get('/metrics').status_code == 404
+    assert client.get('/metrics', headers={'Authorization': f'Bearer {TOKEN}'}).status_code == 404
+
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', TOKEN)
+    assert client.get('/metrics').status_code == 404
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 404
+    assert client.get('/metrics', headers={'Authorization': f'Basic {TOKEN}'}).status_code == 404
+    assert client.get('/metrics', headers={'Authorization': f'Bearer {TOKEN}'}).status_code == 200
+
+
+def test_text_format(client, farm, token):
+    before = _sample('barnmonitor_http_requests_total', method='GET', route='/animals/<int:id>', status='200')
+    client.get('/animals/1')
+    response = client.get('/metrics', headers={'Authorization': f'Bearer {TOKEN}'})
+
+    assert response.content_type == 'text/plain; version=0.0.4; charset=utf-8'
+    text = response.get_data(as_text=True)
+    for metric in metrics.METRICS:
+        assert f'# HELP {metric.name} ' in text
+        assert f'# TYPE {metric.name} {metric.type}\n' in text
+    assert _sample('barnmonitor_http_requests_total', method='GET', route='/animals/<int:id>', status='200') == before + 1
+
+    # Histogram buckets are cumulative and end in +Inf == _count
+    route = 'method="GET",route="/animals/<int:id>"'
+    buckets = [float(value) for value in re.findall(
+        rf'^barnmonitor_http_request_duration_seconds_bucket{{{route},le="[^"]+"}} (\d+)$', text, re.M)]
+    assert buckets == sorted(buckets) and len(buckets) == len(metrics.LATENCY_BUCKETS) + 1
+    assert buckets[-1] == _sample('barnmonitor_http_request_duration_seconds_count', method='GET', route='/animals/<int:id>')
+
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter('test_total', 'Test.', ('path',))
+    counter.inc(('a"b\\c\nd',))
+    assert list(counter.samples()) == ['test_total{path="a\\"b\\\\c\\nd"} 1']
+
+
+def test_core_selects_count_fetched_rows(client, farm):
+    before = _sample('barnmonitor_sql_rows_fetched_total', method='GET', route='/sync')
+    body = client.get('/sync').get_json()
+    live = sum(len(body[name]['upserted']) for name in ('animals', 'feeds', 'health_records', 'productions', 'sales'))
+    # The sync collections, plus the few rows of the versions / session lookups
+    assert _sample('barnmonitor_sql_rows_fetched_total', method='GET', route='/sync') - before >= live == 40
+
+    before = _sample('barnmonitor_sql_rows_fetched_total', method='GET', route='/export/<string:resource>')
+    lines = client.get('/export/feeds?format=ndjson').get_data(as_text=True).splitlines()
+    assert _sample('barnmonitor_sql_rows_fetched_total', method='GET', route='/export/<string:resource>') - before >= len(lines) == 10
+
+
+def test_slow_query_log_toggle(client, farm, monkeypatch, caplog):
+    monkeypatch.setitem(app.config, 'SLOW_QUERY_THRESHOLD_MS', 0)
+    with caplog.at_level(logging.WARNING, logger='barnmonitor.slow_queries'):
+        client.get('/feeds?animal_id=1')
+    assert any('GET /feeds?animal_id=1: SELECT' in record.getMessage() for record in caplog.records)
+
+    caplog.clear()
+    monkeypatch.setitem(app.config, 'SLOW_QUERY_THRESHOLD_MS', None)
+    with caplog.at_level(logging.WARNING, logger='barnmonitor.slow_queries'):
+        client.get('/feeds?animal_id=2')
+    assert caplog.records == []
+
+
+@pytest.mark.parametrize('value, expected', [('', 'None'), ('off', 'None'), ('OFF', 'None'), ('50', '50.0')])
+def test_slow_query_threshold_from_the_environment(value, expected):
+    environment = {**os.environ, 'DATABASE_URL': 'sqlite://', 'SLOW_QUERY_THRESHOLD_MS': value}
+    result = subprocess.run(
+        [sys.executable, '-c', 'from config import app; print(app.config["SLOW_QUERY_THRESHOLD_MS"])'],
+        cwd=SERVER, env=environment, capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == expected
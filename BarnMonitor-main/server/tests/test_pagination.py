@@ -0,0 +1,62 @@
+# server/tests/test_pagination.py
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from config import app
+from models import Feed
+from pagination import ListParamsError, decode_cursor, encode_cursor, paginate
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(42)) == 42
+    with pytest.raises(ListParamsError):
+        decode_cursor('not-a-cursor')
+
+
+def test_limit_plus_one_lookahead(farm):
+    feeds, next_cursor = paginate(Feed.query, Feed, {'limit': '4'})
+    assert [feed.id for feed in feeds] == [1, 2, 3, 4]
+    assert decode_cursor(next_cursor) == 4
+
+    # Exactly limit rows left: the extra row is not there, so no further page
+    feeds, next_cursor = paginate(Feed.query, Feed, {'limit': '6', 'cursor': next_cursor})
+    assert [feed.id for feed in feeds] == [5, 6, 7, 8, 9, 10]
+    assert next_cursor is None
+
+
+def test_pages_follow_link_header(client, farm):
+    ids, url = [], '/feeds?animal_id=1&limit=1'
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        ids += [feed['id'] for feed in response.get_json()]
+        url = None
+        if 'Link' in response.headers:
+            link = response.headers['Link']
+            assert link.endswith('>; rel="next"')
+            url = link[1:link.index('>')]
+            query = parse_qs(urlsplit(url).query)
+            # The filters carry over to the next page
+            assert query['animal_id'] == ['1'] and query['limit'] == ['1']
+            assert query['cursor'] == [response.headers['X-Next-Cursor']]
+    assert ids == [1, 2]
+
+
+def test_default_and_max_limit(client, farm, monkeypatch):
+    monkeypatch.setitem(app.config, 'PAGINATION_DEFAULT_LIMIT', 3)
+    response = client.get('/feeds')
+    assert len(response.get_json()) == 3
+    assert decode_cursor(response.headers['X-Next-Cursor']) == 3
+
+    monkeypatch.setitem(app.config, 'PAGINATION_MAX_LIMIT', 4)
+    response = client.get('/productions?limit=1000')
+    assert len(response.get_json()) == 4
+    assert 'X-Next-Cursor' in response.headers
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=abc', 'cursor=bogus', 'start_date=01-01-2023', 'animal_id=x'])
+def test_bad_list_params_are_400(client, farm, query):
+    response = client.get(f'/feeds?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
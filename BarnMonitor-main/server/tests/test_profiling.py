@@ -0,0 +1,66 @@
+# server/tests/test_profiling.py
+import pstats
+
+import pytest
+
+from config import app
+
+TOKEN = 'profile-token'
+PROFILE = {'X-Profile': TOKEN}
+
+
+@pytest.fixture
+def profiles(tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'PROFILE_TOKEN', TOKEN)
+    monkeypatch.setitem(app.config, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setitem(app.config, 'PROFILE_INTERVAL', 0.0005)
+    return tmp_path
+
+
+def test_profiling_is_off_without_a_token(client, farm, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'PROFILE_DIR', str(tmp_path))
+    response = client.get('/animals', headers=PROFILE)
+    assert response.status_code == 200
+    assert 'X-Profile-Id' not in response.headers
+    assert client.get('/profiles/anything.collapsed', headers=PROFILE).status_code == 404
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_wrong_token_is_ignored(client, farm, profiles):
+    for headers in ({}, {'X-Profile': 'wrong'}, {'X-Profile': ''}):
+        response = client.get('/animals', headers=headers)
+        assert response.status_code == 200
+        assert 'X-Profile-Id' not in response.headers
+    assert list(profiles.iterdir()) == []
+
+
+def test_sampled_profile_is_saved_and_downloaded(client, farm, profiles):
+    response = client.get('/animals', headers=PROFILE)
+    assert response.status_code == 200
+    profile_id = response.headers['X-Profile-Id']
+    assert profile_id.endswith('-get-animals.collapsed')
+    assert (profiles / profile_id).exists()
+
+    assert client.get(f'/profiles/{profile_id}').status_code == 404
+    assert client.get(f'/profiles/{profile_id}', headers={'X-Profile': 'wrong'}).status_code == 404
+    download = client.get(f'/profiles/{profile_id}', headers=PROFILE)
+    assert download.status_code == 200
+    assert download.get_data() == (profiles / profile_id).read_bytes()
+    # Collapsed stacks: 'a;b;c <count>' per line
+    for line in download.get_data(as_text=True).splitlines():
+        stack, count = line.rsplit(' ', 1)
+        assert stack and int(count) > 0
+
+
+def test_cprofile_mode_writes_pstats(client, farm, profiles):
+    response = client.get('/farmers/1', headers={**PROFILE, 'X-Profile-Mode': 'cprofile'})
+    profile_id = response.headers['X-Profile-Id']
+    assert profile_id.endswith('-get-farmers-int-id.pstats')
+    stats = pstats.Stats(str(profiles / profile_id))
+    assert any(name == 'get' for _, _, name in stats.stats)
+
+
+def test_bad_profile_requests(client, farm, profiles):
+    assert client.get('/animals', headers={**PROFILE, 'X-Profile-Mode': 'perf'}).status_code == 400
+    assert client.get('/profiles/a%20b', headers=PROFILE).status_code == 400
+    assert client.get('/profiles/missing.collapsed', headers=PROFILE).status_code == 404
@@ -0,0 +1,57 @@
+# server/tests/test_queries.py
+from datetime import date, datetime
+
+import pytest
+
+from config import app
+from models import Animal, HealthRecord, Production, Sale
+from queries import assert_max_queries
+
+# One versions lookup, the page itself and one SELECT ... IN per relationship
+# to_dict() walks; none of them may grow with the number of rows
+BOUNDS = {
+    '/animals': 7,
+    '/farmers/1': 8,
+    '/productions': 9,
+    '/sales': 8,
+    '/health_records': 2,
+}
+
+
+def _more_animals(db, farm, count):
+    for n in range(count):
+        animal = Animal(name=f'Extra {n}', breed='Friesian', birth_date=date(2021, 5, 1),
+                        farmer_id=farm.farmers[0].id, animal_type_id=farm.animal_type.id)
+        db.session.add(animal)
+        db.session.flush()
+        production = Production(animal_id=animal.id, product_type='Milk', quantity=15, production_date=date(2023, 2, 1))
+        db.session.add_all([
+            production,
+            HealthRecord(animal_id=animal.id, checkup_date=datetime(2023, 2, 1, 8), treatment='Vaccine', vet_name='Dr. Vet'),
+        ])
+        db.session.flush()
+        db.session.add(Sale(animal_id=animal.id, product_type='Milk', quantity_sold=3, sale_date=date(2023, 2, 2),
+                            amount=90.0, production_id=production.id))
+    db.session.commit()
+
+
+@pytest.mark.parametrize('path', sorted(BOUNDS))
+def test_list_and_detail_queries_do_not_grow_with_rows(client, database, farm, monkeypatch, path):
+    monkeypatch.setitem(app.extensions, 'response_cache', None)
+
+    with assert_max_queries(BOUNDS[path]):
+        assert client.get(path).status_code == 200
+
+    _more_animals(database, farm, 20)
+    with assert_max_queries(BOUNDS[path]):
+        response = client.get(path)
+    assert response.status_code == 200
+    if path != '/farmers/1':
+        assert len(response.get_json()) > 20
+
+
+def test_assert_max_queries_reports_the_statements(client, farm, monkeypatch):
+    monkeypatch.setitem(app.extensions, 'response_cache', None)
+    with pytest.raises(AssertionError, match='Expected at most 1 queries, got 7'):
+        with assert_max_queries(1):
+            client.get('/animals')
@@ -0,0 +1,31 @@
+# server/tests/test_representations.py
+from decimal import Decimal
+
+import msgspec
+import numpy as np
+
+from config import app
+
+
+def test_json_keys_are_sorted_like_flask(client, farm):
+    body = client.get('/farmers/1').get_data(as_text=True)
+    # Hand-built dict with 'animals' added last; Flask's provider sorted it to the front
+    assert body.startswith('{"address":') and body.index('"animals":') < body.index('"email":')
+
+    error = client.get('/feeds?limit=0').get_data(as_text=True)
+    assert error == '{"error":"limit must be a positive integer"}\n'
+
+
+def test_msgpack_keeps_the_json_key_order(client, farm):
+    json_body = client.get('/farmers/1').get_json()
+    response = client.get('/farmers/1', headers={'Accept': 'application/msgpack'})
+    assert response.mimetype == 'application/msgpack'
+    decoded = msgspec.msgpack.decode(response.get_data())
+    assert decoded == json_body
+    assert list(decoded) == sorted(decoded) == list(json_body)
+
+
+def test_provider_values():
+    with app.test_request_context('/?pretty=1'):
+        body = app.json.encode({'b': Decimal('1.10'), 'a': np.arange(2)})
+    assert body == b'{\n  "a": [\n    0,\n    1\n  ],\n  "b": "1.10"\n}\n'
@@ -0,0 +1,94 @@
+# server/tests/test_rollups.py
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from models import Animal, DailyFeed, DailyProduction, DailySale, Feed, Sale
+from rollups import rebuild
+
+
+def _report(client, kind, query=''):
+    response = client.get(f'/reports/{kind}?period=day{query}')
+    assert response.status_code == 200
+    return {row['period']: row for row in response.get_json()}
+
+
+def _rollups(database):
+    """Every rollup row, to compare against a rebuild from the source tables."""
+    return {
+        rollup.__tablename__: sorted(tuple(row) for row in database.session.execute(select(rollup.__table__)))
+        for rollup in (DailyProduction, DailySale, DailyFeed)
+    }
+
+
+@pytest.fixture
+def consistent(database):
+    """Check, after the test, that the maintained rollups match a full rebuild."""
+    yield
+    maintained = _rollups(database)
+    rebuild(database.session)
+    assert _rollups(database) == maintained
+
+
+def test_totals_follow_creates_patches_and_deletes(client, farm, consistent):
+    days = _report(client, 'production')
+    assert days['2023-01-01']['quantity'] == 5 * 21
+    assert days['2023-01-01']['record_count'] == 5
+
+    response = client.post('/productions', json={
+        'animal_id': 1, 'product_type': 'Milk', 'quantity': 30, 'production_date': '2023-01-01'})
+    assert response.status_code in (200, 201)
+    new_id = response.get_json()['id']
+    assert _report(client, 'production')['2023-01-01']['quantity'] == 5 * 21 + 30
+
+    # Moving a record to another day moves its quantity too
+    assert client.patch(f'/productions/{new_id}', json={'quantity': 40, 'production_date': '2023-01-05'}).status_code in (200, 201)
+    days = _report(client, 'production')
+    assert days['2023-01-01']['quantity'] == 5 * 21
+    assert (days['2023-01-05']['quantity'], days['2023-01-05']['record_count']) == (40, 1)
+
+    assert client.delete(f'/productions/{new_id}').status_code in (200, 204)
+    assert '2023-01-05' not in _report(client, 'production')
+
+    sales = _report(client, 'sales')['2023-01-03']
+    assert (sales['quantity_sold'], sales['amount'], sales['record_count']) == (25, 1250.0, 5)
+    assert _report(client, 'feed', '&type=Hay')['2023-01-02']['quantity'] == 5 * 20
+
+
+def test_cascaded_deletes_leave_the_rollups(client, farm, consistent):
+    assert client.delete('/animals/1').status_code in (200, 204)
+    assert _report(client, 'production')['2023-01-01']['quantity'] == 4 * 21
+    assert _report(client, 'sales')['2023-01-03']['amount'] == 4 * 250.0
+
+    # Farmer 2 takes animals 4 and 5 with them
+    assert client.delete('/farmers/2').status_code in (200, 204)
+    assert _report(client, 'production')['2023-01-01']['record_count'] == 2
+    assert _report(client, 'feed')['2023-01-01']['quantity'] == 2 * 10
+    assert _report(client, 'production', '&farmer_id=2') == {}
+
+
+def test_records_of_an_animal_added_in_the_same_flush(client, database, farm, consistent):
+    animal = Animal(name='Calf', birth_date=date(2023, 1, 1), farmer_id=1)
+    database.session.add_all([
+        animal,
+        Sale(animal=animal, product_type='Milk', quantity_sold=1, amount=50.0, sale_date=date(2023, 2, 1)),
+        Feed(animal=animal, feed_type='Hay', quantity=3, date=date(2023, 2, 1)),
+    ])
+    database.session.commit()
+
+    assert _report(client, 'sales')['2023-02-01']['amount'] == 50.0
+    assert _report(client, 'feed')['2023-02-01']['quantity'] == 3
+
+
+def test_bulk_inserts_are_rolled_up(client, farm, consistent):
+    rows = [{'animal_id': 2, 'product_type': 'Milk', 'quantity': 9, 'production_date': '2023-01-09'}] * 3
+    assert client.post('/productions/bulk', json=rows).status_code == 201
+    day = _report(client, 'production')['2023-01-09']
+    assert (day['quantity'], day['record_count']) == (27, 3)
+
+
+def test_bad_report_requests(client, farm):
+    assert client.get('/reports/weather').status_code == 404
+    assert client.get('/reports/production?period=hour').status_code == 400
+    assert [row['period'] for row in client.get('/reports/production?period=month').get_json()] == ['2023-01']
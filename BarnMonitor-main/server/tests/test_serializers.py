@@ -0,0 +1,79 @@
+# server/tests/test_serializers.py
+import pytest
+from sqlalchemy import update
+from sqlalchemy_serializer import SerializerMixin
+
+from models import Animal, AnimalType, Farmer, Feed, HealthRecord, Production, Sale
+
+# Deliberately left out of the compiled shapes: the password hash, and the
+# change-tracking columns only /sync exposes
+HIDDEN = {'password', 'updated_at', 'deleted_at'}
+
+# Everything below an animal that SerializerMixin walks by default
+ANIMAL_PATHS = ['animal_type', 'farmer', 'feed_records', 'health_records', 'production.sales', 'sales.production']
+
+
+def baseline(obj, **kwargs):
+    """SerializerMixin.to_dict() with the model's serialize_rules, minus HIDDEN."""
+    return _hide(SerializerMixin.to_dict(obj, **kwargs))
+
+
+def _hide(value):
+    if isinstance(value, dict):
+        return {k: _hide(v) for k, v in value.items() if k not in HIDDEN}
+    if isinstance(value, list):
+        return [_hide(v) for v in value]
+    return value
+
+
+def _columns(value):
+    return {k: v for k, v in value.items() if not isinstance(v, (dict, list))}
+
+
+@pytest.fixture
+def unlinked_sales(database, farm):
+    # SerializerMixin recurses forever through Production <-> Sale once a sale
+    # has a production, so the comparisons run on sales without one
+    database.session.execute(update(Sale).values(production_id=None))
+    database.session.commit()
+    return farm
+
+
+@pytest.mark.parametrize('model', [Animal, Production, Sale])
+def test_default_shape_matches_serializer_mixin(unlinked_sales, model):
+    for obj in model.query.all():
+        assert obj.to_dict() == baseline(obj)
+
+
+def test_nested_health_records_keep_the_datetime_format(unlinked_sales):
+    animal = Animal.query.first()
+    assert animal.to_dict()['health_records'][0]['checkup_date'] == '2023-01-01 09:30:00'
+    # The record's own view has always been the date alone
+    assert animal.health_records[0].to_dict()['checkup_date'] == '2023-01-01'
+
+
+def test_expanded_relationships_match_serializer_mixin(unlinked_sales):
+    farmer = Farmer.query.first()
+    assert farmer.to_dict() == _columns(baseline(farmer))
+    assert farmer.to_dict(include=[f'animals.{path}' for path in ANIMAL_PATHS if path != 'farmer']) == baseline(farmer)
+
+    feed = Feed.query.first()
+    assert feed.to_dict(include=[f'animal.{path}' for path in ANIMAL_PATHS if path != 'feed_records']) == baseline(feed)
+
+    record = HealthRecord.query.first()
+    expanded = record.to_dict(include=[f'animal.{path}' for path in ANIMAL_PATHS if path != 'health_records'])
+    assert expanded['animal'] == baseline(record)['animal']
+
+    # An animal type's animals are listed with their columns only
+    animal_type = AnimalType.query.first()
+    expected = baseline(animal_type)
+    expected['animals'] = [_columns(animal) for animal in expected['animals']]
+    assert animal_type.to_dict(include=['animals']) == expected
+
+
+def test_production_sale_cycle_stops_at_the_row(farm):
+    sale = Sale.query.first()
+    with pytest.raises(RecursionError):
+        SerializerMixin.to_dict(sale)
+    production = sale.to_dict()['production']
+    assert production == _columns(baseline(sale.production, rules=('-sales', '-animal')))
@@ -0,0 +1,114 @@
+# server/tests/test_sessions.py
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from itsdangerous import TimestampSigner
+from sqlalchemy import func, select, update
+
+from config import app
+from conftest import login
+from models import ServerSession
+from sessions import SignedSessionInterface, SqlSessionInterface
+
+SERVER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def signed(monkeypatch):
+    monkeypatch.setattr(app, 'secret_key', 'test-secret-key')
+    monkeypatch.setattr(app, 'session_interface', SignedSessionInterface())
+
+
+@pytest.fixture
+def sql(monkeypatch):
+    monkeypatch.setattr(app, 'session_interface', SqlSessionInterface())
+
+
+def _user(client):
+    return client.get('/check_session').get_json()
+
+
+def _stored(database):
+    return database.session.execute(select(ServerSession.id, ServerSession.expires_at)).all()
+
+
+def test_signed_round_trip_touches_no_table(client, database, farm, signed):
+    login(client)
+    assert _user(client)['email'] == 'farmer1@example.com'
+    assert database.session.scalar(select(func.count()).select_from(ServerSession)) == 0
+
+    client.delete('/logout')
+    assert _user(client) is None
+
+
+def test_signed_session_expires(client, farm, signed, monkeypatch):
+    login(client)
+    lifetime = app.permanent_session_lifetime.total_seconds()
+    later = int(datetime.utcnow().timestamp() + lifetime + 60)
+    monkeypatch.setattr(TimestampSigner, 'get_timestamp', lambda self: later)
+    assert _user(client) is None
+
+
+def test_signed_cookie_only_resent_when_modified(client, farm, signed, monkeypatch):
+    monkeypatch.setitem(app.config, 'SESSION_REFRESH_EACH_REQUEST', False)
+    assert 'Set-Cookie' in login(client).headers
+    response = client.get('/check_session')
+    assert response.get_json()['id'] == 1
+    assert 'Set-Cookie' not in response.headers
+
+
+def test_sql_round_trip_and_logout(client, database, farm, sql):
+    token = login(client).get_json()['token']
+    assert _user(client)['email'] == 'farmer1@example.com'
+    assert [sid for sid, _ in _stored(database)] == [token]
+
+    client.delete('/logout')
+    assert _user(client) is None
+
+
+def test_sql_session_expires(client, database, farm, sql):
+    login(client)
+    database.session.execute(update(ServerSession).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    database.session.commit()
+    assert _user(client) is None
+
+
+def test_sql_session_written_when_modified_or_half_used(client, database, farm, sql):
+    login(client)
+    [(sid, expires_at)] = _stored(database)
+
+    # Unchanged and less than half used: no write, no cookie
+    response = client.get('/check_session')
+    assert 'Set-Cookie' not in response.headers
+    assert _stored(database) == [(sid, expires_at)]
+
+    # More than half of the lifetime gone: renewed for a full lifetime
+    half_used = datetime.utcnow() + app.permanent_session_lifetime / 2 - timedelta(minutes=1)
+    database.session.execute(update(ServerSession).values(expires_at=half_used))
+    database.session.commit()
+    response = client.get('/check_session')
+    assert 'Set-Cookie' in response.headers
+    [(_, renewed)] = _stored(database)
+    assert renewed > expires_at
+
+
+def _start(**env):
+    environment = {k: v for k, v in os.environ.items() if k not in ('SECRET_KEY', 'SESSION_BACKEND')}
+    environment.update(DATABASE_URL='sqlite://', **env)
+    return subprocess.run(
+        [sys.executable, '-c', 'import sessions; from config import app; print(app.config["SESSION_BACKEND"])'],
+        cwd=SERVER, env=environment, capture_output=True, text=True,
+    )
+
+
+def test_backend_defaults_and_refusal_without_key():
+    assert _start(SECRET_KEY='k').stdout.strip() == 'signed'
+    assert _start().stdout.strip() == 'sql'
+    assert _start(SECRET_KEY='k', SESSION_BACKEND='sql').stdout.strip() == 'sql'
+
+    refused = _start(SESSION_BACKEND='signed')
+    assert refused.returncode != 0
+    assert "SESSION_BACKEND = 'signed' needs the SECRET_KEY" in refused.stderr
@@ -0,0 +1,74 @@
+# server/tests/test_soft_delete.py
+from sqlalchemy import delete, func, select
+
+from conftest import PASSWORD
+from models import Animal, Farmer, Feed, HealthRecord, Production, Sale
+
+CHILDREN = (Feed, HealthRecord, Production, Sale)
+
+
+def _deleted(database, model):
+    """ids of the model's rows marked as deleted, sorted."""
+    statement = select(model.id).where(model.deleted_at.is_not(None)).order_by(model.id)
+    return database.session.scalars(statement, execution_options={'include_deleted': True}).all()
+
+
+def _count(database, model, **options):
+    return database.session.scalar(select(func.count()).select_from(model), execution_options=options)
+
+
+def test_deleting_a_farmer_marks_everything_below_it(client, database, farm):
+    assert client.delete('/farmers/2').status_code == 200
+
+    assert _deleted(database, Farmer) == [2]
+    assert _deleted(database, Animal) == [4, 5]
+    # Each animal has two feeds, checkups and productions (ids 7-10) and one sale
+    for model in (Feed, HealthRecord, Production):
+        assert _deleted(database, model) == [7, 8, 9, 10]
+    assert _deleted(database, Sale) == [4, 5]
+
+    # The rows are still there, hidden from every query
+    assert _count(database, Animal) == 3
+    assert _count(database, Animal, include_deleted=True) == 5
+    assert client.get('/farmers/2').status_code == 404
+    assert [animal['id'] for animal in client.get('/animals').get_json()] == [1, 2, 3]
+    assert len(client.get('/sales').get_json()) == 3
+    assert client.post('/login', json={'email': 'farmer2@example.com', 'password': PASSWORD}).status_code == 401
+
+
+def test_deleting_an_animal_keeps_its_siblings(client, database, farm):
+    assert client.delete('/animals/2').status_code == 204
+    assert _deleted(database, Animal) == [2]
+    assert _deleted(database, Feed) == [3, 4]
+    assert _deleted(database, Farmer) == []
+    assert len(client.get('/farmers/1').get_json()['animals']) == 2
+
+
+def test_deleted_names_and_emails_can_be_used_again(client, database, farm):
+    animal = {
+        'name': 'Animal 1', 'breed': 'Jersey', 'age': 1, 'health_status': 'Healthy', 'birth_date': '2023-01-01',
+        'image': '', 'farmer_id': 1, 'animal_type_id': 1,
+    }
+    # Still taken while the first one is live
+    assert client.post('/animals', json=animal).status_code == 422
+    database.session.rollback()
+
+    assert client.delete('/animals/1').status_code == 204
+    response = client.post('/animals', json=animal)
+    assert response.status_code == 201
+    assert response.get_json()['id'] == 6
+
+    signup = {'name': 'New Farmer', 'email': 'farmer2@example.com', 'phone': '0799', 'address': 'Eldoret', 'password': 'secret'}
+    assert client.post('/signup', json=signup).status_code == 409
+    assert client.delete('/farmers/2').status_code == 200
+    assert client.post('/signup', json=signup).status_code == 201
+    assert _count(database, Farmer, include_deleted=True) == 3
+
+
+def test_rows_removed_with_sql_take_their_children(database, farm):
+    # ON DELETE CASCADE, for rows deleted outside the ORM
+    database.session.execute(delete(Animal.__table__).where(Animal.__table__.c.id == 3))
+    database.session.commit()
+    for model in CHILDREN:
+        statement = select(func.count()).select_from(model).where(model.animal_id == 3)
+        assert database.session.scalar(statement, execution_options={'include_deleted': True}) == 0
@@ -0,0 +1,67 @@
+# server/tests/test_sqlite.py
+import threading
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from benchmarks.sqlite_stress import ROWS_PER_WRITE, _read, _write
+from config import SQLITE_PROFILES, app, db, sqlite_pragma
+from models import Animal, Farmer, Feed
+
+WRITERS = 4
+READERS = 4
+WRITES = 25
+
+
+def test_sqlite_pragma_allowlist():
+    assert sqlite_pragma('journal_mode', 'wal') == 'PRAGMA journal_mode=WAL'
+    assert sqlite_pragma('cache_size', '-64000') == 'PRAGMA cache_size=-64000'
+    with pytest.raises(RuntimeError):
+        sqlite_pragma('journal_mode', 'WAL; DROP TABLE farmers')
+    with pytest.raises(ValueError):
+        sqlite_pragma('busy_timeout', '5000; DROP TABLE farmers')
+    with pytest.raises(RuntimeError):
+        sqlite_pragma('writable_schema', 'ON')
+
+
+def test_production_profile_has_no_lock_errors_under_concurrent_writers(tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'SQLITE_PRAGMAS', SQLITE_PROFILES['production'])
+    engine = create_engine(f"sqlite:///{tmp_path / 'barn.db'}", pool_size=WRITERS + READERS)
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.execute(insert(Farmer), [{'id': 1, 'name': 'F', 'email': 'f@example.com', 'phone': '1', 'password': 'x'}])
+        session.execute(insert(Animal), [
+            {'id': i, 'name': f'A{i}', 'birth_date': date(2020, 1, 1), 'farmer_id': 1} for i in range(1, 6)
+        ])
+        session.commit()
+
+    animal_ids = list(range(1, 6))
+    errors = []
+
+    def work(operation, times):
+        with Session(engine) as session:
+            for _ in range(times):
+                try:
+                    operation(session, animal_ids)
+                except OperationalError as error:
+                    session.rollback()
+                    errors.append(str(error.orig))
+
+    writers = [threading.Thread(target=work, args=(_write, WRITES)) for _ in range(WRITERS)]
+    readers = [threading.Thread(target=work, args=(_read, WRITES * 2)) for _ in range(READERS)]
+    for thread in writers + readers:
+        thread.start()
+    for thread in writers + readers:
+        thread.join()
+
+    with Session(engine) as session:
+        written = session.scalar(select(func.count()).select_from(Feed))
+        journal_mode = session.connection().exec_driver_sql('PRAGMA journal_mode').scalar()
+    engine.dispose()
+
+    assert journal_mode == 'wal'
+    assert errors == []
+    assert written == WRITERS * WRITES * ROWS_PER_WRITE
@@ -0,0 +1,75 @@
+# server/tests/test_sync.py
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from config import app
+from models import Animal, Farmer
+from sync import SYNCED, changes, decode_token
+
+
+@pytest.mark.skipif(not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'), reason='SQLite only')
+def test_sync_token_covers_rows_stamped_while_waiting_for_the_lock(database, monkeypatch):
+    monkeypatch.setitem(app.config, 'SQLITE_PRAGMAS', {**app.config['SQLITE_PRAGMAS'], 'busy_timeout': 5000})
+    unfiltered = lambda statement, model: statement  # noqa: E731
+    token = changes(None, unfiltered)[0]['token']
+
+    # A writer stamped its row before the token, then waited out the busy_timeout to commit
+    stamped = datetime.utcnow() - timedelta(seconds=8)
+    database.session.execute(insert(Farmer), [{'id': 1, 'name': 'F', 'email': 'f@example.com', 'phone': '1', 'password': 'x'}])
+    database.session.execute(insert(Animal), [
+        {'id': 1, 'name': 'A1', 'breed': 'Jersey', 'farmer_id': 1, 'birth_date': date(2020, 1, 1), 'updated_at': stamped},
+    ])
+
+    upserted = changes(decode_token(token), unfiltered)[0]['animals']['upserted']
+    assert [row['id'] for row in upserted] == [1]
+
+
+def _ids(body):
+    return {name: [row['id'] for row in body[name]['upserted']] for name in SYNCED}
+
+
+def test_full_sync_is_paged_and_the_token_comes_last(client, farm):
+    whole = client.get('/sync?limit=1000').get_json()
+    assert sum(len(ids) for ids in _ids(whole).values()) == 40
+
+    pages = []
+    response = client.get('/sync?limit=7')
+    while True:
+        body = response.get_json()
+        pages.append(body)
+        if 'X-Next-Cursor' not in response.headers:
+            break
+        assert 'token' not in body
+        assert sum(len(ids) for ids in _ids(body).values()) == 7
+        assert response.headers['Link'].startswith('</sync?limit=7&cursor=')
+        response = client.get(f"/sync?limit=7&cursor={response.headers['X-Next-Cursor']}")
+
+    assert len(pages) == 6
+    assert 'token' in pages[-1]
+    # Every row exactly once, in id order within each collection
+    for name, ids in _ids(whole).items():
+        assert [i for page in pages for i in _ids(page)[name]] == ids
+
+
+def test_rows_written_while_paging_come_with_the_first_delta(client, farm):
+    first = client.get('/sync?limit=30')
+    # A change to a collection the client has already paged past
+    assert client.patch('/animals/1', json={'name': 'Renamed'}).status_code == 200
+    last = client.get(f"/sync?limit=30&cursor={first.headers['X-Next-Cursor']}").get_json()
+
+    # (the fixture's rows are within SYNC_OVERLAP of the token too, so they come back as well)
+    delta = client.get(f"/sync?since={last['token']}").get_json()
+    assert 'Renamed' in [row['name'] for row in delta['animals']['upserted']]
+
+
+def test_full_sync_limits_and_cursors(client, farm):
+    assert client.get('/sync?cursor=bogus').status_code == 400
+    assert client.get('/sync?limit=0').status_code == 400
+    token = client.get('/sync').get_json()['token']
+    cursor = client.get('/sync?limit=1').headers['X-Next-Cursor']
+    assert client.get(f'/sync?since={token}&cursor={cursor}').status_code == 400
+    # Filters narrow every page
+    body = client.get('/sync?farmer_id=2&limit=1000').get_json()
+    assert _ids(body)['animals'] == [4, 5]
@@ -0,0 +1,78 @@
+# server/tests/test_timeline.py
+from datetime import date, datetime
+
+import pytest
+
+from models import Feed, HealthRecord
+
+# Animal 1 of the farm: dates sort as midnight, ties go health_record, feed, production, sale
+EVENTS = [
+    ('feed', 1), ('production', 1), ('health_record', 1),
+    ('feed', 2), ('production', 2), ('health_record', 2),
+    ('sale', 1),
+]
+
+
+def _events(body):
+    return [(event['type'], event['id']) for event in body]
+
+
+def _walk(client, query):
+    """Every event of the timeline, following the cursors; and the number of pages."""
+    events, pages = [], 0
+    response = client.get(f'/animals/1/timeline?{query}')
+    while True:
+        assert response.status_code == 200
+        events += _events(response.get_json())
+        pages += 1
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return events, pages
+        response = client.get(f'/animals/1/timeline?{query}&cursor={cursor}')
+
+
+def test_events_are_merged_across_tables(client, farm):
+    body = client.get('/animals/1/timeline').get_json()
+    assert _events(body) == EVENTS
+    assert body[0] == {
+        'type': 'feed', 'date': '2023-01-01', 'id': 1,
+        'record': {'animal_id': 1, 'date': '2023-01-01', 'feed_type': 'Hay', 'id': 1, 'quantity': 10},
+    }
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 6, 7])
+def test_cursor_pages_keep_the_order(client, farm, limit):
+    events, pages = _walk(client, f'limit={limit}')
+    assert events == EVENTS
+    assert pages == -(-len(EVENTS) // limit)
+
+
+def test_ties_within_a_table_and_at_midnight(client, database, farm):
+    database.session.add_all([
+        Feed(animal_id=1, feed_type='Silage', quantity=1, date=date(2023, 1, 2)),
+        HealthRecord(animal_id=1, checkup_date=datetime(2023, 1, 2), treatment='Night call', vet_name='Dr. Vet'),
+    ])
+    database.session.commit()
+
+    events, _ = _walk(client, 'limit=1&start_date=2023-01-02&end_date=2023-01-02')
+    # The midnight checkup ranks before the day's feeds, which follow their ids
+    assert events == [('health_record', 11), ('feed', 2), ('feed', 11), ('production', 2), ('health_record', 2)]
+
+
+def test_types_and_window(client, farm):
+    events, _ = _walk(client, 'types=sale,health_record&limit=2')
+    assert events == [('health_record', 1), ('health_record', 2), ('sale', 1)]
+    events, _ = _walk(client, 'start_date=2023-01-02')
+    assert events == EVENTS[3:]
+
+
+def test_deleted_records_drop_out(client, farm):
+    assert client.delete('/feeds/2').status_code == 200
+    assert ('feed', 2) not in _walk(client, 'limit=2')[0]
+
+
+def test_bad_timeline_requests(client, farm):
+    assert client.get('/animals/99/timeline').status_code == 404
+    assert client.get('/animals/1/timeline?types=weather').status_code == 400
+    assert client.get('/animals/1/timeline?limit=0').status_code == 400
+    assert client.get('/animals/1/timeline?cursor=bogus').status_code == 400
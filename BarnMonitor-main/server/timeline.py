@@ -0,0 +1,144 @@
+# server/timeline.py
+"""
+One chronological stream of an animal's health checkups, feedings,
+productions and sales (GET /animals/<id>/timeline).
+
+Each table is read in (date, id) order through its (animal_id, date) index,
+one page at a time, and heapq.merge interleaves the four streams. The cursor
+is the position of the last event returned - (timestamp, type, id) - which
+every table turns into its own keyset condition, so any page costs at most
+one bounded range scan per table however deep into the history it is.
+"""
+import base64
+import binascii
+import heapq
+import json
+from collections import namedtuple
+from datetime import datetime, time
+from itertools import islice
+
+from flask import current_app
+from sqlalchemy import DateTime, and_, or_, select
+
+from config import db
+from models import Feed, HealthRecord, Production, Sale
+from pagination import ListParamsError, apply_filters
+from serializers import FEED_COLUMNS, HEALTH_RECORD_COLUMNS, PRODUCTION_COLUMNS, SALE_COLUMNS
+
+
+TimelineSource = namedtuple('TimelineSource', 'model date_attr columns')
+
+# Event type -> source; events with the same timestamp are listed in this order
+SOURCES = {
+    'health_record': TimelineSource(HealthRecord, 'checkup_date', HEALTH_RECORD_COLUMNS),
+    'feed': TimelineSource(Feed, 'date', FEED_COLUMNS),
+    'production': TimelineSource(Production, 'production_date', PRODUCTION_COLUMNS),
+    'sale': TimelineSource(Sale, 'sale_date', SALE_COLUMNS),
+}
+RANKS = {kind: rank for rank, kind in enumerate(SOURCES)}
+
+
+def _timestamp(value):
+    # Dates sort as midnight, before any checkup later that day
+    return value if isinstance(value, datetime) else datetime.combine(value, time.min)
+
+
+def encode_position(position):
+    timestamp, rank, last_id = position
+    raw = json.dumps([timestamp.isoformat(), list(SOURCES)[rank], last_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_position(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, kind, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), RANKS[kind], int(last_id)
+    except (ValueError, TypeError, KeyError, binascii.Error, UnicodeDecodeError):
+        raise ListParamsError('Invalid cursor')
+
+
+def _after(kind, column, id_column, position):
+    """Keyset condition for rows of kind that sort after position."""
+    timestamp, rank, last_id = position
+    if isinstance(column.type, DateTime):
+        value = timestamp
+    elif timestamp.time() == time.min:
+        value = timestamp.date()
+    else:
+        # The position is during a day whose (midnight) rows all came before it
+        return column > timestamp.date()
+
+    if RANKS[kind] < rank:
+        return column > value
+    if RANKS[kind] == rank:
+        return or_(column > value, and_(column == value, id_column > last_id))
+    return column >= value
+
+
+def page_statement(kind, animal_id, window=None, after=None, page_size=100):
+    """The next page_size rows of kind after position after, in timeline order."""
+    source = SOURCES[kind]
+    model = source.model
+    column = getattr(model, source.date_attr)
+    names = [name if isinstance(name, str) else name[0] for name in source.columns]
+    statement = apply_filters(select(*[getattr(model, name) for name in names]), model, window or {})
+    statement = statement.where(model.animal_id == animal_id)
+    if after is not None:
+        statement = statement.where(_after(kind, column, model.id, after))
+    return statement.order_by(column, model.id).limit(page_size)
+
+
+def _events(kind, animal_id, window, after, page_size):
+    """(position, kind, row) for one table in timeline order, read page_size rows at a time."""
+    date_attr = SOURCES[kind].date_attr
+    position = after
+    while True:
+        rows = db.session.execute(page_statement(kind, animal_id, window, position, page_size)).all()
+        for row in rows:
+            position = (_timestamp(getattr(row, date_attr)), RANKS[kind], row.id)
+            yield position, kind, row
+        if len(rows) < page_size:
+            return
+
+
+def _event(kind, row):
+    source = SOURCES[kind]
+    record = {}
+    for column in source.columns:
+        name, formatter = column if isinstance(column, tuple) else (column, None)
+        value = getattr(row, name)
+        record[name] = formatter(value) if formatter and value is not None else value
+    return {'type': kind, 'date': record[source.date_attr], 'id': row.id, 'record': record}
+
+
+def timeline(animal_id, args):
+    """
+    (events, next_cursor) for one page of the animal's timeline.
+
+    args: types (comma-separated event types), start_date, end_date, limit, cursor.
+    """
+    kinds = list(SOURCES)
+    if args.get('types'):
+        kinds = [kind.strip() for kind in args['types'].split(',') if kind.strip()]
+        unknown = [kind for kind in kinds if kind not in SOURCES]
+        if unknown:
+            raise ListParamsError(f'Unknown event types: {", ".join(unknown)}; expected {", ".join(SOURCES)}')
+
+    limit = args.get('limit')
+    try:
+        limit = int(limit) if limit not in (None, '') else current_app.config['PAGINATION_PAGE_SIZE']
+    except ValueError:
+        raise ListParamsError('limit must be an integer')
+    if limit < 1:
+        raise ListParamsError('limit must be a positive integer')
+    limit = min(limit, current_app.config['PAGINATION_MAX_LIMIT'])
+
+    after = decode_position(args['cursor']) if args.get('cursor') else None
+    window = {name: args[name] for name in ('start_date', 'end_date') if args.get(name)}
+
+    # One extra event tells whether another page exists
+    streams = [_events(kind, animal_id, window, after, limit + 1) for kind in kinds]
+    page = list(islice(heapq.merge(*streams, key=lambda event: event[0]), limit + 1))
+    next_cursor = encode_position(page[limit - 1][0]) if len(page) > limit else None
+    return [_event(kind, row) for _, kind, row in page[:limit]], next_cursor
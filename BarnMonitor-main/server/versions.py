@@ -0,0 +1,240 @@
+# server/versions.py
+"""
+Change tracking for conditional GETs and the response cache.
+
+Every flush works out which tags its inserts, updates and deletes touch: the
+table itself ('feeds'), plus, for anything belonging to an animal, 'animals',
+'animal:<id>' and the owning 'farmer:<id>'. The tags' counters in the versions
+table are bumped in the same transaction, so every worker sees the change
+as soon as it commits.
+
+A bump holds the counter's row lock until commit, so the table-wide tags
+('feeds', 'animals', ...), which nearly every write touches, are split into
+VERSION_SHARDS rows ('feeds#3'). Each transaction bumps one shard, picked at
+random, and a read sums the shards; two writers only queue behind each other
+when they pick the same shard. Per-row tags ('animal:3') stay single rows.
+
+route_tags() maps a GET request to the tags its response depends on, and
+conditional() turns their versions into a strong ETag / Last-Modified so
+If-None-Match and If-Modified-Since can answer 304 before any row is read.
+The response cache (cache.py) keys its entries with the same versions.
+"""
+import hashlib
+import random
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, g, request
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import app, db
+from models import Animal, AnimalType, Farmer, Feed, HealthRecord, Production, Sale, Version, YieldAlert
+from models.tracking import cascade_hooks
+from representations import negotiated
+from responses import to_response
+
+
+TRACKED = (Animal, AnimalType, Farmer, Feed, HealthRecord, Production, Sale, YieldAlert)
+ANIMAL_RECORDS = (Feed, HealthRecord, Production, Sale, YieldAlert)
+
+# Collections whose default shape embeds animals (and their farmer and type)
+NESTS_ANIMALS = {'animals', 'productions', 'sales'}
+
+
+def _old(obj, attr):
+    history = inspect(obj).attrs[attr].history
+    return history.deleted[0] if history.deleted else None
+
+
+def animal_tags(session, animal_ids):
+    """Tags touched by a change to these animals or to any of their records."""
+    tags = {'animals'} | {f'animal:{animal_id}' for animal_id in animal_ids}
+    if animal_ids:
+        farmer_ids = session.execute(select(Animal.farmer_id).where(Animal.id.in_(animal_ids))).scalars()
+        tags |= {f'farmer:{farmer_id}' for farmer_id in farmer_ids}
+    return tags
+
+
+def changed_tags(session):
+    """Tags touched by the pending inserts, updates and deletes of session."""
+    tags = set()
+    animal_ids = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(obj, TRACKED):
+            continue
+        tags.add(obj.__tablename__)
+        if isinstance(obj, Animal):
+            animal_ids.add(obj.id)
+            tags |= {f'animal:{obj.id}', f'farmer:{obj.farmer_id}'}
+            if _old(obj, 'farmer_id') is not None:
+                tags.add(f"farmer:{_old(obj, 'farmer_id')}")
+        elif isinstance(obj, ANIMAL_RECORDS):
+            animal_ids.update(value for value in (obj.animal_id, _old(obj, 'animal_id')) if value is not None)
+        elif isinstance(obj, Farmer):
+            tags.add(f'farmer:{obj.id}')
+    if animal_ids:
+        tags |= animal_tags(session, animal_ids)
+    return tags
+
+
+def tag_cascade(session, model, where):
+    """Tags for rows a cascaded soft delete is about to mark; bumped with the flush."""
+    tags = {model.__tablename__}
+    if model is Animal:
+        tags |= animal_tags(session, set(session.scalars(select(Animal.id).where(*where))))
+    session.info.setdefault('cascade_tags', set()).update(tags)
+
+cascade_hooks.append(tag_cascade)
+
+
+def _shared(tag):
+    """Whether tag covers a whole table rather than one row ('animal:3')."""
+    return ':' not in tag
+
+
+def _shards(tag):
+    """The rows a tag's version is summed from: the tag itself (unsharded data) and its shards."""
+    if not _shared(tag):
+        return [tag]
+    return [tag] + [f'{tag}#{shard}' for shard in range(app.config['VERSION_SHARDS'])]
+
+
+def bump(session, tags):
+    """Increment the counters for tags (creating them at 1)."""
+    if not tags:
+        return
+    # One shard per transaction, so its flushes all lock the same rows
+    shard = session.info.setdefault('version_shard', random.randrange(app.config['VERSION_SHARDS']))
+    tags = {f'{tag}#{shard}' if _shared(tag) and '#' not in tag else tag for tag in tags}
+    table = Version.__table__
+    if session.get_bind().dialect.name == 'postgresql':
+        stmt = postgresql_insert(table)
+    else:
+        stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['tag'],
+        set_={'version': table.c.version + 1, 'updated_at': stmt.excluded.updated_at},
+    )
+    now = datetime.utcnow()
+    session.execute(stmt, [{'tag': tag, 'version': 1, 'updated_at': now} for tag in sorted(tags)])
+
+
+def touch(session, model, animal_ids):
+    """Record a bulk write to model's table for these animals (bulk inserts skip flush events)."""
+    bump(session, {model.__tablename__} | animal_tags(session, set(animal_ids)))
+
+
+def bump_all(session=None):
+    """Invalidate every ETag, e.g. after the tables were rewritten outside the ORM."""
+    session = session or db.session
+    tags = set(session.scalars(select(Version.tag))) | {model.__tablename__ for model in TRACKED}
+    bump(session, tags)
+    session.commit()
+
+
+@event.listens_for(db.session, 'after_flush')
+def record_changes(session, flush_context):
+    bump(session, changed_tags(session) | session.info.pop('cascade_tags', set()))
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def discard_changes(session, previous_transaction):
+    session.info.pop('cascade_tags', None)
+    session.info.pop('version_shard', None)
+
+
+@event.listens_for(db.session, 'after_commit')
+def forget_shard(session):
+    session.info.pop('version_shard', None)
+
+
+def route_tags(collection, id=None):
+    """Tags whose versions decide the response to the current GET on collection."""
+    args = request.args
+    if collection == 'farmers' and id:
+        # A farmer's detail view embeds its own animals and their types
+        return sorted({f'farmer:{id}', 'animal_types'})
+    if collection == 'animals' and id:
+        return sorted({f'animal:{id}', 'farmers', 'animal_types'})
+    if collection == 'timeline':
+        # Only the animal's own records
+        return [f'animal:{id}']
+
+    nested = collection in NESTS_ANIMALS or bool(args.get('include'))
+    farmer_id = args.get('farmer_id')
+    animal_id = args.get('animal_id')
+    if farmer_id and collection != 'animal_types':
+        tags = {f'farmer:{farmer_id}'}
+        if nested:
+            tags.add('animal_types')
+    elif animal_id and collection not in ('farmers', 'animal_types'):
+        tags = {f'animal:{animal_id}'}
+        if nested:
+            tags |= {'farmers', 'animal_types'}
+    else:
+        tags = {collection}
+        if nested:
+            tags |= {'animals', 'farmers', 'animal_types'}
+    return sorted(tags)
+
+
+def current_versions(tags):
+    """(versions, last updated_at or None) for tags, with one primary key lookup."""
+    rows = dict(db.session.execute(
+        select(Version.tag, Version).where(Version.tag.in_([row for tag in tags for row in _shards(tag)]))
+    ).all())
+    versions = [sum(rows[row].version for row in _shards(tag) if row in rows) for tag in tags]
+    updated = [row.updated_at for row in rows.values()]
+    return versions, max(updated) if updated else None
+
+
+def request_versions(tags):
+    """current_versions(tags), read once per request: conditional() and cached() both need them."""
+    read = g.setdefault('tag_versions', {})
+    if tuple(tags) not in read:
+        read[tuple(tags)] = current_versions(tags)
+    return read[tuple(tags)]
+
+
+@app.before_request
+def forget_versions():
+    # g outlives the request when the app context was pushed around it (CLI, tests)
+    g.pop('tag_versions', None)
+
+
+def conditional(collection):
+    """ETag / Last-Modified for a Resource.get(self, id=None); 304 when the client is current."""
+    def decorator(get):
+        @wraps(get)
+        def wrapper(self, *args, **kwargs):
+            tags = route_tags(collection, kwargs.get('id'))
+            versions, last_modified = request_versions(tags)
+            # JSON and MessagePack bodies differ, so do their ETags
+            raw = f'{request.full_path}|{negotiated()}|' + ','.join(f'{tag}={version}' for tag, version in zip(tags, versions))
+            etag = hashlib.sha256(raw.encode()).hexdigest()[:32]
+            if last_modified is not None:
+                last_modified = last_modified.replace(microsecond=0)
+
+            if request.if_none_match:
+                # Weak comparison: compression.py sends the ETag of a compressed body as W/"..."
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = bool(since and last_modified and last_modified <= since.replace(tzinfo=None))
+
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = to_response(get(self, *args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator